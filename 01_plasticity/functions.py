@@ -39,9 +39,55 @@ def principal_stresses(sx, sy, sz, sxy, sxz, syz):
     i1, i2, i3 = calculate_invariants(sx, sy, sz, sxy, sxz, syz)
     ps = np.roots((1, -i1, -i2, -i3))
     return ps
-    
-
 
+def principal_stresses_batch(sx, sy, sz, sxy, sxz, syz):
+    ''' Principal stresses (s1 >= s2 >= s3) of arrays of stress tensors, shape (..., 3)'''
+    sx, sy, sz, sxy, sxz, syz = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (sx, sy, sz, sxy, sxz, syz)])
+    a = np.empty(sx.shape + (3, 3))
+    a[..., 0, 0], a[..., 1, 1], a[..., 2, 2] = sx, sy, sz
+    a[..., 0, 1] = a[..., 1, 0] = sxy
+    a[..., 0, 2] = a[..., 2, 0] = sxz
+    a[..., 1, 2] = a[..., 2, 1] = syz
+    return linalg.eigvalsh(a)[..., ::-1]
+    
+
+
+
+def is_number(x):
+    ''' Whether the string x is a number (e.g. a CSV field)'''
+    try:
+        float(x)
+        return True
+    except ValueError:
+        return False
+
+def adaptive_curve(curve, t0, t1, tol, n0=16, max_points=100000):
+    ''' Samples the curve (x, y) = curve(t), t0 <= t <= t1, refining only the
+    intervals whose midpoint is farther than tol from the chord. Returns t, x, y'''
+    t = np.linspace(t0, t1, n0)
+    x, y = curve(t)
+    while len(t) < max_points:
+        tm = (t[1:]+t[:-1])/2
+        xm, ym = curve(tm)
+        refine = np.hypot(xm-(x[1:]+x[:-1])/2, ym-(y[1:]+y[:-1])/2) > tol
+        if not refine.any():
+            break
+        i = np.flatnonzero(refine)+1
+        t = np.insert(t, i, tm[refine])
+        x = np.insert(x, i, xm[refine])
+        y = np.insert(y, i, ym[refine])
+    return t, x, y
+
+def polar_locus(radius, tol, t0=0, t1=2*math.pi):
+    ''' Locus of radius r = radius(theta) around the origin, sampled with adaptive_curve.
+    theta is measured from the x axis (sigma_2) towards the y axis (sigma_1)'''
+    curve = lambda th: (radius(th)*np.cos(th), radius(th)*np.sin(th))
+    t, x, y = adaptive_curve(curve, t0, t1, tol)
+    return x, y
+
+def mises_locus(Y, t0=0, t1=2*math.pi):
+    ''' Mises yield locus in plane stress, (sigma_2, sigma_1) within Y/1000 of the exact curve'''
+    return polar_locus(lambda th: Y/np.sqrt(1-np.sin(th)*np.cos(th)), Y/1000, t0, t1)
 
 def print_tensor(sx, sy, sz, sxy=0, sxz=0, syz=0):
     a = sij2array(sx, sy, sz, sxy, sxz, syz)
@@ -76,6 +122,10 @@ def plot_Mhor_circles(s1, s2, s3, sx=0, sy=0, sxy=0):
 def mises(sx, sy, sz, sxy=0, sxz=0, syz=0):
     return math.sqrt(1/2*((sx-sy)**2+(sy-sz)**2+(sz-sx)**2+6*(sxy**2+sxz**2+syz**2)))
 
+def mises_batch(sx, sy, sz, sxy=0, sxz=0, syz=0):
+    ''' Mises effective stress of arrays of stress components'''
+    return np.sqrt(1/2*((sx-sy)**2+(sy-sz)**2+(sz-sx)**2+6*(np.square(sxy)+np.square(sxz)+np.square(syz))))
+
 #def mises(s1, s2, s3):
 #    return math.sqrt(1/2*((s1-s2)**2+(s2-s3)**2+(s3-s1)**2))
 
@@ -83,25 +133,18 @@ def tresca(s1, s2, s3):
     return max(s1, s2, s3) - min(s1, s2, s3)
 
 def plot_mises(Y, sz=0, px=0, py=0):
-    a = [200*i/1000-100 for i in range(1000)]
-    y0 = [Y/(math.sqrt(1-i+i**2)) for i in a]
-    x0 = [j*i for i,j in zip(y0,a)]
-    y1 = [-Y/(math.sqrt(1-i+i**2)) for i in a]
-    x1 = [j*i for i,j in zip(y1,a)]
+    x0, y0 = mises_locus(Y)
     
     fig, ax = plt.subplots()
     ax.axvline(x=0, color='k', linewidth=0.2)
     ax.axhline(y=0, color='k', linewidth=0.2)    
 
     if not sz==0: # translation to the plane sz
-        x0 = [sz + i for i in x0]
-        y0 = [sz + i for i in y0]
-        x1 = [sz + i for i in x1]
-        y1 = [sz + i for i in y1]
+        x0 = sz + x0
+        y0 = sz + y0
         plt.text(1, 1, r'$\sigma_z=%0.2f$' % sz, color='r', horizontalalignment='right', verticalalignment='top', transform=ax.transAxes)
     
     ax.plot(x0,y0, 'b-', label=r'Mises, $Y=%s$ MPa' % Y)
-    ax.plot(x1,y1, 'b-')
     plt.text(0, 1, r'Mises, $Y=%s$ MPa' % Y, color='b', horizontalalignment='left', verticalalignment='top', transform=ax.transAxes)
     
     if not (px==0 and py==0):
@@ -123,11 +166,7 @@ def plot_tresca_mises(Y, px, py):
     
     tresca = ((Y, 0), (Y, Y), (0, Y), (-Y, 0), (-Y, -Y), (0, -Y), (Y, 0))
     
-    a = [200*i/1000-100 for i in range(1000)]
-    y0 = [Y/(math.sqrt(1-i+i**2)) for i in a]
-    x0 = [j*i for i,j in zip(y0,a)]
-    y1 = [-Y/(math.sqrt(1-i+i**2)) for i in a]
-    x1 = [j*i for i,j in zip(y1,a)]
+    x0, y0 = mises_locus(Y)
     
     fig, ax = plt.subplots()
     ax.axvline(x=0, color='k', linewidth=0.2)
@@ -135,7 +174,6 @@ def plot_tresca_mises(Y, px, py):
     
     ax.plot(*zip(*tresca), 'g-', label=r'Tresca')
     ax.plot(x0,y0, 'b-', label=r'Mises')
-    ax.plot(x1,y1, 'b-')
     ax.plot([0, py], [0, px], color='r', label=r'Stress path ($\alpha=\sigma_2/\sigma_1$)')
     
     ax.set_xlabel(r'$\sigma_2$')
@@ -152,11 +190,7 @@ def plot_tresca_mises_k(k, px, py):
     
     tresca = ((2*k, 0), (2*k, 2*k), (0, 2*k), (-2*k, 0), (-2*k, -2*k), (0, -2*k), (2*k, 0))
     
-    a = [200*i/1000-100 for i in range(1000)]
-    y0 = [Y/(math.sqrt(1-i+i**2)) for i in a]
-    x0 = [j*i for i,j in zip(y0,a)]
-    y1 = [-Y/(math.sqrt(1-i+i**2)) for i in a]
-    x1 = [j*i for i,j in zip(y1,a)]
+    x0, y0 = mises_locus(Y)
     
     fig, ax = plt.subplots()
     ax.axvline(x=0, color='k', linewidth=0.2)
@@ -164,7 +198,6 @@ def plot_tresca_mises_k(k, px, py):
     
     ax.plot(*zip(*tresca), 'g-', label=r'Tresca')
     ax.plot(x0,y0, 'b-', label=r'Mises')
-    ax.plot(x1,y1, 'b-')
     ax.plot([0, py], [0, px], color='r', label=r'Stress path ($\alpha=\sigma_\theta/\sigma_z$)')
     
     ax.set_xlabel(r'$\sigma_z$')
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Identification of the hardening law from tensile test curves (true strain,
+true stress in MPa):
+
+    Hollomon  s = K*e^n            (marciniak_functions.plot_Hollomon)
+    Swift     s = K*(e0 + e)^n     (necking.e1h, return_mapping.hardening)
+
+Many curves are fitted at once as arrays (curves, points) padded with nan:
+first a linear least squares fit of ln(s) = ln(K) + n*ln(e) (Hollomon, and
+the starting point of Swift), then a Levenberg-Marquardt refinement of the
+stress residuals. Only the points in the plastic range emin <= e and before
+necking (Considere, ds/de >= s) are used.
+
+Large lab files are read by chunks of curves and fitted in parallel
+processes; the results are merged into a materials CSV file (one row per
+material id), the input of the parts and catalogues of the other chapters.
+"""
+
+import collections
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+from functions import is_number
+
+def plastic_mask(strain, stress, emin=0.002):
+    ''' Points of the curves used in the fit: valid, e >= emin and before necking'''
+    valid = np.isfinite(strain) & np.isfinite(stress) & (strain >= emin) & (stress > 0)
+    # Considere: necking starts at the maximum of s*exp(-e) (engineering stress)
+    force = np.where(valid, stress*np.exp(-np.nan_to_num(strain)), -np.inf)
+    imax = np.argmax(force, axis=-1)
+    return valid & (np.arange(strain.shape[-1]) <= imax[:, None])
+
+def loglinear(strain, stress, mask):
+    ''' Hollomon K, n by linear least squares of ln(s) over ln(e)'''
+    x = np.where(mask, np.log(np.where(mask, strain, 1)), 0)
+    y = np.where(mask, np.log(np.where(mask, stress, 1)), 0)
+    m = mask.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xm, ym = x.sum(axis=-1)/m, y.sum(axis=-1)/m
+        sxx = np.sum(np.where(mask, (x-xm[:, None])**2, 0), axis=-1)
+        sxy = np.sum(np.where(mask, (x-xm[:, None])*(y-ym[:, None]), 0), axis=-1)
+        n = sxy/sxx
+    return np.exp(ym - n*xm), n
+
+def refine(strain, stress, mask, K, n, e0=None, maxiter=200, tol=1e-10, lam_max=1e12):
+    ''' Levenberg-Marquardt of the stress residuals for all the curves at once
+
+    Parameters ln(K), n (and e0 for Swift, kept >= 0). Each curve is
+    independent: a rejected step increases its damping lam and is retried,
+    and it stops when an accepted step decreases its cost by less than tol
+    (relative) or when lam > lam_max (no step decreases it). Returns K, n,
+    e0 and the root mean square error (MPa).'''
+    swift = e0 is not None
+    e = np.where(mask, strain, 1)
+    s = np.where(mask, stress, 0)
+    p = np.stack((np.log(K), n) + ((e0,) if swift else ()), axis=-1)
+    lam = np.full(len(p), 1e-3)
+    m = mask.sum(axis=-1)
+
+    def residual(p, e, s, mask):
+        ee = e + (p[:, 2:3] if swift else 0)
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            model = np.exp(p[:, :1] + p[:, 1:2]*np.log(ee))
+        return np.where(mask, model - s, 0), model, ee
+
+    r, model, ee = residual(p, e, s, mask)
+    cost = np.sum(r**2, axis=-1)
+    # results of all the curves; the loop works on the active ones (index j)
+    p_out, cost_out = p.copy(), cost.copy()
+    j = np.arange(len(p))
+    for i in range(maxiter):
+        J = [model, model*np.log(ee)] + ([model*p[:, 1:2]/ee] if swift else [])
+        J = np.stack([np.where(mask, x, 0) for x in J], axis=-1)   # (curves, points, params)
+        A = np.einsum('cpi,cpj->cij', J, J)
+        g = np.einsum('cpi,cp->ci', J, r)
+        if swift:
+            # e0 on its bound and the cost decreasing outwards: step in ln(K), n only
+            fixed = (p[:, 2] <= 0) & (g[:, 2] > 0)
+            A[fixed, 2, :] = A[fixed, :, 2] = 0
+            A[fixed, 2, 2] = 1
+            g[fixed, 2] = 0
+        D = np.einsum('cii->ci', A)
+        step = np.linalg.solve(A + (lam[:, None]*np.maximum(D, 1e-12))[..., None]*np.eye(p.shape[1]), -g[..., None])[..., 0]
+        pn = p + step
+        if swift:
+            pn[:, 2] = np.maximum(pn[:, 2], 0)
+        rn, modeln, een = residual(pn, e, s, mask)
+        costn = np.sum(rn**2, axis=-1)
+        better = np.isfinite(costn) & (costn < cost)
+        p = np.where(better[:, None], pn, p)
+        r = np.where(better[:, None], rn, r)
+        model = np.where(better[:, None], modeln, model)
+        ee = np.where(better[:, None], een, ee)
+        converged = better & (cost-costn <= tol*cost)
+        cost = np.where(better, costn, cost)
+        lam = np.where(better, lam/10, lam*10)
+        keep = ~converged & (lam <= lam_max)
+        if not keep.all():
+            p_out[j], cost_out[j] = p, cost
+            j = j[keep]
+            p, cost, lam, r, model, ee, e, s, mask = [x[keep] for x in (p, cost, lam, r, model, ee, e, s, mask)]
+            if not len(j):
+                break
+    p_out[j], cost_out[j] = p, cost
+    return np.exp(p_out[:, 0]), p_out[:, 1], (p_out[:, 2] if swift else np.zeros(len(p_out))), np.sqrt(cost_out/np.maximum(m, 1))
+
+def fit(strain, stress, law='swift', emin=0.002):
+    ''' Fits the hardening law to the curves (curves, points); returns a dict of arrays
+    'K', 'n', 'e0', 'rmse' and 'points' (number of points used)'''
+    strain = np.atleast_2d(np.asarray(strain, dtype=float))
+    stress = np.atleast_2d(np.asarray(stress, dtype=float))
+    mask = plastic_mask(strain, stress, emin)
+    K, n = loglinear(strain, stress, mask)
+    if law == 'swift':
+        # e0 from the first point of the fit: s0 = K*e0^n
+        s0 = stress[np.arange(len(stress)), np.argmax(mask, axis=-1)]
+        e0 = np.nan_to_num((s0/K)**(1/n))
+        K, n, e0, rmse = refine(strain, stress, mask, K, n, np.maximum(e0, 1e-4))
+    elif law == 'hollomon':
+        K, n, e0, rmse = refine(strain, stress, mask, K, n)
+    else:
+        raise ValueError('Unknown hardening law: %s' % law)
+    return {'K': K, 'n': n, 'e0': e0, 'rmse': rmse, 'points': mask.sum(axis=-1)}
+
+def read_curves(filename, chunk=1000):
+    ''' Reads tensile curves by chunks; yields (ids, strain, stress) padded with nan
+
+    Text files (csv) have rows id, true strain, true stress, consecutive for
+    each curve (a header row is skipped). .npz files have the arrays 'id',
+    'strain' and 'stress' (curves, points).'''
+    if filename.endswith('.npz'):
+        # each access to a member of the file reads (and decompresses) all of it
+        with np.load(filename) as data:
+            ids, strain, stress = data['id'], data['strain'], data['stress']
+        for i in range(0, len(ids), chunk):
+            yield ids[i:i+chunk], strain[i:i+chunk], stress[i:i+chunk]
+        return
+    with open(filename, newline='') as fp:
+        rows = csv.reader(fp)
+        first = next(rows, None)
+        if first is None:
+            return
+        if is_number(first[1]):   # no header row
+            rows = itertools.chain([first], rows)
+        curves = itertools.groupby(rows, key=lambda row: row[0])
+        while True:
+            batch = [(i, np.array(list(g))[:, 1:].astype(float)) for i, g in itertools.islice(curves, chunk)]
+            if not batch:
+                break
+            m = max(len(c) for i, c in batch)
+            strain = np.full((len(batch), m), np.nan)
+            stress = np.full((len(batch), m), np.nan)
+            for j, (i, c) in enumerate(batch):
+                strain[j, :len(c)], stress[j, :len(c)] = c[:, 0], c[:, 1]
+            yield np.array([i for i, c in batch]), strain, stress
+
+def _fit_chunk(args):
+    ids, strain, stress, law, emin = args
+    return dict(fit(strain, stress, law, emin), id=ids)
+
+def fit_file(filename, law='swift', emin=0.002, chunk=1000, workers=None):
+    ''' Fits all the curves of a file, chunks in parallel processes (workers=1: no processes)
+
+    At most 2*workers chunks are read ahead of the fitted ones.'''
+    jobs = ((ids, strain, stress, law, emin) for ids, strain, stress in read_curves(filename, chunk))
+    if workers == 1:
+        results = list(map(_fit_chunk, jobs))
+    else:
+        workers = workers or os.cpu_count()
+        results, pending = [], collections.deque()
+        with ProcessPoolExecutor(workers) as pool:
+            for job in jobs:
+                if len(pending) >= 2*workers:
+                    results.append(pending.popleft().result())
+                pending.append(pool.submit(_fit_chunk, job))
+            results += [f.result() for f in pending]
+    return {k: np.concatenate([r[k] for r in results]) for k in ('id', 'K', 'n', 'e0', 'rmse', 'points')}
+
+def update_materials(filename, table, columns=None):
+    ''' Merges the columns of the table (dict of arrays with 'id') into the
+    materials CSV file, one row per id (new ids are appended)'''
+    columns = columns or [k for k in table if k != 'id']
+    rows, fields = {}, ['id']
+    if os.path.exists(filename):
+        with open(filename, newline='') as fp:
+            reader = csv.DictReader(fp)
+            fields = list(reader.fieldnames)
+            rows = {row['id']: row for row in reader}
+    fields += [k for k in columns if k not in fields]
+    for j, i in enumerate(np.asarray(table['id']).astype(str)):
+        row = rows.setdefault(i, {'id': i})
+        row.update({k: '%.6g' % table[k][j] for k in columns})
+    with open(filename, 'w', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows.values())
+    return len(rows)
+
+def read_materials(filename):
+    ''' Materials CSV file as a dict of arrays (numeric columns as float)'''
+    with open(filename, newline='') as fp:
+        rows = list(csv.DictReader(fp))
+    table = {}
+    for k in rows[0] if rows else ():
+        values = [row[k] for row in rows]
+        table[k] = np.array([float(v) if v != '' else np.nan for v in values]) if k != 'id' and all(
+            is_number(v) or v == '' for v in values) else np.array(values)
+    return table
+
+def plot_fit(strain, stress, res, i=0):
+    ''' Tensile curve and fitted law'''
+    e = strain[i][np.isfinite(strain[i])]
+    fig, ax = plt.subplots()
+    ax.plot(strain[i], stress[i], 'k.', ms=2, label='Test')
+    x = np.linspace(0, np.nanmax(e), 200)
+    ax.plot(x, res['K'][i]*(res['e0'][i]+x)**res['n'][i], 'r-',
+            label=r'$K=%.1f$ MPa, $n=%.3f$, $\varepsilon_0=%.4f$' % (res['K'][i], res['n'][i], res['e0'][i]))
+    ax.set_xlabel(r'True strain, $\varepsilon_{eff}$')
+    ax.set_ylabel(r'True stress, $\sigma_{eff}$')
+    plt.legend(loc='lower right')
+    plt.show()
+
+
+if __name__ == "__main__":
+    # synthetic Swift curves with noise, elastic points and necking
+    rng = np.random.default_rng(0)
+    N, m = 5000, 300
+    K, n, e0 = rng.uniform(500, 900, N), rng.uniform(0.15, 0.3, N), rng.uniform(0, 0.02, N)
+    strain = np.linspace(0, 0.5, m)*np.ones((N, 1))
+    stress = K[:, None]*(e0[:, None]+strain)**n[:, None] + rng.normal(0, 2, (N, m))
+    strain[:, 150:][rng.uniform(size=N) < 0.3] = np.nan   # shorter curves
+    res = fit(strain, stress, 'swift')
+    print('Swift: max. error K %.2f MPa, n %.4f, e0 %.4f; mean rmse %.2f MPa'
+          % (np.abs(res['K']-K).max(), np.abs(res['n']-n).max(), np.abs(res['e0']-e0).max(), res['rmse'].mean()))
+    plot_fit(strain, stress, res)
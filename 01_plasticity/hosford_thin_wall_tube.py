@@ -42,10 +42,24 @@ def srt(p):
 
 def compute_p(params):
     _set_param(*params)
-    func = lambda p: f.mises(sr, st(p), sz(p), srt(p), 0, 0) - Y
+    func = lambda p: f.mises(sr, st(p[0]), sz(p[0]), srt(p[0]), 0, 0) - Y
     py, = fsolve(func, 10)
     return py
 
+def compute_p_batch(Y, t, D, F, T):
+    ''' Internal pressure that causes yielding (Mises) for arrays of tubes and loads'''
+    # st = a*p, sz = b*p + c, srt = d --> Mises is a quadratic equation in p
+    Y, t, D, F, T = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (Y, t, D, F, T)])
+    a = D/(2*t)
+    b = D/(4*t)
+    c = F/(np.pi*D*t)
+    d = 2*T/(np.pi*D**2*t) *1000
+    A = a**2 + b**2 - a*b
+    B = 2*b*c - a*c
+    C = c**2 + 3*d**2 - Y**2
+    with np.errstate(invalid='ignore'):
+        return (-B + np.sqrt(B**2 - 4*A*C))/(2*A)
+
 def eigen(sx, sy, sz, sxy, sxz, syz):
     a = np.array([[sx, sxy, sxz],
                  [sxy, sy, syz],
@@ -76,25 +90,18 @@ def plot_mohr(params, p):
     f.plot_Mhor_circles(s1, s2, s3, sr, st(p), srt(p))
 
 def plot_mises(Y, sz=0, px=0, py=0):
-    a = [200*i/1000-100 for i in range(1000)]
-    y0 = [Y/(math.sqrt(1-i+i**2)) for i in a]
-    x0 = [j*i for i,j in zip(y0,a)]
-    y1 = [-Y/(math.sqrt(1-i+i**2)) for i in a]
-    x1 = [j*i for i,j in zip(y1,a)]
+    x0, y0 = f.mises_locus(Y)
     
     fig, ax = plt.subplots()
     ax.axvline(x=0, color='k', linewidth=0.2)
     ax.axhline(y=0, color='k', linewidth=0.2)    
 
     if not sz==0: # translation to the plane sz
-        x0 = [sz + i for i in x0]
-        y0 = [sz + i for i in y0]
-        x1 = [sz + i for i in x1]
-        y1 = [sz + i for i in y1]
+        x0 = sz + x0
+        y0 = sz + y0
         plt.text(1, 1, r'$\sigma_z=%0.2f$' % sz, color='r', horizontalalignment='right', verticalalignment='top', transform=ax.transAxes)
     
     ax.plot(x0,y0, 'b-', label=r'Mises, $Y=%s$ MPa' % Y)
-    ax.plot(x1,y1, 'b-')
     plt.text(0, 1, r'Mises, $Y=%s$ MPa' % Y, color='b', horizontalalignment='left', verticalalignment='top', transform=ax.transAxes)
     
     if not (px==0 and py==0):
@@ -113,7 +120,7 @@ def plot_mises(Y, sz=0, px=0, py=0):
 def plot_mohr_mises(Y, t, D, F, T, p):
     _set_param(Y, t, D, F, T)
 
-    func = lambda p: f.mises(sr, st(p), sz(p), srt(p), 0, 0) - Y
+    func = lambda p: f.mises(sr, st(p[0]), sz(p[0]), srt(p[0]), 0, 0) - Y
     py, = fsolve(func, 10)
 
     print('Stress tensor (in MPa):')
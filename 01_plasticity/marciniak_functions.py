@@ -6,17 +6,18 @@ Author: Domingo Morales Palma <dmpalma@us.es>
 """
 
 import math
+import numpy as np
 import matplotlib.pyplot as plt
+import functions as f
 
 
 def plot_strains(e1, e2):
     beta = e2/e1
     eeff = e1*2/math.sqrt(3)*math.sqrt(1+beta+beta**2)
 
-    # yield surface
-    b = [3*i/1000-2 for i in range(1000)]
-    yi = [eeff/(2/math.sqrt(3)*math.sqrt(1+i+i**2)) for i in b]
-    xi = [j*i for i,j in zip(yi,b)]
+    # yield surface, from beta = -2 to beta = 1
+    radius = lambda th: eeff/(2/math.sqrt(3)*np.sqrt(1+np.sin(th)*np.cos(th)))
+    xi, yi = f.polar_locus(radius, eeff/1000, math.pi/4, math.atan2(1, -2))
 
     fig, ax = plt.subplots()
     ax.plot([0,-2], [0,1], 'k-', linewidth=0.2)
@@ -38,9 +39,7 @@ def plot_stresses(s1, s2):
     seff = s1*math.sqrt(1-alpha+alpha**2)
 
     # yield surface
-    a = [200*i/1000-100 for i in range(1000)]
-    yi = [seff/(math.sqrt(1-i+i**2)) for i in a]
-    xi = [j*i for i,j in zip(yi,a)]
+    xi, yi = f.mises_locus(seff, 0, math.pi)
 
     fig, ax = plt.subplots()
     ax.axvline(x=0, color='k', linewidth=0.2)
@@ -78,9 +77,7 @@ def plot_stress_paths(a1=-1, a2=0, a3=1/2, Y = 100):
     s1f = 300
 
     # yield surface
-    a = [200*i/1000-100 for i in range(1000)]
-    y0 = [Y/(math.sqrt(1-i+i**2)) for i in a]
-    x0 = [j*i for i,j in zip(y0,a)]
+    x0, y0 = f.mises_locus(Y, 0, math.pi)
 
     import matplotlib.pyplot as plt
     fig, ax = plt.subplots()
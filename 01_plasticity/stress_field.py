@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Principal stresses and Mohr-circle quantities of full stress fields, arrays
+(N, 6) of components sx, sy, sz, sxy, sxz, syz:
+
+    s1 >= s2 >= s3     principal stresses (closed form from the invariants)
+    tau_max            maximum shear stress, (s1-s3)/2 (radius of the largest Mohr circle)
+    mises              Mises effective stress
+    ratio              Tresca/Mises ratio, (s1-s3)/mises, between 1 and 2/sqrt(3)
+    triaxiality        mean stress/mises
+    lode               Lode parameter (2*s2-s1-s3)/(s1-s3), between -1 and 1
+    angle_x            angle (deg) between the direction of s1 and the x axis
+    angle_xy           angle (deg) of the principal directions in the xy plane (Mohr circle of xy)
+
+Large fields are read by chunks (.npy memory-mapped or csv) and reduced in a
+single pass to histograms and the k most critical elements.
+"""
+
+import itertools
+import math
+import numpy as np
+import matplotlib.pyplot as plt
+import functions as f
+
+FIELDS = ('s1', 's2', 's3', 'tau_max', 'mises', 'ratio', 'triaxiality', 'lode', 'angle_x', 'angle_xy')
+
+# fixed ranges of the histograms (the stress ranges are taken from the first chunk)
+RANGES = {'ratio': (1, 2/math.sqrt(3)), 'triaxiality': (-2/3, 2/3), 'lode': (-1, 1),
+          'angle_x': (0, 90), 'angle_xy': (-45, 45)}
+
+def analyze(stress):
+    ''' Principal stresses, Mohr-circle quantities and angles of the stresses (N, 6)'''
+    s = np.asarray(stress, dtype=float)
+    sx, sy, sz, sxy, sxz, syz = s.T
+    sm = (sx+sy+sz)/3
+    dx, dy, dz = sx-sm, sy-sm, sz-sm
+    J2 = (dx**2 + dy**2 + dz**2)/2 + sxy**2 + sxz**2 + syz**2
+    J3 = dx*dy*dz + 2*sxy*sxz*syz - dx*syz**2 - dy*sxz**2 - dz*sxy**2
+    mises = np.sqrt(3*J2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        c3 = np.where(J2 > 0, 3*math.sqrt(3)/2*J3/J2**1.5, 1)
+        theta = np.arccos(np.clip(c3, -1, 1))/3   # Lode angle, 0 <= theta <= pi/3
+        r = 2*np.sqrt(J2/3)
+        s1 = sm + r*np.cos(theta)
+        s2 = sm + r*np.cos(theta - 2*math.pi/3)
+        s3 = sm + r*np.cos(theta + 2*math.pi/3)
+        ratio = np.where(mises > 0, (s1-s3)/mises, 1)
+        triaxiality = np.where(mises > 0, sm/mises, np.nan)
+        lode = np.where(s1 > s3, (2*s2-s1-s3)/(s1-s3), 0)
+
+    # direction of s1: largest cross product of two rows of (S - s1*I)
+    rows = np.stack((np.stack((sx-s1, sxy, sxz), axis=-1),
+                     np.stack((sxy, sy-s1, syz), axis=-1),
+                     np.stack((sxz, syz, sz-s1), axis=-1)))
+    v = np.stack((np.cross(rows[0], rows[1]), np.cross(rows[0], rows[2]), np.cross(rows[1], rows[2])))
+    norm = np.linalg.norm(v, axis=-1)
+    k = np.argmax(norm, axis=0)
+    v = np.take_along_axis(v, k[None, :, None], axis=0)[0]
+    norm = np.take_along_axis(norm, k[None, :], axis=0)[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        angle_x = np.where(norm > 0, np.degrees(np.arccos(np.clip(np.abs(v[:, 0])/norm, 0, 1))), 0)
+    angle_xy = np.degrees(np.arctan2(2*sxy, sx-sy))/2
+    return {'s1': s1, 's2': s2, 's3': s3, 'tau_max': (s1-s3)/2, 'mises': mises, 'ratio': ratio,
+            'triaxiality': triaxiality, 'lode': lode, 'angle_x': angle_x, 'angle_xy': angle_xy}
+
+def read_stress(filename, chunk=10**6):
+    ''' Reads a stress field (N, 6) by chunks: .npy files are memory-mapped,
+    text files (csv) have one element per row'''
+    if filename.endswith('.npy'):
+        stress = np.load(filename, mmap_mode='r')
+        for i in range(0, len(stress), chunk):
+            yield np.asarray(stress[i:i+chunk])
+        return
+    with open(filename) as fp:
+        while True:
+            lines = list(itertools.islice(fp, chunk))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=',', ndmin=2)
+
+def chunks(stress, chunk=10**6):
+    ''' Chunks of an array (N, 6) in memory or memory-mapped'''
+    for i in range(0, len(stress), chunk):
+        yield np.asarray(stress[i:i+chunk])
+
+def field_statistics(chunks, key='mises', k=100, bins=100, ranges=None):
+    ''' Single pass over the chunks of a stress field
+
+    Returns a dict with the number of elements, the histogram (counts, edges)
+    and the minimum, maximum and mean of each field (over its non-nan values),
+    and the k elements with the largest value of key ('index', 'value' and
+    their 'stress'). Values
+    outside the range of a histogram are counted in its first or last bin.'''
+    ranges = dict(RANGES, **(ranges or {}))
+    hist, edges = {}, {}
+    stats = {name: [np.inf, -np.inf, 0.0, 0] for name in FIELDS}
+    top_index = np.empty(0, dtype=np.int64)
+    top_value = np.empty(0)
+    top_stress = np.empty((0, 6))
+    N = 0
+    for stress in chunks:
+        res = analyze(stress)
+        if not edges:
+            # stress ranges from the first chunk, with margin for the rest of the field
+            smax = 1.5*max(np.nanmax(np.abs(res['s1'])), np.nanmax(np.abs(res['s3'])), 1e-12)
+            ranges = dict({'s1': (-smax, smax), 's2': (-smax, smax), 's3': (-smax, smax),
+                           'tau_max': (0, smax), 'mises': (0, smax)}, **ranges)
+            edges = {name: np.linspace(*ranges[name], bins+1) for name in FIELDS}
+            hist = {name: np.zeros(bins, dtype=np.int64) for name in FIELDS}
+        for name in FIELDS:
+            x = res[name]
+            x = x[~np.isnan(x)]
+            lo, hi = edges[name][0], edges[name][-1]
+            i = np.clip(((x-lo)/(hi-lo)*bins).astype(np.intp), 0, bins-1)
+            hist[name] += np.bincount(i, minlength=bins)
+            if x.size:
+                stats[name][0] = min(stats[name][0], x.min())
+                stats[name][1] = max(stats[name][1], x.max())
+                stats[name][2] += x.sum()
+                stats[name][3] += x.size
+        # k largest values: candidates of the chunk merged with the current ones
+        value = np.nan_to_num(res[key], nan=-np.inf)
+        if len(value) > k:
+            j = np.argpartition(value, -k)[-k:]
+        else:
+            j = np.arange(len(value))
+        top_index = np.concatenate((top_index, N+j))
+        top_value = np.concatenate((top_value, value[j]))
+        top_stress = np.concatenate((top_stress, np.asarray(stress, dtype=float)[j]))
+        order = np.argsort(-top_value, kind='stable')[:k]
+        top_index, top_value, top_stress = top_index[order], top_value[order], top_stress[order]
+        N += len(value)
+    return {'count': N,
+            'histograms': {name: (hist.get(name), edges.get(name)) for name in FIELDS},
+            'min': {name: stats[name][0] for name in FIELDS},
+            'max': {name: stats[name][1] for name in FIELDS},
+            'mean': {name: stats[name][2]/stats[name][3] if stats[name][3] else np.nan for name in FIELDS},
+            'top': {'key': key, 'index': top_index, 'value': top_value, 'stress': top_stress}}
+
+def plot_statistics(res, names=('mises', 'tau_max', 'ratio', 'triaxiality', 'lode', 'angle_x')):
+    ''' Histograms of the stress field'''
+    fig, ax = plt.subplots(2, (len(names)+1)//2, figsize=(12,6))
+    for a, name in zip(ax.flat, names):
+        counts, edges = res['histograms'][name]
+        a.stairs(counts, edges, fill=True)
+        a.set_xlabel(name)
+    ax.flat[0].set_ylabel('Elements')
+    plt.suptitle('%d elements' % res['count'])
+    plt.tight_layout()
+    plt.show()
+
+def plot_critical(res, i=0):
+    ''' Mohr circles of the i-th most critical element'''
+    sx, sy, sz, sxy, sxz, syz = res['top']['stress'][i]
+    p = analyze(res['top']['stress'][i:i+1])
+    print('Element %d: %s = %.2f' % (res['top']['index'][i], res['top']['key'], res['top']['value'][i]))
+    f.print_tensor(sx, sy, sz, sxy, sxz, syz)
+    f.plot_Mhor_circles(p['s1'][0], p['s2'][0], p['s3'][0], sx, sy, sxy)
+
+
+if __name__ == "__main__":
+    # closed-form principal stresses against the eigenvalues
+    rng = np.random.default_rng(0)
+    stress = rng.normal(0, 150, (1000, 6))
+    res = analyze(stress)
+    ps = f.principal_stresses_batch(*stress.T)
+    print('Max. difference with the eigenvalues: %.2e MPa' % np.abs(np.stack((res['s1'], res['s2'], res['s3']), axis=-1) - ps).max())
+
+    # field of 10^7 elements by chunks of 10^6
+    stress = rng.normal(0, 150, (10**7, 6)).astype(np.float32)
+    res = field_statistics(chunks(stress), key='tau_max', k=10)
+    print('%d elements, max. shear stress %.1f MPa, mean triaxiality %.3f'
+          % (res['count'], res['max']['tau_max'], res['mean']['triaxiality']))
+    print('Most critical elements:', res['top']['index'])
+    plot_statistics(res)
+    plot_critical(res)
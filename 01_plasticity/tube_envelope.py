@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Yield envelope of thin-walled tubes under internal pressure p (MPa), axial
+force F (N) and torque T (Nm), as in hosford_thin_wall_tube.
+
+The stresses are linear in the loads and the criteria (Mises, Tresca and
+isotropic Hosford) are homogeneous of degree 1, so with the loads scaled by
+    p0 = 2*t*Y/D,  F0 = pi*D*t*Y,  T0 = pi*D^2*t*Y/2000
+the envelope is the same surface for every tube (Y, t, D):
+    st/Y = p/p0,  sz/Y = p/(2*p0) + F/F0,  srt/Y = T/T0
+It is computed once per criterion, adaptively refined where it is curved,
+and then scaled to any number of tube geometries.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.interpolate import RegularGridInterpolator
+import functions as f
+
+def stresses(p, F, T, t, D):
+    ''' Hoop, axial and shear stresses of the tube wall (sr = 0)'''
+    st = p*D/(2*t)
+    sz = p*D/(4*t) + F/(np.pi*D*t)
+    srt = 2*T/(np.pi*D**2*t) *1000
+    return st, sz, srt
+
+def reference_loads(Y, t, D):
+    ''' Pressure, axial force and torque that alone give a stress equal to Y'''
+    return 2*t*Y/D, np.pi*D*t*Y, np.pi*D**2*t*Y/2000
+
+def eff_stress(st, sz, srt, criterion='mises', a=8):
+    ''' Effective stress of the tube wall for 'mises', 'tresca' or 'hosford' (exponent a)'''
+    if criterion == 'mises':
+        return f.mises_batch(0, st, sz, srt, 0, 0)
+    # principal stresses in the plane of the wall, s3 = sr = 0
+    c = (st+sz)/2
+    R = np.sqrt(((st-sz)/2)**2 + srt**2)
+    s1, s2 = c+R, c-R
+    if criterion == 'tresca':
+        return np.maximum(np.maximum(np.abs(s1-s2), np.abs(s1)), np.abs(s2))
+    if criterion == 'hosford':
+        return ((np.abs(s1-s2)**a + np.abs(s1)**a + np.abs(s2)**a)/2)**(1/a)
+    raise ValueError('Unknown yield criterion: %s' % criterion)
+
+def yield_ratio(p, F, T, Y, t, D, criterion='mises', a=8):
+    ''' Effective stress over Y for arrays of loads and tubes (yielding when >= 1)'''
+    return eff_stress(*stresses(p, F, T, t, D), criterion, a)/Y
+
+def radius(u, criterion='mises', a=8):
+    ''' Distance to the normalized envelope along the unit directions u (..., 3)'''
+    ph, Fh, Th = u[..., 0], u[..., 1], u[..., 2]
+    return 1/eff_stress(ph, ph/2+Fh, Th, criterion, a)
+
+def envelope(criterion='mises', a=8, tol=1e-3, max_level=8):
+    ''' Triangulated normalized envelope, refined until the chord error is below tol
+
+    Starts from an octahedron and splits the edges that deviate from the
+    surface more than tol at their midpoint, shared by the two triangles of
+    the edge. Triangles with 3 split edges are divided in 4 (red), with 1 in 2
+    (green), and with 2 get the third one split as well, so the mesh stays
+    conforming (closed, without hanging nodes). Returns the vertices (M, 3) in
+    normalized loads (p/p0, F/F0, T/T0) and the triangles (K, 3).'''
+    u = np.array([[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]], dtype=float)
+    tri = np.array([[0, 2, 4], [2, 1, 4], [1, 3, 4], [3, 0, 4],
+                    [2, 0, 5], [1, 2, 5], [3, 1, 5], [0, 3, 5]])
+    P = u*radius(u, criterion, a)[:, None]
+    for level in range(max_level):
+        # edges (0-1, 1-2, 2-0) of the triangles and their unique keys
+        edges = np.stack((tri[:, [0, 1]], tri[:, [1, 2]], tri[:, [2, 0]]), axis=1)   # (K, 3, 2)
+        M = len(u)
+        key, inv = np.unique(edges.min(axis=-1)*M + edges.max(axis=-1), return_inverse=True)
+        inv = inv.reshape(tri.shape)
+        e0, e1 = key // M, key % M
+        m = u[e0] + u[e1]
+        m /= np.linalg.norm(m, axis=-1)[:, None]
+        Pm = m*radius(m, criterion, a)[:, None]
+        split = np.linalg.norm(Pm - (P[e0]+P[e1])/2, axis=-1) > tol
+        # closure: no triangle with 2 split edges
+        while True:
+            two = split[inv].sum(axis=-1) == 2
+            if not two.any():
+                break
+            split[inv[two]] = True
+        if not split.any():
+            break
+        vid = np.full(len(key), -1)
+        vid[split] = M + np.arange(split.sum())
+        u = np.concatenate((u, m[split]))
+        P = np.concatenate((P, Pm[split]))
+        count = split[inv].sum(axis=-1)
+        a0, a1, a2 = tri[count == 3].T
+        m01, m12, m20 = vid[inv[count == 3]].T
+        # green: the triangle is rotated so that the split edge is 0-1
+        green = count == 1
+        j = np.argmax(split[inv[green]], axis=-1)
+        v0, v1, v2 = np.take_along_axis(tri[green], (j[:, None] + np.arange(3)) % 3, axis=-1).T
+        mg = vid[inv[green, j]]
+        tri = np.concatenate((tri[count == 0],
+                              np.stack((a0, m01, m20), axis=-1), np.stack((m01, a1, m12), axis=-1),
+                              np.stack((m20, m12, a2), axis=-1), np.stack((m01, m12, m20), axis=-1),
+                              np.stack((v0, mg, v2), axis=-1), np.stack((mg, v1, v2), axis=-1)))
+    return P, tri
+
+def scale(P, Y, t, D):
+    ''' Envelope in loads (p, F, T) for arrays of tubes, shape (tubes, M, 3)'''
+    ref = np.stack(np.broadcast_arrays(*reference_loads(*[np.asarray(i, dtype=float) for i in (Y, t, D)])), axis=-1)
+    return P*ref[..., None, :]
+
+def pressure_table(criterion='mises', a=8, Fmax=1.5, Tmax=1, size=101, iterations=60):
+    ''' Table of the normalized yield pressure p/p0 over normalized (F/F0, T/T0)
+
+    The positive root of eff_stress = 1 in p is found by bisection (the
+    effective stress is convex in p); nan where the tube yields at p = 0,
+    which is also the case outside the table (|F| > F0 or T > T0).'''
+    Fh = np.linspace(-Fmax, Fmax, size)
+    Th = np.linspace(0, Tmax, size)
+    Fg, Tg = np.meshgrid(Fh, Th, indexing='ij')
+    phi = lambda ph: eff_stress(ph, ph/2+Fg, Tg, criterion, a)
+    lo, hi = np.zeros_like(Fg), np.full_like(Fg, 2+2*Fmax)
+    for i in range(iterations):
+        mid = (lo+hi)/2
+        inside = phi(mid) < 1
+        lo = np.where(inside, mid, lo)
+        hi = np.where(inside, hi, mid)
+    ph = np.where(phi(0) < 1, (lo+hi)/2, np.nan)
+    return RegularGridInterpolator((Fh, Th), ph, bounds_error=False)
+
+def yield_pressure(F, T, Y, t, D, table):
+    ''' Internal pressure that causes yielding for arrays of loads and tubes (torque of any sign)'''
+    p0, F0, T0 = reference_loads(Y, t, D)
+    x = np.stack(np.broadcast_arrays(F/F0, np.abs(T)/T0), axis=-1)
+    return p0*table(x)
+
+def plot_envelope(P, tri, criterion):
+    ''' Normalized envelope surface'''
+    fig = plt.figure(figsize=(7,7))
+    ax = fig.add_subplot(projection='3d')
+    ax.plot_trisurf(P[:, 1], P[:, 2], P[:, 0], triangles=tri, cmap='viridis', alpha=0.8, lw=0.1, edgecolor='k')
+    ax.set_xlabel(r'$F/F_0$')
+    ax.set_ylabel(r'$T/T_0$')
+    ax.set_zlabel(r'$p/p_0$')
+    plt.title('Yield envelope (%s), %d triangles' % (criterion, len(tri)))
+    plt.show()
+
+
+if __name__ == "__main__":
+    for criterion in ('mises', 'tresca', 'hosford'):
+        P, tri = envelope(criterion, tol=2e-3)
+        print('%s: %d vertices, %d triangles' % (criterion, len(P), len(tri)))
+    plot_envelope(P, tri, criterion)
+
+    # yield pressure of 1000 tube SKUs under axial force and torque
+    rng = np.random.default_rng(0)
+    Y, t, D = rng.uniform(200, 400, 1000), rng.uniform(1, 3, 1000), rng.uniform(50, 120, 1000)
+    table = pressure_table('mises')
+    py = yield_pressure(8000, 2000, Y, t, D, table)
+    print('Yield pressure (MPa): min %.1f, max %.1f' % (np.nanmin(py), np.nanmax(py)))
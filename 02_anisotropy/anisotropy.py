@@ -6,8 +6,34 @@ Author: Domingo Morales Palma <dmpalma@us.es>
 """
 
 import math
+import numpy as np
 import matplotlib.pyplot as plt
 
+def adaptive_curve(curve, t0, t1, tol, n0=16, max_points=100000):
+    ''' Samples the curve (x, y) = curve(t), t0 <= t <= t1, refining only the
+    intervals whose midpoint is farther than tol from the chord. Returns t, x, y
+    (same as functions.adaptive_curve of 01_plasticity)'''
+    t = np.linspace(t0, t1, n0)
+    x, y = curve(t)
+    while len(t) < max_points:
+        tm = (t[1:]+t[:-1])/2
+        xm, ym = curve(tm)
+        refine = np.hypot(xm-(x[1:]+x[:-1])/2, ym-(y[1:]+y[:-1])/2) > tol
+        if not refine.any():
+            break
+        i = np.flatnonzero(refine)+1
+        t = np.insert(t, i, tm[refine])
+        x = np.insert(x, i, xm[refine])
+        y = np.insert(y, i, ym[refine])
+    return t, x, y
+
+def polar_locus(radius, tol, t0=0, t1=2*math.pi):
+    ''' Locus of radius r = radius(theta) around the origin, sampled with adaptive_curve.
+    theta is measured from the x axis (sigma_2) towards the y axis (sigma_1)'''
+    curve = lambda th: (radius(th)*np.cos(th), radius(th)*np.sin(th))
+    t, x, y = adaptive_curve(curve, t0, t1, tol)
+    return x, y
+
 def eff_stress_Mises(s1, alpha):
     ''' Mises effective stress in plane stress'''
     return s1*math.sqrt(1-alpha+alpha**2)
@@ -16,26 +42,24 @@ def eff_stress_Hosford(s1, alpha, r0, r90, a):
     ''' Hosford effective stress in plane stress'''
     return s1*( (r90+r0*alpha**a+r0*r90*(1-alpha)**a)/(r90*(1+r0)) )**(1/a)
 
+def eff_stress_Hosford_batch(s1, s2, r0, r90, a):
+    ''' Hosford effective stress of arrays of principal stresses (any sign of s1, s2)'''
+    return ( (r90*np.abs(s1)**a + r0*np.abs(s2)**a + r0*r90*np.abs(s1-s2)**a)/(r90*(1+r0)) )**(1/a)
+
 def planar_anisotropy(r0, r90, r45=1):
-    return (r0+r90-2*r45)/4
+    return (r0+r90-2*r45)/2
 
 def normal_anisotropy(r0, r90, r45=1):
     return (r0+r90+2*r45)/4
 
-def plot_ys(sy=300, r0=1.2, r90=1.8, a=8):
-    s1 = lambda alpha: sy/eff_stress_Hosford(1, alpha, r0, r90, a)
-    a0 = [200*i/1000-100 for i in range(1000)]
-    yH = [s1(i) for i in a0] + [-s1(i) for i in a0]
-    xH = [j*i for i,j in zip(yH,a0)] + [-j*i for i,j in zip(yH,a0)]
-    
+def plot_ys(sy=300, r0=1.2, r90=1.8, a=8, r45=1):
+    # polar loci (sigma_2, sigma_1), within sy/1000 of the exact curves
+    locus = lambda a_, r0_, r90_: polar_locus(lambda th: sy/eff_stress_Hosford_batch(np.sin(th), np.cos(th), r0_, r90_, a_), sy/1000)
+    xH, yH = locus(a, r0, r90)
     # Hill
-    s1 = lambda alpha: sy/eff_stress_Hosford(1, alpha, r0, r90, 2)
-    yI = [s1(i) for i in a0] + [-s1(i) for i in a0]
-    xI = [j*i for i,j in zip(yI,a0)] + [-j*i for i,j in zip(yI,a0)]
+    xI, yI = locus(2, r0, r90)
     # Mises
-    s1 = lambda alpha: sy/eff_stress_Mises(1, alpha)
-    yM = [s1(i) for i in a0] + [-s1(i) for i in a0]
-    xM = [j*i for i,j in zip(yM,a0)] + [-j*i for i,j in zip(yM,a0)]
+    xM, yM = locus(2, 1, 1)
     
     plt.rcParams["figure.figsize"] = (6,6)
     fig, ax = plt.subplots()
@@ -44,8 +68,9 @@ def plot_ys(sy=300, r0=1.2, r90=1.8, a=8):
     ax.plot(xM,yM, 'g-', label=r'Mises')
     ax.plot(xI,yI, 'r--', label=r'Hill')
     ax.plot(xH,yH, 'b:', label=r'Hosford')
-    ax.annotate(r'$\Delta r = %0.3f$' % planar_anisotropy(r0, r90), xy=(500,700))
-    ax.annotate(r'$\overline{r} = %0.3f$' % normal_anisotropy(r0, r90), xy=(500,600))
+    ax.annotate(r'$\Delta r = %0.3f$' % planar_anisotropy(r0, r90, r45), xy=(500,700))
+    ax.annotate(r'$\overline{r} = %0.3f$' % normal_anisotropy(r0, r90, r45), xy=(500,600))
+    ax.annotate(r'$r_{45} = %0.3f$' % r45, xy=(500,500))
     ax.axis([-800, 800, -800, 800])
     ax.set_aspect('equal')
     ax.set_xlabel(r'$\sigma_2$')
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Incremental elastic-plastic integration in plane stress (s3 = 0) along
+arbitrary strain paths, with the principal axes fixed along the rolling (1)
+and transverse (2) directions.
+
+Yield: Hosford effective stress (anisotropy.eff_stress_Hosford_batch), which
+reduces to Mises for a = 2 and r0 = r90 = 1.
+Hardening: Swift s = K(e0+ep)^n, or Hollomon s = K*ep^n when e0 = 0.
+Return mapping: elastic predictor and closest-point (backward Euler) plastic
+corrector solved with Newton iterations.
+
+All the functions work on stacked arrays: strain paths have shape
+(N, steps+1, 2) with the (e1, e2) components in the last axis.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import anisotropy as an
+
+EP_MIN = 1e-6   # Hollomon: hardening is evaluated at ep >= EP_MIN (infinite slope at ep = 0)
+
+def elastic_matrix(E, nu):
+    ''' Plane stress elastic matrix'''
+    return E/(1-nu**2)*np.array([[1, nu], [nu, 1]])
+
+def hardening(ep, K, n, e0=0):
+    ''' Flow stress and hardening slope of s = K(e0+ep)^n'''
+    e = np.maximum(e0+ep, EP_MIN)
+    sy = K*e**n
+    return sy, n*sy/e
+
+def normal(s, r0=1, r90=1, a=2, hessian=False):
+    ''' Effective stress and its gradient (plastic flow direction) for arrays of (s1, s2)'''
+    s1, s2 = s[..., 0], s[..., 1]
+    seff = an.eff_stress_Hosford_batch(s1, s2, r0, r90, a)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        u1, u2 = s1/seff, s2/seff
+    ud = u1-u2
+    pw = lambda x: np.abs(x)**(a-1)*np.sign(x)
+    c = 1/(r90*(1+r0))
+    n1 = c*(r90*pw(u1) + r0*r90*pw(ud))
+    n2 = c*(r0*pw(u2) - r0*r90*pw(ud))
+    nrm = np.stack((n1, n2), axis=-1)
+    if not hessian:
+        return seff, nrm
+    # second derivatives of the effective stress
+    h1, h2, hd = r90*np.abs(u1)**(a-2), r0*np.abs(u2)**(a-2), r0*r90*np.abs(ud)**(a-2)
+    g = np.stack((np.stack((h1+hd, -hd), axis=-1), np.stack((-hd, h2+hd), axis=-1)), axis=-2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hess = (a-1)*(c*g - nrm[..., :, None]*nrm[..., None, :])/seff[..., None, None]
+    return seff, nrm, hess
+
+def strain_paths(beta, de1, steps=50):
+    ''' Piecewise linear strain paths, shape (N, stages*steps+1, 2)
+
+    beta and de1, shape (N, stages): strain ratio e2/e1 and increment of major
+    strain in each stage (e.g. two-stage forming with stages = 2).'''
+    beta = np.atleast_2d(np.asarray(beta, dtype=float))
+    de1 = np.atleast_2d(np.asarray(de1, dtype=float))
+    beta, de1 = np.broadcast_arrays(beta, de1)
+    dstage = np.stack((de1, beta*de1), axis=-1)/steps   # (N, stages, 2)
+    dstrain = np.repeat(dstage, steps, axis=1)
+    zero = np.zeros((dstrain.shape[0], 1, 2))
+    return np.concatenate((zero, np.cumsum(dstrain, axis=1)), axis=1)
+
+def closest_point(strial, ep, K, n, e0, Ci, r0=1, r90=1, a=2, tol=1e-8, maxiter=50):
+    ''' Plastic corrector: solves C^-1 (s - strial) + dl*n(s) = 0 and seff(s) = sy(ep+dl)
+
+    Newton iterations with backtracking on the residual norm, needed by the
+    sharp corners of the Hosford surface for large exponents a; a point whose
+    residual is not reduced by 10 halvings of the step stops there. Returns
+    the stress, the increment of effective plastic strain and whether each
+    point converged (within maxiter).'''
+    E = 1/Ci[0, 0]
+    def residual(s, dl, i):
+        seff, nrm, hess = normal(s, r0, r90, a, hessian=True)
+        sy, H = hardening(ep[i]+dl, K[i], n[i], e0[i])
+        f = seff - sy
+        G = (s-strial[i]) @ Ci + dl[:, None]*nrm
+        return f, G, nrm, hess, sy, H, (f/E)**2 + np.einsum('ij,ij->i', G, G)
+
+    s = strial.copy()
+    dl = np.zeros(len(s))
+    converged = np.zeros(len(s), dtype=bool)
+    i = np.arange(len(s))   # points not converged yet
+    f, G, nrm, hess, sy, H, res = residual(s, dl, i)
+    for it in range(maxiter):
+        conv = (np.abs(f) <= tol*sy) & np.all(np.abs(G) <= tol, axis=-1)
+        converged[i[conv]] = True
+        i, f, G, nrm, hess, sy, H, res = [j[~conv] for j in (i, f, G, nrm, hess, sy, H, res)]
+        if not i.size:
+            break
+        X = np.linalg.inv(Ci + dl[i, None, None]*hess)
+        Xn = np.einsum('ijk,ik->ij', X, nrm)
+        ddl = (f - np.einsum('ij,ij->i', Xn, G))/(np.einsum('ij,ij->i', Xn, nrm) + H)
+        ds = -np.einsum('ijk,ik->ij', X, G) - ddl[:, None]*Xn
+        step = np.ones(i.size)
+        for k in range(10):
+            dl1 = np.maximum(dl[i] + step*ddl, 0)
+            s1 = s[i] + step[:, None]*ds
+            f1, G1, nrm1, hess1, sy1, H1, res1 = residual(s1, dl1, i)
+            worse = ~(res1 < res)
+            if not worse.any():
+                break
+            step = np.where(worse, step/2, step)
+        # steps that do not reduce the residual are rejected and the point stops
+        ok = ~worse
+        s[i[ok]], dl[i[ok]] = s1[ok], dl1[ok]
+        i, f, G, nrm, hess, sy, H, res = [j[ok] for j in (i, f1, G1, nrm1, hess1, sy1, H1, res1)]
+    else:
+        conv = (np.abs(f) <= tol*sy) & np.all(np.abs(G) <= tol, axis=-1)
+        converged[i[conv]] = True
+    return s, dl, converged
+
+def integrate(strain, E, nu, K, n, e0=0, r0=1, r90=1, a=2, tol=1e-8, maxiter=50):
+    ''' Integrates stacked strain histories (N, m, 2) starting from a virgin state
+
+    Returns the stress (N, m, 2), the plastic strain (N, m, 2), the
+    effective plastic strain (N, m) and whether the plastic corrector of each
+    increment converged (N, m) (True for elastic increments).'''
+    strain = np.asarray(strain, dtype=float)
+    N, m = strain.shape[:2]
+    K, n, e0 = [np.broadcast_to(np.asarray(i, dtype=float), (N,)) for i in (K, n, e0)]
+    C = elastic_matrix(E, nu)
+    Ci = np.linalg.inv(C)
+
+    stress = np.zeros((N, m, 2))
+    plastic = np.zeros((N, m, 2))
+    ep = np.zeros((N, m))
+    converged = np.ones((N, m), dtype=bool)
+    for k in range(1, m):
+        # elastic predictor
+        strial = stress[:, k-1] + (strain[:, k]-strain[:, k-1]) @ C
+        seff = an.eff_stress_Hosford_batch(strial[:, 0], strial[:, 1], r0, r90, a)
+        sy, H = hardening(ep[:, k-1], K, n, e0)
+        plastic_ = np.flatnonzero(seff - sy > tol*sy)
+        stress[:, k] = strial
+        plastic[:, k] = plastic[:, k-1]
+        ep[:, k] = ep[:, k-1]
+        if not plastic_.size:
+            continue
+
+        st = strial[plastic_]
+        s, dl, converged[plastic_, k] = closest_point(st, ep[plastic_, k-1], K[plastic_], n[plastic_], e0[plastic_], Ci, r0, r90, a, tol, maxiter)
+        stress[plastic_, k] = s
+        plastic[plastic_, k] += (st-s) @ Ci
+        ep[plastic_, k] += dl
+    return stress, plastic, ep, converged
+
+def thickness_strain(stress, plastic, E, nu):
+    ''' Total thickness strain e3 (elastic + plastic) in plane stress'''
+    return -nu/E*(stress[..., 0]+stress[..., 1]) - (plastic[..., 0]+plastic[..., 1])
+
+def plot_paths(strain, stress, ep, K, n, e0=0, r0=1, r90=1, a=2):
+    ''' Strain paths and stress paths, with the final yield surface of the first path'''
+    fig, ax = plt.subplots(1, 2, figsize=(12,6))
+    ax[0].axvline(x=0, color='k', linewidth=0.2)
+    ax[0].axhline(y=0, color='k', linewidth=0.2)
+    for i in range(len(strain)):
+        ax[0].plot(strain[i, :, 1], strain[i, :, 0], '-')
+        ax[1].plot(stress[i, :, 1], stress[i, :, 0], '-')
+    ax[0].set_xlabel(r'$\varepsilon_2$')
+    ax[0].set_ylabel(r'$\varepsilon_1$')
+    ax[0].set_aspect('equal', adjustable='datalim')
+
+    sy, H = hardening(ep[0, -1], K, n, e0)
+    theta = np.linspace(0, 2*np.pi, 361)
+    d = np.stack((np.cos(theta), np.sin(theta)), axis=-1)
+    seff, nrm = normal(d, r0, r90, a)
+    ax[1].plot(sy*d[:, 1]/seff, sy*d[:, 0]/seff, 'k:', label=r'Yield surface at $\overline{\varepsilon}=%0.3f$' % ep[0, -1])
+    ax[1].axvline(x=0, color='k', linewidth=0.2)
+    ax[1].axhline(y=0, color='k', linewidth=0.2)
+    ax[1].set_xlabel(r'$\sigma_2$')
+    ax[1].set_ylabel(r'$\sigma_1$')
+    ax[1].set_aspect('equal', adjustable='datalim')
+    ax[1].legend(loc='lower right')
+    plt.show()
+
+
+if __name__ == "__main__":
+    E, nu = 210e3, 0.3
+    K, n = 500, 0.22
+    # two-stage forming: biaxial stretching followed by uniaxial tension
+    strain = strain_paths([[1, -0.5], [0, -0.5], [-0.5, 1]], [[0.1, 0.1], [0.1, 0.1], [0.1, 0.1]])
+    stress, plastic, ep, converged = integrate(strain, E, nu, K, n, r0=1.2, r90=1.8, a=8)
+    print('Effective plastic strain at the end of the paths:', ep[:, -1])
+    print('Increments not converged: %d of %d' % ((~converged).sum(), converged.size))
+    plot_paths(strain, stress, ep, K, n, r0=1.2, r90=1.8, a=8)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+r-values and Hosford exponent of coils from tensile tests at 0, 45 and 90
+degrees to the rolling direction.
+
+r-value of each specimen: slope of the width strain over the thickness
+strain, e_t = -(e_l + e_w) (constant volume), for the points with the
+longitudinal strain e_l in a range (ASTM E517), all the specimens at once as
+arrays (specimens, points) padded with nan. The r-values of a coil are the
+means of its specimens in each direction, with r-bar and delta-r from
+anisotropy.normal_anisotropy and planar_anisotropy.
+
+Hosford exponent a of anisotropy.eff_stress_Hosford: with r0 and r90, the
+yield stress ratios of the uniaxial test at 90 degrees and of an equibiaxial
+(bulge) test, if any, are
+    ln(s90/s0) = ln(r90(1+r0)/(r0(1+r90)))/a,   ln(sb/s0) = ln(r90(1+r0)/(r0+r90))/a
+so 1/a is fitted by linear least squares. It is not defined when r0 = r90
+and there is no biaxial test (nan, or the default exponent).
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+import anisotropy as an
+
+ANGLES = (0, 45, 90)
+BIAXIAL = -1   # angle code of the equibiaxial (bulge) tests
+
+_source = {}
+
+def is_number(x):
+    ''' Whether the string x is a number (as functions.is_number of 01_plasticity)'''
+    try:
+        float(x)
+        return True
+    except ValueError:
+        return False
+
+def r_value(el, ew, emin=0.02, emax=0.15):
+    ''' r-value of each specimen, slope of e_w over e_t through the origin
+    for emin <= e_l <= emax (el, ew: arrays (specimens, points))'''
+    el = np.atleast_2d(np.asarray(el, dtype=float))
+    ew = np.atleast_2d(np.asarray(ew, dtype=float))
+    et = -(el + ew)
+    mask = np.isfinite(el) & np.isfinite(ew) & (el >= emin) & (el <= emax)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sum(np.where(mask, ew*et, 0), axis=-1)/np.sum(np.where(mask, et**2, 0), axis=-1)
+
+def hosford_exponent(r0, r90, s90_s0=np.nan, sb_s0=np.nan, default=np.nan):
+    ''' Hosford exponent from the yield stress ratios (nan ratios are not used)'''
+    r0, r90, s90_s0, sb_s0 = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (r0, r90, s90_s0, sb_s0)])
+    c = np.stack((np.log(r90*(1+r0)/(r0*(1+r90))), np.log(r90*(1+r0)/(r0+r90))), axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y = np.log(np.stack((s90_s0, sb_s0), axis=-1))
+    used = np.isfinite(y)
+    c, y = np.where(used, c, 0), np.where(used, y, 0)
+    cc = np.sum(c**2, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inv_a = np.sum(c*y, axis=-1)/cc
+        a = np.where((cc > 1e-6) & (inv_a > 0), 1/inv_a, default)
+    return a
+
+def coil_table(coil, angle, r, stress=None):
+    ''' Means per coil and direction (one row per coil, sorted by coil)'''
+    coils, idx = np.unique(np.asarray(coil).astype(str), return_inverse=True)
+    angle = np.asarray(angle)
+    stress = np.full(len(angle), np.nan) if stress is None else np.asarray(stress, dtype=float)
+    out = {'coil': coils}
+    for ang, name in ((0, '0'), (45, '45'), (90, '90'), (BIAXIAL, 'b')):
+        sel = angle == ang
+        for key, values in (('r', r), ('s', stress)):
+            v = np.where(sel & np.isfinite(values), values, 0)
+            m = np.bincount(idx, weights=(sel & np.isfinite(values)).astype(float), minlength=len(coils))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[key+name] = np.bincount(idx, weights=v, minlength=len(coils))/m
+    return out
+
+def fit_coils(coil, angle, el, ew, stress=None, emin=0.02, emax=0.15, default_a=np.nan):
+    ''' r-values, r-bar, delta-r and Hosford exponent of each coil'''
+    r = r_value(el, ew, emin, emax)
+    t = coil_table(coil, angle, r, stress)
+    a = hosford_exponent(t['r0'], t['r90'], t['s90']/t['s0'], t['sb']/t['s0'], default_a)
+    return {'coil': t['coil'], 'r0': t['r0'], 'r45': t['r45'], 'r90': t['r90'],
+            'rbar': an.normal_anisotropy(t['r0'], t['r90'], t['r45']),
+            'dr': an.planar_anisotropy(t['r0'], t['r90'], t['r45']), 'a': a}
+
+def read_tests(filename):
+    ''' Reads a CSV file with rows coil, specimen, angle, e_l, e_w[, yield stress],
+    consecutive for each specimen (a header row is skipped). Returns the coil,
+    angle and yield stress of each specimen and the strains (specimens, points)'''
+    with open(filename, newline='') as fp:
+        rows = csv.reader(fp)
+        first = next(rows, None)
+        if first is not None and is_number(first[2]):   # no header row
+            rows = itertools.chain([first], rows)
+        specimens = [list(g) for k, g in itertools.groupby(rows, key=lambda row: (row[0], row[1]))]
+    m = max((len(s) for s in specimens), default=0)
+    el = np.full((len(specimens), m), np.nan)
+    ew = np.full((len(specimens), m), np.nan)
+    for j, s in enumerate(specimens):
+        e = np.array([row[3:5] for row in s], dtype=float)
+        el[j, :len(e)], ew[j, :len(e)] = e[:, 0], e[:, 1]
+    coil = np.array([s[0][0] for s in specimens])
+    angle = np.array([float(s[0][2]) for s in specimens])
+    stress = np.array([float(s[0][5]) if len(s[0]) > 5 and s[0][5] != '' else np.nan for s in specimens])
+    return coil, angle, el, ew, stress
+
+def source_hash():
+    ''' Hash of the source of the fit (this file and anisotropy)'''
+    if not _source:
+        h = hashlib.sha256()
+        for f in (__file__, an.__file__):
+            with open(f, 'rb') as fh:
+                h.update(fh.read())
+        _source['hash'] = h.hexdigest()
+    return _source['hash']
+
+def _coil_hash(el, ew, angle, stress, emin, emax, default_a):
+    # the points of each specimen without the nan padding, which depends on the longest specimen of the file
+    h = hashlib.sha256(source_hash().encode())
+    for a, b in zip(el, ew):
+        n = np.flatnonzero(np.isfinite(a) | np.isfinite(b))
+        n = n[-1]+1 if len(n) else 0
+        h.update(np.array([n], dtype=float).tobytes())
+        h.update(np.ascontiguousarray(a[:n], dtype=float).tobytes())
+        h.update(np.ascontiguousarray(b[:n], dtype=float).tobytes())
+    for x in (angle, stress, np.array([emin, emax, default_a])):
+        h.update(np.ascontiguousarray(x, dtype=float).tobytes())
+    return h.hexdigest()
+
+def _fit_group(args):
+    return fit_coils(*args)
+
+def fit_lab(coil, angle, el, ew, stress=None, emin=0.02, emax=0.15, default_a=np.nan,
+            cache=None, workers=None, chunk=500):
+    ''' fit_coils for large datasets: coils whose tests, options and fitting
+    code (source_hash) have not changed are taken from the cache (JSON file), the rest are fitted by chunks of coils
+    in parallel processes (workers=1: no processes)'''
+    coil = np.asarray(coil).astype(str)
+    stress = np.full(len(coil), np.nan) if stress is None else np.asarray(stress, dtype=float)
+    stored = {}
+    if cache and os.path.exists(cache):
+        with open(cache) as fp:
+            stored = json.load(fp)
+    order = np.argsort(coil, kind='stable')
+    names, start = np.unique(coil[order], return_index=True)
+    groups = np.split(order, start[1:])
+    keys = {c: _coil_hash(el[g], ew[g], angle[g], stress[g], emin, emax, default_a) for c, g in zip(names, groups)}
+    todo = [g for c, g in zip(names, groups) if stored.get(c, {}).get('hash') != keys[c]]
+    jobs = []
+    for i in range(0, len(todo), chunk):
+        g = np.concatenate(todo[i:i+chunk])
+        jobs.append((coil[g], angle[g], el[g], ew[g], stress[g], emin, emax, default_a))
+    if workers == 1 or len(jobs) <= 1:
+        results = list(map(_fit_group, jobs))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_fit_group, jobs))
+    for res in results:
+        for j, c in enumerate(res['coil']):
+            stored[c] = dict({k: float(v[j]) for k, v in res.items() if k != 'coil'}, hash=keys[c])
+    if cache:
+        with open(cache, 'w') as fp:
+            json.dump(stored, fp)
+    fields = ('r0', 'r45', 'r90', 'rbar', 'dr', 'a')
+    out = {'coil': names}
+    out.update({k: np.array([stored[c][k] for c in names]) for k in fields})
+    return out, len(todo)
+
+def update_materials(filename, table, columns=None):
+    ''' Merges the columns of the table (dict of arrays with 'id') into the
+    materials CSV file, one row per id (new ids are appended; as
+    hardening_fit.update_materials of 01_plasticity)'''
+    columns = columns or [k for k in table if k != 'id']
+    rows, fields = {}, ['id']
+    if os.path.exists(filename):
+        with open(filename, newline='') as fp:
+            reader = csv.DictReader(fp)
+            fields = list(reader.fieldnames)
+            rows = {row['id']: row for row in reader}
+    fields += [k for k in columns if k not in fields]
+    for j, i in enumerate(np.asarray(table['id']).astype(str)):
+        row = rows.setdefault(i, {'id': i})
+        row.update({k: '%.6g' % table[k][j] for k in columns})
+    with open(filename, 'w', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows.values())
+    return len(rows)
+
+def to_materials(filename, res):
+    ''' Writes the fitted coils into the materials CSV file (id = coil)'''
+    return update_materials(filename, dict(res, id=res['coil']), ['r0', 'r45', 'r90', 'rbar', 'dr', 'a'])
+
+def plot_r(el, ew, r, i=0, emin=0.02, emax=0.15):
+    ''' Width strain over thickness strain of one specimen and the fitted r-value'''
+    et = -(el[i] + ew[i])
+    fig, ax = plt.subplots()
+    ax.plot(-et, -ew[i], 'k.', ms=3, label='Test')
+    sel = (el[i] >= emin) & (el[i] <= emax)
+    ax.plot(-et[sel], -r[i]*et[sel], 'r-', label=r'$r=%.3f$' % r[i])
+    ax.set_xlabel(r'Thickness strain, $-\varepsilon_t$')
+    ax.set_ylabel(r'Width strain, $-\varepsilon_w$')
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    # synthetic lab data: 2000 coils x 3 directions x 3 specimens + 1 bulge test per coil
+    rng = np.random.default_rng(0)
+    coils = 2000
+    R = {0: rng.uniform(0.8, 2.2, coils), 45: rng.uniform(0.8, 2.2, coils), 90: rng.uniform(0.8, 2.2, coils)}
+    a_true = rng.choice([6., 8.], coils)
+    Y = rng.uniform(150, 300, coils)
+    coil, angle, el, ew, stress = [], [], [], [], []
+    e = np.linspace(0, 0.2, 100)
+    for ang in ANGLES + (BIAXIAL,):
+        for k in range(3 if ang != BIAXIAL else 1):
+            coil.append(np.arange(coils))
+            angle.append(np.full(coils, ang))
+            r = R[ang] if ang != BIAXIAL else np.ones(coils)
+            el.append(np.outer(np.ones(coils), e))
+            ew.append(-np.outer(r/(1+r), e) + rng.normal(0, 2e-4, (coils, len(e))))
+            if ang == 0:
+                s = Y
+            elif ang == 90:
+                s = Y*(R[90]*(1+R[0])/(R[0]*(1+R[90])))**(1/a_true)
+            elif ang == BIAXIAL:
+                s = Y*(R[90]*(1+R[0])/(R[0]+R[90]))**(1/a_true)
+            else:
+                s = np.full(coils, np.nan)
+            stress.append(s*(1 + rng.normal(0, 1e-3, coils)))
+    coil, angle, stress = [np.concatenate(x) for x in (coil, angle, stress)]
+    el, ew = np.concatenate(el), np.concatenate(ew)
+
+    res, fitted = fit_lab(coil, angle, el, ew, stress, cache='rvalue_cache.json', workers=1)
+    i = res['coil'].astype(int)
+    print('%d coils fitted; max. error r0 %.4f, r90 %.4f; median error a %.2f'
+          % (fitted, np.abs(res['r0']-R[0][i]).max(), np.abs(res['r90']-R[90][i]).max(), np.nanmedian(np.abs(res['a']-a_true[i]))))
+    res, fitted = fit_lab(coil, angle, el, ew, stress, cache='rvalue_cache.json', workers=1)
+    print('Second run: %d coils fitted (the rest from the cache)' % fitted)
+    os.remove('rvalue_cache.json')
+    plot_r(el, ew, r_value(el, ew))
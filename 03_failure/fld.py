@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Forming limit diagram (FLD) assessment of the strains of a full part mesh.
+
+Each element (e1, e2) is classified as:
+  SAFE      below the marginal zone
+  MARGINAL  e1 >= (1-margin)*e1_lim(beta)
+  NECKING   e1 >= e1_lim(beta)            (Swift/Hill forming limit curve)
+  FRACTURE  e1+e2 >= e3f                  (fracture limit line, as in examen_2019_SPIF)
+
+The forming limit curve is precomputed once as a table of e1_lim on a
+uniform grid of beta = e2/e1, and interpolated with index arithmetic.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import necking_paths as nkp
+
+SAFE, MARGINAL, NECKING, FRACTURE = 0, 1, 2, 3
+LABELS = ('Safe', 'Marginal', 'Necking', 'Fracture')
+COLORS = ('g', 'y', 'r', 'k')
+
+def limit_table(n, criterion='hill', bmin=-0.9, bmax=1, size=2001):
+    ''' Table of the limit major strain e1_lim on a uniform grid of beta'''
+    beta = np.linspace(bmin, bmax, size)
+    e1 = nkp.limit_eff_strain(beta, n, criterion)/nkp.eff_strain(1, beta)
+    return {'bmin': bmin, 'db': (bmax-bmin)/(size-1), 'e1': e1}
+
+def limit_e1(beta, table):
+    ''' Limit major strain interpolated from the table (beta is clipped to its range)'''
+    e1 = table['e1']
+    x = np.clip((beta-table['bmin'])/table['db'], 0, len(e1)-1)
+    i = np.minimum(x.astype(np.intp), len(e1)-2)
+    w = x-i
+    return (1-w)*e1[i] + w*e1[i+1]
+
+def assess(strain, table, e3f=np.inf, margin=0.1, chunk=10**6):
+    ''' Classifies the strains (N, 2) of a mesh and computes the thinning margin
+
+    Returns the class of each element (uint8) and the thinning margin, i.e. the
+    thickness strain left before reaching the forming limit along the same
+    beta, (1+beta)*(e1_lim - e1) with beta clipped to the range of the table
+    as for the class (negative when the element is over the limit).'''
+    strain = np.asarray(strain)
+    N = len(strain)
+    state = np.empty(N, dtype=np.uint8)
+    thinning = np.empty(N)
+    bmax = table['bmin'] + table['db']*(len(table['e1'])-1)
+    for i in range(0, N, chunk):
+        e1 = strain[i:i+chunk, 0].astype(float)
+        e2 = strain[i:i+chunk, 1].astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            beta = np.where(e1 > 0, e2/e1, 0)
+        e1lim = limit_e1(beta, table)
+        e3 = e1+e2
+        s = np.where(e1 >= (1-margin)*e1lim, MARGINAL, SAFE)
+        s[e1 >= e1lim] = NECKING
+        s[e3 >= e3f] = FRACTURE
+        state[i:i+chunk] = s
+        thinning[i:i+chunk] = np.where(e1 > 0, (1+np.clip(beta, table['bmin'], bmax))*(e1lim - e1), np.inf)
+    return state, thinning
+
+def summary(state):
+    ''' Number of elements of each class'''
+    return dict(zip(LABELS, np.bincount(state, minlength=len(LABELS)).tolist()))
+
+def plot_fld(strain, state, table, e3f=np.inf, margin=0.1, max_points=20000):
+    ''' FLD with the forming limit curve, the marginal zone and (a sample of) the mesh strains'''
+    strain = np.asarray(strain)
+    step = max(1, len(strain)//max_points)
+    beta = np.linspace(table['bmin'], table['bmin']+table['db']*(len(table['e1'])-1), len(table['e1']))
+
+    fig, ax = plt.subplots(figsize=(6,6))
+    ax.axvline(x=0, color='k', lw=0.2)
+    ax.plot(beta*table['e1'], table['e1'], 'r-', label='Forming limit')
+    ax.plot(beta*(1-margin)*table['e1'], (1-margin)*table['e1'], 'y--', label='Marginal zone')
+    if np.isfinite(e3f):
+        ax.plot([-e3f, e3f/2], [2*e3f, e3f/2], 'k-', label='Fracture limit')
+    for s in range(len(LABELS)):
+        e = strain[::step][state[::step] == s]
+        ax.plot(e[:, 1], e[:, 0], '.', color=COLORS[s], ms=1)
+    ax.axis([-0.5, 0.5, 0, 1])
+    ax.set_aspect('equal')
+    ax.set_xlabel(r'$\varepsilon_2$')
+    ax.set_ylabel(r'$\varepsilon_1$')
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    n = 0.22
+    table = limit_table(n)
+    rng = np.random.default_rng(0)
+    strain = np.stack((rng.uniform(0, 0.5, 10**6), rng.uniform(-0.2, 0.3, 10**6)), axis=-1)
+    state, thinning = assess(strain, table, e3f=0.6)
+    print(summary(state))
+    plot_fld(strain, state, table, e3f=0.6)
@@ -9,6 +9,26 @@ from math import sqrt
 import numpy as np
 import matplotlib.pyplot as plt
 
+TOL = 5e-4   # maximum distance of the limit curves to their chords (strain)
+
+def adaptive_curve(curve, t0, t1, tol, n0=16, max_points=100000):
+    ''' Samples the curve (x, y) = curve(t), t0 <= t <= t1, refining only the
+    intervals whose midpoint is farther than tol from the chord. Returns t, x, y
+    (same as functions.adaptive_curve of 01_plasticity)'''
+    t = np.linspace(t0, t1, n0)
+    x, y = curve(t)
+    while len(t) < max_points:
+        tm = (t[1:]+t[:-1])/2
+        xm, ym = curve(tm)
+        refine = np.hypot(xm-(x[1:]+x[:-1])/2, ym-(y[1:]+y[:-1])/2) > tol
+        if not refine.any():
+            break
+        i = np.flatnonzero(refine)+1
+        t = np.insert(t, i, tm[refine])
+        x = np.insert(x, i, xm[refine])
+        y = np.insert(y, i, ym[refine])
+    return t, x, y
+
 
 def a(b):
     return (2*b+1)/(2+b)
@@ -29,12 +49,37 @@ def e1h(beta, n, e0=0):
 def e2h(b, n, e0=0):
     return b*e1h(b, n, e0)
 
+# Array versions of the limit strains and adaptive sampling of the limit curves
+
+def e1s_batch(b, n, m=0):
+    a_ = a(b)
+    return n/(1-m)*np.sqrt(3)/(2*np.sqrt(1+b+b**2)) * 4*(1-a_+a_**2)**(3/2) / ((2-a_)**2 + (2*a_-1)**2*a_)
+
+def e1h_batch(beta, n, e0=0, m=0):
+    return n/(1-m)/(1+beta) - e0*np.sqrt(3)/2*np.sqrt(1+beta+beta**2)
+
+# Rate-sensitive materials, s = K*e^n*rate^m (Hart): the neck grows when the
+# hardening rate d(ln s)/d(eeff) falls below z(beta)*(1-m), where z(beta) is the
+# threshold of the rate-independent criterion (the limit strains are those of n/(1-m))
+
+def z_swift_batch(b):
+    return np.sqrt(3)/(2*np.sqrt(1+b+b**2))/e1s_batch(b, 1)
+
+def z_hill_batch(beta):
+    return np.sqrt(3)/2*(1+beta)/np.sqrt(1+beta+beta**2)
+
+def swift_curve(n, b0=-0.99, b1=1):
+    b, e2, e1 = adaptive_curve(lambda b: (b*e1s_batch(b, n), e1s_batch(b, n)), b0, b1, TOL)
+    return e2, e1
+
+def hill_curve(n, e0=0, b0=-0.99, b1=0):
+    b, e2, e1 = adaptive_curve(lambda b: (b*e1h_batch(b, n, e0), e1h_batch(b, n, e0)), b0, b1, TOL)
+    return e2, e1
+
 
 
 def plot_Swift(n):
-    beta = np.linspace(-0.99, 1, 100)
-    e10 = [e1s(b, n) for b in beta]
-    e20 = [e2s(b, n) for b in beta]
+    e20, e10 = swift_curve(n)
     
     fig, ax = plt.subplots(figsize=(6,6))
     ax.axvline(x=0, color='k', lw=0.2)
@@ -54,12 +99,8 @@ def plot_Swift(n):
     plt.show()
 
 def plot_Swift_Hill(n):
-    beta = np.linspace(-0.99, 1, 100)
-    beta1 = np.linspace(-0.99, 0, 100)
-    e10 = [e1s(b, n) for b in beta]
-    e20 = [e2s(b, n) for b in beta]
-    e11 = [e1h(b, n) for b in beta1]
-    e21 = [e2h(b, n) for b in beta1]
+    e20, e10 = swift_curve(n)
+    e21, e11 = hill_curve(n)
     
     fig, ax = plt.subplots(figsize=(6,6))
     ax.axvline(x=0, color='k', lw=0.2)
@@ -81,9 +122,7 @@ def plot_Swift_Hill(n):
     plt.show()
 
 def plot_Hill(n, e0=[]):
-    b = np.linspace(-0.99, 0, 100)
-    e10 = [e1h(beta, n) for beta in b]
-    e20 = [e2h(beta, n) for beta in b]
+    e20, e10 = hill_curve(n)
     
     fig, ax = plt.subplots(figsize=(6,6))
     ax.axvline(x=0, color='k', lw=0.2)
@@ -92,8 +131,7 @@ def plot_Hill(n, e0=[]):
     ax.plot(e20, e10, label=r'$\varepsilon_0 = 0$')
     
     for e0_ in e0:
-        e11 = [e1h(beta, n, e0_) for beta in b]
-        e21 = [e2h(beta, n, e0_) for beta in b]
+        e21, e11 = hill_curve(n, e0_)
         
         ax.plot(e21, e11, label=r'$\varepsilon_0 = %s$' % e0_)
     
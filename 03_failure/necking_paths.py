@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Forming limits along non-proportional strain paths.
+
+A path is a sequence of (e1, e2) vertices joined by straight segments, as
+given by the stamping solvers or by DIC measurements. The effective (Mises)
+strain is accumulated segment by segment and compared with the limit
+effective strain of the current strain ratio beta = de2/de1:
+
+    Swift:  e_lim(beta) = 2/sqrt(3)*sqrt(1+beta+beta^2) * e1s(beta, n)
+    Hill:   e_lim(beta) = 2/sqrt(3)*sqrt(1+beta+beta^2) * e1h(beta, n)   (beta <= 0)
+
+For a pre-strain e0 (effective strain) followed by a straight path, the
+remaining major strain is e_lim(beta)/(2/sqrt(3)*sqrt(1+beta+beta^2)) minus
+e0*sqrt(3)/(2*sqrt(1+beta+beta^2)), i.e. Hill's condition for s = K(e0+e)^n.
+
+Paths are stacked in arrays of shape (N, m, 2). Shorter paths can be padded
+by repeating their last vertex (zero-length segments are skipped).
+"""
+
+import itertools
+import numpy as np
+import matplotlib.pyplot as plt
+import necking as nk
+
+def eff_strain(de1, de2):
+    ''' Effective strain (Mises) of a proportional strain increment'''
+    return 2/np.sqrt(3)*np.sqrt(de1**2+de1*de2+de2**2)
+
+def limit_eff_strain(beta, n, criterion='hill', m=0):
+    ''' Limit effective strain for the strain ratio beta
+
+    criterion: 'swift', or 'hill' (Hill for beta <= 0 and Swift for beta > 0);
+    m: strain rate sensitivity (necking.z_swift_batch)'''
+    beta = np.asarray(beta, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        e1 = nk.e1s_batch(beta, n, m)
+        if criterion == 'hill':
+            e1 = np.where(beta <= 0, nk.e1h_batch(beta, n, m=m), e1)
+        elif criterion != 'swift':
+            raise ValueError('Unknown necking criterion: %s' % criterion)
+        return e1*eff_strain(1, beta)
+
+def evaluate(paths, n, criterion='hill'):
+    ''' Remaining formability of stacked strain paths (N, m, 2)
+
+    Returns a dict of arrays (N,):
+      eeff:      accumulated effective strain at the end of the path
+      beta:      strain ratio of the last segment
+      elim:      limit effective strain for that strain ratio
+      ratio:     eeff/elim (necking when >= 1)
+      de1:       remaining major strain along the last direction (< 0 after necking)
+      necked:    the limit is reached somewhere along the path
+      e_neck:    (e1, e2) where the limit is first reached (nan if never)'''
+    paths = np.asarray(paths, dtype=float)
+    N = paths.shape[0]
+    n = np.broadcast_to(np.asarray(n, dtype=float), (N,))[:, None]
+    d = np.diff(paths, axis=1)
+    de1, de2 = d[..., 0], d[..., 1]
+    deff = eff_strain(de1, de2)
+    eeff = np.concatenate((np.zeros((N, 1)), np.cumsum(deff, axis=1)), axis=1)
+
+    # strain ratio of each segment, carried over the zero-length ones
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = np.where((deff > 0) & (de1 > 0), de2/de1, np.nan)
+    last = np.maximum.accumulate(np.where(np.isnan(beta), -1, np.arange(beta.shape[1])), axis=1)
+    beta = np.take_along_axis(beta, np.maximum(last, 0), axis=1)
+    elim = limit_eff_strain(beta, n, criterion)
+
+    # first segment that ends over the limit: it is crossed inside the segment,
+    # or at its start when a change of path lowers the limit below the strain reached
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cross = eeff[:, 1:] >= elim
+        k = np.argmax(cross, axis=1)
+        necked = cross[np.arange(N), k]
+        dk = deff[np.arange(N), k]
+        w = np.where(dk > 0, np.clip((elim[np.arange(N), k] - eeff[np.arange(N), k])/dk, 0, 1), 0)
+    e_neck = paths[np.arange(N), k] + w[:, None]*d[np.arange(N), k]
+    e_neck[~necked] = np.nan
+
+    b, el = beta[:, -1], elim[:, -1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {'eeff': eeff[:, -1], 'beta': b, 'elim': el, 'ratio': eeff[:, -1]/el,
+                'de1': (el-eeff[:, -1])/eff_strain(1, b), 'necked': necked, 'e_neck': e_neck}
+
+def read_paths(filename, chunk=100000):
+    ''' Reads strain paths by chunks of paths, shape (chunk, m, 2)
+
+    .npy files (N, m, 2) are memory-mapped. Text files (csv) have one path per
+    row: e1_0, e2_0, e1_1, e2_1, ...'''
+    if filename.endswith('.npy'):
+        paths = np.load(filename, mmap_mode='r')
+        for i in range(0, len(paths), chunk):
+            yield np.asarray(paths[i:i+chunk])
+        return
+    with open(filename) as fp:
+        while True:
+            lines = list(itertools.islice(fp, chunk))
+            if not lines:
+                break
+            data = np.loadtxt(lines, delimiter=',', ndmin=2)
+            yield data.reshape(len(data), -1, 2)
+
+def evaluate_file(filename, n, criterion='hill', chunk=100000):
+    ''' Evaluates the strain paths of a file by chunks, yielding one dict per chunk'''
+    for paths in read_paths(filename, chunk):
+        yield evaluate(paths, n, criterion)
+
+def plot_paths(paths, n, criterion='hill'):
+    ''' Strain paths over the forming limit curve, with the limit point of each path'''
+    res = evaluate(paths, n, criterion)
+    b = np.linspace(-0.99, 1, 100)
+    e1 = limit_eff_strain(b, n, criterion)/eff_strain(1, b)
+
+    fig, ax = plt.subplots(figsize=(6,6))
+    ax.axvline(x=0, color='k', lw=0.2)
+    ax.plot((0,1), (0,1), 'k', lw=0.2)
+    ax.plot((0,-0.5), (0,1), 'k', lw=0.2)
+    ax.plot(b*e1, e1, 'k-', label='Forming limit (proportional paths)')
+    for p, e in zip(paths, res['e_neck']):
+        ax.plot(p[:, 1], p[:, 0], '-')
+        ax.plot(e[1], e[0], 'rx')
+    ax.axis([-0.25, 0.25, 0, 0.5])
+    ax.set_aspect('equal')
+    ax.set_xlabel(r'$\varepsilon_2$')
+    ax.set_ylabel(r'$\varepsilon_1$')
+    plt.title('Necking along non-proportional strain paths')
+    plt.legend(title=r'Material: $n=%s$' % n)
+    plt.show()
+
+
+if __name__ == "__main__":
+    n = 0.25
+    # pre-strain in equibiaxial stretching, then uniaxial tension or plane strain
+    paths = [[[0, 0], [0.1, 0.1], [0.4, -0.05]],
+             [[0, 0], [0.1, 0.1], [0.4, 0.1]],
+             [[0, 0], [0.1, -0.05], [0.4, 0.25]]]
+    res = evaluate(paths, n)
+    print('Limit ratio eeff/elim:', res['ratio'])
+    # change of path over the new limit: necking at the vertex of the change
+    res = evaluate([[[0, 0], [0.2, 0.2], [0.25, 0.2]]], n)
+    assert res['necked'][0] and np.allclose(res['e_neck'][0], [0.2, 0.2]), res
+    plot_paths(np.array(paths), n)
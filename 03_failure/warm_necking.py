@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Necking of strain rate and temperature dependent sheets (warm forming of
+aluminium alloys) along proportional paths at a constant effective strain
+rate and temperature T (isothermal tools, T in C, rate in 1/s):
+
+    Hollomon:      s = K(T)*e^n(T, rate)*(rate/rate0)^m(T), with K(T) = K*(1 + dK*(T-T0)),
+                   m(T) = m + dm*(T-T0) and n(T, rate) = n + (T-T0)*(dn + dnr*log10(rate/rate0))
+                   (dynamic recovery: lower hardening at higher temperatures and lower rates)
+    Johnson-Cook:  s = (A + B*e^n)*(1 + C*ln(rate/rate0))*(1 - ((T-T0)/(Tm-T0))^p)
+
+The Swift and Hill criteria are extended with the condition of Hart: the
+neck grows when the hardening rate h = d(ln s)/d(eeff) falls below
+z(beta)*(1-m), where m = d(ln s)/d(ln rate) and z(beta) is the threshold of
+the rate independent criterion (necking.z_swift_batch, z_hill_batch). The
+limit strains of the Hollomon law with dnr = 0 are those of n/(1-m); for any
+law the equation is solved by bisection on ln(eeff) for all the points at
+once. The condition gives the onset of the neck: it follows n, which falls
+with the temperature, so it does not show the benefit of warm forming.
+
+The M-K analysis (criterion 'mk') gives the strains of the localized neck: a
+groove of thickness ratio F0 strains faster than the sheet, and the rate
+sensitivity raises its flow stress and delays the localization, so the
+limits of the AA5182 law grow with the temperature as in warm forming. The
+groove is normal to the major strain for beta >= 0 and, for beta < 0, the
+limit is the minimum over inclined grooves (ANGLES). The temperature of the Johnson-Cook law only
+scales the flow stress, so its limit strains depend on the strain rate only
+(ATHERMAL).
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import necking as nk
+import necking_paths as nkp
+
+def hollomon(e, rate, T, K, n, m, dK=0, dn=0, dnr=0, dm=0, T0=20, rate0=1):
+    ''' Rate sensitive Hollomon law: flow stress, hardening rate d(ln s)/de and
+    rate sensitivity d(ln s)/d(ln rate)'''
+    dT = np.asarray(T, dtype=float) - T0
+    nT = np.maximum(n + dT*(dn + dnr*np.log10(rate/rate0)), 0)
+    mT = m + dm*dT
+    s = K*(1 + dK*dT)*e**nT*(rate/rate0)**mT
+    return s, nT/e, mT + np.where(nT > 0, dnr*dT, 0)*np.log10(e)
+
+def johnson_cook(e, rate, T, A, B, n, C, p, Tm, T0=20, rate0=1):
+    ''' Johnson-Cook law: flow stress, hardening rate d(ln s)/de and rate sensitivity m'''
+    Ts = np.clip((np.asarray(T, dtype=float) - T0)/(Tm - T0), 0, 1)
+    r = 1 + C*np.log(rate/rate0)
+    s = (A + B*e**n)*r*(1 - Ts**p)
+    return s, B*n*e**(n-1)/(A + B*e**n), np.broadcast_to(C/r, np.shape(s))
+
+LAWS = {'hollomon': hollomon, 'johnson_cook': johnson_cook}
+
+# Illustrative parameters of AA5182-O between room temperature and 250 C, and AA6061-T6
+MATERIALS = {
+    'AA5182': ('hollomon', {'K': 580, 'n': 0.30, 'm': 0.005, 'dK': -1.8e-3, 'dn': -4e-4, 'dnr': 1e-4, 'dm': 4e-4}),
+    'AA6061': ('johnson_cook', {'A': 324, 'B': 114, 'n': 0.42, 'C': 0.002, 'p': 1.34, 'Tm': 582}),
+}
+
+# laws whose limit strains do not depend on the temperature
+ATHERMAL = ('johnson_cook',)
+
+def threshold(beta, criterion='hill'):
+    ''' z(beta) of the criterion: 'swift', or 'hill' (Hill for beta <= 0 and Swift for beta > 0)'''
+    beta = np.asarray(beta, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = nk.z_swift_batch(beta)
+        if criterion == 'hill':
+            z = np.where(beta <= 0, nk.z_hill_batch(beta), z)
+        elif criterion != 'swift':
+            raise ValueError('Unknown necking criterion: %s' % criterion)
+    return z
+
+F0 = 0.99   # thickness ratio of the groove of the M-K analysis
+ANGLES = np.radians(np.arange(0, 46, 5))   # initial angles of the groove normal to the major strain (beta < 0)
+
+def _mk_residual(x, dtt, c, eb, f, dza, dt, T, law, params, target):
+    ''' ln(groove normal force/uniform normal force) for a groove normal strain increment x'''
+    # shear strain increment of the groove from the equilibrium of the shear force (Mises)
+    Q = x**2 + x*dtt + dtt**2 + (c*(2*x+dtt))**2
+    deb = 2/np.sqrt(3)*np.sqrt(Q)
+    s, h, m = LAWS[law](eb + deb, deb/dt, T, **params)
+    return np.log(s*(2*x+dtt)/np.sqrt(3*Q)) + np.log(f) - (x + dtt - dza) - target
+
+def mk_limit_eff_strain(beta, rate, T, law, params, f0=F0, de=0.002, emax=2, ratio=10, iterations=24, angles=ANGLES):
+    ''' Limit effective strain of the uniform zone of an M-K analysis (groove of
+    thickness ratio f0) at the strain rate and temperature T
+
+    The uniform zone is strained along beta at the constant rate in steps of
+    effective strain de. In the groove the strain increment along it is the
+    same, the normal strain increment balances the normal force (bisection on
+    its logarithm), the shear one the shear force, and the strain rate is
+    higher. The neck is formed when the effective strain increment of the
+    groove is ratio times the one of the uniform zone. The groove is normal to the
+    major strain for beta >= 0; for beta < 0 the limit is the minimum over
+    the initial angles of the groove normal (radians, rotating with the
+    strains). nan: no necking below emax.'''
+    beta, rate, T = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (beta, rate, T)])
+    shape = beta.shape
+    beta, rate, T = beta.ravel(), rate.ravel(), T.ravel()
+    # one point per path and angle of the groove (only 0 for beta >= 0)
+    angles = np.asarray(angles, dtype=float)
+    path, angle = np.nonzero((beta[:, None] < 0) | (angles == 0))
+    tan = np.tan(angles[angle])
+    beta, rate, T = beta[path], rate[path], T[path]
+    de1a = de/nkp.eff_strain(1, beta)
+    de2 = beta*de1a
+    aa = (2*beta+1)/(2+beta)
+    dt = de/rate
+    out = np.full(beta.shape, np.nan)
+    # active points: uniform and groove strains and thickness ratio
+    i = np.arange(len(beta))
+    ea = np.full(len(beta), de)
+    eb, f = ea.copy(), np.full(len(beta), float(f0))
+    p = {k: np.asarray(v, dtype=float) for k, v in params.items()}
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        while len(i) and ea[0] < emax:
+            # strain increments and stress ratio of the uniform zone in the axes of the groove
+            cos2 = 1/(1+tan**2)
+            sin2 = 1-cos2
+            dnn = de1a[i]*cos2 + de2[i]*sin2
+            dtt = de1a[i]*sin2 + de2[i]*cos2
+            c = (aa[i]-1)*tan*cos2/(cos2 + aa[i]*sin2)
+            args = (dtt, c, eb, f, de1a[i]+de2[i], dt[i], T[i], law, p)
+            s, h, m = LAWS[law](ea + de, rate[i], T[i], **p)
+            target = np.log(s*(cos2 + aa[i]*sin2)/np.sqrt(1-aa[i]+aa[i]**2))
+            # bracket: groove strained as the uniform zone (x = dnn) and effective
+            # strain increment ratio times the one of the uniform zone (A*Q = R)
+            A = 1 + 4*c**2
+            R = 0.75*(ratio*de)**2
+            lo = np.log(dnn)
+            hi = np.log((-A*dtt + np.sqrt((A*dtt)**2 - 4*A*((1+c**2)*dtt**2 - R)))/(2*A))
+            localized = ~(_mk_residual(np.exp(hi), *args, target) > 0)
+            for k in range(iterations):
+                x = (lo+hi)/2
+                up = _mk_residual(np.exp(x), *args, target) > 0
+                hi = np.where(up, x, hi)
+                lo = np.where(up, lo, x)
+            x = np.exp(hi)
+            ea = ea + de
+            # grooves that do not stretch (normal strain increment <= 0) do not localize
+            stretched = 2*dnn + dtt > 0
+            stretched &= dnn > 0
+            localized &= stretched
+            out[i[localized]] = ea[localized]
+            keep = ~localized & stretched
+            eb = (eb + 2/np.sqrt(3)*np.sqrt(x**2 + x*dtt + dtt**2 + (c*(2*x+dtt))**2))[keep]
+            f = (f*np.exp(-(x + dtt) + de1a[i] + de2[i]))[keep]
+            tan = (tan*np.exp(de1a[i] - de2[i]))[keep]
+            i, ea = i[keep], ea[keep]
+    # minimum over the angles of each path
+    limit = np.full(shape, np.nan).ravel()
+    np.fmin.at(limit, path, out)
+    return limit.reshape(shape)
+
+def limit_eff_strain(beta, rate, T, law, params, criterion='hill', emin=1e-6, emax=5, iterations=60):
+    ''' Limit effective strain of the paths with strain ratio beta at the strain
+    rate and temperature T (arrays are broadcast); nan: no necking below emax
+
+    criterion: 'swift' or 'hill' with the condition of Hart (onset of the
+    neck), or 'mk' (mk_limit_eff_strain, localized neck).'''
+    if criterion == 'mk':
+        return mk_limit_eff_strain(beta, rate, T, law, params)
+    beta, rate, T = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (beta, rate, T)])
+    z = threshold(beta, criterion)
+    def stable(e):
+        s, h, m = LAWS[law](e, rate, T, **params)
+        return h > z*(1-m)
+    lo, hi = np.full(beta.shape, np.log(emin)), np.full(beta.shape, np.log(emax))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(iterations):
+            x = (lo+hi)/2
+            s = stable(np.exp(x))
+            lo = np.where(s, x, lo)
+            hi = np.where(s, hi, x)
+        return np.where(stable(np.full(beta.shape, emax)) | np.isnan(z), np.nan, np.exp((lo+hi)/2))
+
+def limit_strains(beta, rate, T, law, params, criterion='hill'):
+    ''' Limit strains (e1, e2) of the paths with strain ratio beta'''
+    e1 = limit_eff_strain(beta, rate, T, law, params, criterion)/nkp.eff_strain(1, beta)
+    return e1, beta*e1
+
+def flc(rate, T, law, params, criterion='hill', b0=-0.5, b1=1):
+    ''' Forming limit curve (e2, e1) sampled within necking.TOL (61 values of beta
+    with 'mk', whose limits are computed in steps of strain)'''
+    if criterion == 'mk':
+        e1, e2 = limit_strains(np.linspace(b0, b1, 61), rate, T, law, params, criterion)
+        return e2, e1
+    b, e2, e1 = nk.adaptive_curve(lambda b: limit_strains(b, rate, T, law, params, criterion)[::-1], b0, b1, nk.TOL)
+    return e2, e1
+
+def plot_flc(material, T=(20, 150, 250), rate=(1e-3, 1e-1, 10), criterion='hill'):
+    ''' Forming limit curves at several temperatures (slowest rate) and several rates (highest temperature)'''
+    law, params = MATERIALS[material]
+    fig, ax = plt.subplots(1, 2, figsize=(11,5.5))
+    for T_ in T:
+        ax[0].plot(*flc(rate[0], T_, law, params, criterion), label=r'$T = %g$ C' % T_)
+    for r in rate:
+        ax[1].plot(*flc(r, T[-1], law, params, criterion), label=r'$\dot\varepsilon = %g$ 1/s' % r)
+    titles = (r'$\dot\varepsilon = %g$ 1/s' % rate[0], r'$T = %g$ C' % T[-1])
+    for a_, title in zip(ax, titles):
+        a_.axvline(x=0, color='k', lw=0.2)
+        a_.axis([-0.25, 0.5, 0, 0.75])
+        a_.set_aspect('equal')
+        a_.set_xlabel(r'$\varepsilon_2$')
+        a_.set_ylabel(r'$\varepsilon_1$')
+        a_.set_title('%s (%s), %s' % (material, law, title))
+        a_.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    beta = np.array([-0.5, 0, 0.5, 1])
+    for material, (law, params) in MATERIALS.items():
+        for criterion in ('hill', 'mk'):
+            print('%s (%s), %s: limit major strain at beta = %s' % (material, law, criterion, beta))
+            for T in ((20,) if law in ATHERMAL else (20, 150, 250)):
+                for rate in (1e-3, 1):
+                    e1, e2 = limit_strains(beta, rate, T, law, params, criterion)
+                    print('  T = %3d C, rate = %-6g 1/s: %s' % (T, rate, np.array2string(e1, precision=3)))
+    # Hollomon without rate dependence of n: bisection against the closed form with n/(1-m)
+    law, p = MATERIALS['AA5182']
+    p = dict(p, dnr=0)
+    T, rate = 200, 0.1
+    nT, mT = p['n'] + p['dn']*(T-20), p['m'] + p['dm']*(T-20)
+    b = np.linspace(-0.5, 1, 31)
+    exact = nkp.limit_eff_strain(b, nT, 'hill', mT)/nkp.eff_strain(1, b)
+    print('Hollomon, max. difference with the closed form: %.2e' % np.max(np.abs(limit_strains(b, rate, T, law, p)[0] - exact)))
+    plot_flc('AA5182', criterion='mk')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Axisymmetric deep drawing of a cylindrical cup and limiting draw ratio (LDR).
+
+Assumptions: constant thickness t0 in the flange, material s = K*e^n with
+normal anisotropy rbar = (r0 + 2*r45 + r90)/4 (Hill, as in anisotropy),
+friction mu under the blankholder force B and capstan friction over the die
+radius.
+
+Flange (radius r between the punch radius Ri and the current edge Ro of a
+blank of initial radius R0), with r0^2 = r^2 + R0^2 - Ro^2:
+    e_eff = m*ln(r0/r),  sr - st = m*K*e_eff^n,  m = sqrt(2(1+rbar)/(1+2rbar))
+    d(sr)/dr = -(sr - st)/r,  sr(Ro) = mu*B/(pi*Ro*t0)
+Wall (plane strain): maximum tension K*c^(1+n)*n^n*exp(-n)*t0, c = (1+rbar)/sqrt(1+2rbar)
+
+The drawing force is F = 2*pi*Ri*t0*sr(Ri)*exp(mu*pi/2) and the blank can be
+drawn while the maximum of F over the stroke is below the wall capacity. The
+LDR is the draw ratio where they are equal, found by bisection.
+"""
+
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
+def normal_anisotropy(r0, r90, r45=1):
+    ''' Normal anisotropy r-bar of the r-values (as anisotropy.normal_anisotropy)'''
+    return (r0+r90+2*r45)/4
+
+def factors(rbar):
+    ''' Flange (pure shear) and wall (plane strain) stress factors for normal anisotropy'''
+    m = np.sqrt(2*(1+rbar)/(1+2*rbar))
+    c = (1+rbar)/np.sqrt(1+2*rbar)
+    return m, c
+
+def flange_stresses(r, Ro, R0, t0, K, n, rbar, mu=0, B=0):
+    ''' Radial and hoop stresses at the radii r (last axis, increasing) of the flange'''
+    r = np.asarray(r, dtype=float)
+    m, c = factors(rbar)
+    r0 = np.sqrt(r**2 + R0**2 - Ro**2)
+    sd = m*K*(m*np.log(r0/r))**n   # sr - st
+    # integration from the edge of the flange inwards
+    x = np.log(r)
+    dsr = (sd[..., 1:]+sd[..., :-1])/2*np.diff(x, axis=-1)
+    sedge = mu*B/(np.pi*Ro*t0)
+    sr = sedge + np.concatenate((np.cumsum(dsr[..., ::-1], axis=-1)[..., ::-1], np.zeros(dsr.shape[:-1] + (1,))), axis=-1)
+    return sr, sr - sd
+
+def drawing_force(Ro, Ri, R0, t0, K, n, rbar, mu=0, B=0, points=16):
+    ''' Drawing force when the edge of the flange is at Ro (all the arguments broadcast)'''
+    Ro, Ri, R0, t0, K, n, rbar, mu, B = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (Ro, Ri, R0, t0, K, n, rbar, mu, B)])
+    m, c = factors(rbar)
+    # Gauss quadrature in ln(r) from Ri to Ro
+    xg, wg = np.polynomial.legendre.leggauss(points)
+    a, b = np.log(Ri), np.log(Ro)
+    r = np.exp(a[..., None] + (b-a)[..., None]*(xg+1)/2)
+    r0 = np.sqrt(r**2 + (R0**2 - Ro**2)[..., None])
+    sd = (m*K)[..., None]*(m[..., None]*np.log(r0/r))**n[..., None]
+    sr = mu*B/(np.pi*Ro*t0) + (b-a)/2*np.sum(wg*sd, axis=-1)
+    return 2*np.pi*Ri*t0*sr*np.exp(mu*np.pi/2)
+
+def max_drawing_force(Ri, R0, t0, K, n, rbar, mu=0, B=0, stages=40, points=16):
+    ''' Maximum drawing force along the stroke (edge of the flange from R0 to Ri)'''
+    Ri, R0, t0, K, n, rbar, mu, B = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (Ri, R0, t0, K, n, rbar, mu, B)])
+    w = np.linspace(0, 1, stages, endpoint=False)
+    Ro = R0[..., None] - (R0-Ri)[..., None]*w
+    args = [i[..., None] for i in (Ri, R0, t0, K, n, rbar, mu, B)]
+    F = drawing_force(Ro, *args, points=points)
+    return F.max(axis=-1)
+
+def wall_capacity(Ri, t0, K, n, rbar):
+    ''' Maximum force carried by the cup wall (plane strain necking)'''
+    m, c = factors(rbar)
+    return 2*np.pi*Ri*t0*K*c**(1+n)*n**n*np.exp(-n)
+
+def ldr(Ri, t0, K, n, rbar, mu=0, B=0, lo=1, hi=4, iterations=40):
+    ''' Limiting draw ratio D0/Di: bisection on the draw ratio in (lo, hi) where
+    the maximum drawing force equals the wall capacity (all the arguments
+    broadcast; inf: over hi, nan: not even lo can be drawn)'''
+    Ri, t0, K, n, rbar, mu, B = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (Ri, t0, K, n, rbar, mu, B)])
+    capacity = wall_capacity(Ri, t0, K, n, rbar)
+    g = lambda ratio: max_drawing_force(Ri, Ri*ratio, t0, K, n, rbar, mu, B)/capacity - 1   # increasing with the ratio
+    a, b = np.full(Ri.shape, float(lo)), np.full(Ri.shape, float(hi))
+    for i in range(iterations):
+        x = (a+b)/2
+        over = g(x) > 0
+        a = np.where(over, a, x)
+        b = np.where(over, x, b)
+    out = np.where(g(np.full(Ri.shape, float(hi))) <= 0, np.inf, (a+b)/2)
+    return np.where(g(np.full(Ri.shape, float(lo))) > 0, np.nan, out)
+
+def _draw_map(args):
+    Ri, t0, K, n, rbar, mu, B, D0 = args
+    F = max_drawing_force(Ri, D0/2, t0, K, n, rbar, mu, B)
+    return F, F/wall_capacity(Ri, t0, K, n, rbar), ldr(Ri, t0, K[:, 0], n[:, 0], rbar[:, 0], mu, B)
+
+def draw_map(catalogue, D0, Di, t0, mu=0.1, B=0, workers=None, chunk=None):
+    ''' Drawing force, force/wall capacity and LDR of blank diameters x materials
+
+    catalogue: dict of arrays 'K', 'n' and the r-values 'r0', 'r45', 'r90' (one
+    value per material), rbar = normal_anisotropy. Returns the force
+    and the ratio, shape (materials, diameters), and the LDR (materials,).
+    Materials are split in chunks evaluated in parallel processes (workers=1:
+    no processes).'''
+    K, n = [np.asarray(catalogue[i], dtype=float)[:, None] for i in ('K', 'n')]
+    rbar = normal_anisotropy(*[np.asarray(catalogue[i], dtype=float)[:, None] for i in ('r0', 'r90', 'r45')])
+    D0 = np.asarray(D0, dtype=float)
+    workers = workers or os.cpu_count()
+    chunk = chunk or min(-(-len(K)//workers), 100)   # 100 materials: ~ 100 MB of temporaries per 100 diameters
+    jobs = [(Di/2, t0, K[i:i+chunk], n[i:i+chunk], rbar[i:i+chunk], mu, B, D0) for i in range(0, len(K), chunk)]
+    if workers == 1 or len(jobs) == 1:
+        results = list(map(_draw_map, jobs))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_draw_map, jobs))
+    return [np.concatenate([i[j] for i in results]) for j in range(3)]
+
+def plot_flange(Ro, Ri, R0, t0, K, n, rbar, mu=0, B=0):
+    ''' Radial and hoop stresses in the flange'''
+    r = np.linspace(Ri, Ro, 200)
+    sr, st = flange_stresses(r, Ro, R0, t0, K, n, rbar, mu, B)
+    fig, ax = plt.subplots()
+    ax.axhline(y=0, color='k', lw=0.2)
+    ax.plot(r, sr, 'b-', label=r'Radial, $\sigma_r$')
+    ax.plot(r, st, 'r-', label=r'Hoop, $\sigma_\theta$')
+    ax.set_xlabel(r'Radius, $r$ (mm)')
+    ax.set_ylabel('Stress (MPa)')
+    plt.title(r'Flange at $R_o=%.1f$ mm ($R_0=%.1f$ mm)' % (Ro, R0))
+    plt.legend()
+    plt.show()
+
+def plot_ldr_map(D0, rbar, ratio, Di, LDR=None):
+    ''' Map of the drawing force over the wall capacity; the LDR is the contour 1'''
+    fig, ax = plt.subplots()
+    cs = ax.contourf(D0/Di, rbar, ratio, levels=20, cmap='RdYlGn_r')
+    ax.contour(D0/Di, rbar, ratio, levels=[1], colors='k')
+    if LDR is not None:
+        ax.plot(LDR, rbar, 'w--', label='LDR')
+        ax.legend()
+    fig.colorbar(cs, label='Drawing force / wall capacity')
+    ax.set_xlabel(r'Draw ratio, $D_0/D_i$')
+    ax.set_ylabel(r'Normal anisotropy, $\overline{r}$')
+    plt.show()
+
+
+if __name__ == "__main__":
+    Di, t0 = 50, 1
+    K, n, mu = 550, 0.22, 0.1
+    rbar = normal_anisotropy(r0=1.8, r90=2.2, r45=1.4)
+    print('LDR = %.2f' % ldr(Di/2, t0, K, n, rbar, mu))
+    plot_flange(45, Di/2, 50, t0, K, n, rbar, mu, B=20000)
+
+    # catalogue of materials with the same hardening and increasing r-values
+    r = np.linspace(0.5, 2.5, 40)
+    catalogue = {'K': np.full(40, K), 'n': np.full(40, n), 'r0': r, 'r45': r, 'r90': r}
+    D0 = np.linspace(75, 150, 60)
+    F, ratio, LDR = draw_map(catalogue, D0, Di, t0, mu)
+    rbar = normal_anisotropy(catalogue['r0'], catalogue['r90'], catalogue['r45'])
+    print('LDR from %.2f (rbar = %.2f) to %.2f (rbar = %.2f)' % (LDR[0], rbar[0], LDR[-1], rbar[-1]))
+    plot_ldr_map(D0, rbar, ratio, Di, LDR)
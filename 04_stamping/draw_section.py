@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Tension propagation along a draw section made of an ordered list of
+segments, from the pole O (punch centre) to the edge of the flange. It
+generalizes marciniak_stamping_example.get_vars (O-A-B-C-D-E-F).
+
+Segments (parameters are scalars or arrays, one value per section):
+  straight(length)          free sheet, constant tension
+  punch(R, theta)           contact over the punch, T_end = T*exp(mu*theta)
+  die(R, theta)             contact over the die radius, T_end = T*exp(-mu*theta)
+  drawbead(offset, factor=1)
+                            drawbead with T = factor*T_end + offset on its
+                            die side (e.g. from 05_bending/drawbead.py)
+  flange(length, B=nan)     blankholder force B, T_end = T - 2*mu*B
+                            (B = nan: free edge, B = T/(2*mu) so that T_end = 0)
+
+All the sections share the list of segment types and are evaluated at once
+as arrays of shape (N, points). The number of points of each contact arc is
+chosen so that the tension changes less than tol between points.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import marciniak_stamping_example as mse
+
+def straight(length):
+    return {'kind': 'straight', 'length': length}
+
+def punch(R, theta):
+    return {'kind': 'punch', 'R': R, 'theta': theta}
+
+def die(R, theta):
+    return {'kind': 'die', 'R': R, 'theta': theta}
+
+def drawbead(offset, factor=1):
+    return {'kind': 'drawbead', 'offset': offset, 'factor': factor}
+
+def flange(length, B=np.nan):
+    return {'kind': 'flange', 'length': length, 'B': B}
+
+def _points(mu, theta, tol, max_points):
+    ''' Points of a contact arc so that T changes less than tol between points'''
+    n = np.ceil(np.max(np.abs(mu*theta))/np.log(1+tol)) + 1
+    return int(np.clip(n, 2, max_points))
+
+def propagate(segments, T1O, mu, K, n, t0, e0=0, tol=0.01, max_points=200):
+    ''' Tension, pressure, strain and thickness along the sections
+
+    Returns a dict with the values at the ends of the segments, shape
+    (N, segments+1): 'position', 'T1', and the profiles, shape (N, points):
+    's', 'T1_profile', 'p', 'e1', 't'. 'B' is the blankholder force of each flange
+    (N, flanges) and 'F' the punch force (per unit width, symmetric section).
+    e0 is the pre-strain of the sheet (major strain), s1 = K*(e0 + e1)**n.'''
+    T = np.asarray(T1O, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    N = np.broadcast(T, mu, *[np.asarray(v) for seg in segments for k, v in seg.items() if k != 'kind']).shape
+    T = np.broadcast_to(T, N).astype(float)
+    mu = np.broadcast_to(mu, N)
+    s = np.zeros(N)
+
+    position, tension, B = [s], [T], []
+    ps, pT, pp = [], [], []
+    wall = np.zeros(N)   # angle turned over the punch
+    Tpunch = T
+    for seg in segments:
+        kind = seg['kind']
+        if kind in ('punch', 'die'):
+            R, theta = np.broadcast_to(seg['R'], N), np.broadcast_to(seg['theta'], N)
+            sign = 1 if kind == 'punch' else -1
+            w = np.linspace(0, 1, _points(mu, theta, tol, max_points))
+            th = theta[..., None]*w
+            Ts = T[..., None]*np.exp(sign*mu[..., None]*th)
+            ps.append(s[..., None] + R[..., None]*th)
+            pT.append(Ts)
+            pp.append(Ts/R[..., None])
+            s = s + R*theta
+            T = Ts[..., -1]
+            if kind == 'punch':
+                wall = wall + theta
+                Tpunch = T
+        elif kind == 'straight':
+            L = np.broadcast_to(seg['length'], N)
+            ps.append(np.stack((s, s+L), axis=-1))
+            pT.append(np.stack((T, T), axis=-1))
+            pp.append(np.zeros(N + (2,)))
+            s = s + L
+        elif kind == 'drawbead':
+            Tb = np.maximum((T - seg['offset'])/seg['factor'], 0)
+            ps.append(np.stack((s, s), axis=-1))
+            pT.append(np.stack((T, Tb), axis=-1))
+            pp.append(np.zeros(N + (2,)))
+            T = Tb
+        elif kind == 'flange':
+            L = np.broadcast_to(seg['length'], N)
+            Bf = np.where(np.isnan(seg['B']), T/(2*mu), seg['B'])
+            Tf = np.maximum(T - 2*mu*Bf, 0)
+            ps.append(np.stack((s, s+L), axis=-1))
+            pT.append(np.stack((T, Tf), axis=-1))
+            pp.append(np.stack((Bf/L, Bf/L), axis=-1))
+            B.append(Bf)
+            s = s + L
+            T = Tf
+        else:
+            raise ValueError('Unknown segment: %s' % kind)
+        position.append(s)
+        tension.append(T)
+
+    pT = np.concatenate(pT, axis=-1)
+    K, n, t0, e0 = [np.asarray(i, dtype=float)[..., None] for i in (K, n, t0, e0)]   # one value per section
+    e1 = mse.strain_from_tension_batch(pT, K, n, t0, e0)
+    return {'position': np.stack(position, axis=-1), 'T1': np.stack(tension, axis=-1),
+            's': np.concatenate(ps, axis=-1), 'T1_profile': pT, 'p': np.concatenate(pp, axis=-1),
+            'e1': e1, 't': t0*np.exp(-e1),
+            'B': np.stack(B, axis=-1) if B else np.zeros(N + (0,)), 'F': 2*Tpunch*np.sin(wall)}
+
+def plot_section(res, i=0, labels=None):
+    ''' Tension, pressure and strain along one of the sections'''
+    fig, ax = plt.subplots(3, 1, figsize=(8,9), sharex=True)
+    for a in ax:
+        [a.axvline(x=j, color='grey', linestyle=':') for j in res['position'][i]]
+    ax[0].plot(res['s'][i], res['T1_profile'][i], 'b-')
+    ax[0].plot(res['position'][i], res['T1'][i], 'bo')
+    ax[0].set_ylabel(r'Tension, $T_1$')
+    ax[1].plot(res['s'][i], res['p'][i], 'r-')
+    ax[1].set_ylabel(r'Pressure, $p$')
+    ax[2].plot(res['s'][i], res['e1'][i], 'g--')
+    ax[2].set_ylabel(r'Strain, $\varepsilon_1$')
+    ax[2].set_xlabel('Position along the sheet (mm)')
+    if labels:
+        [ax[2].annotate(xy=[j, 0], text=k) for j, k in zip(res['position'][i], labels)]
+    plt.show()
+
+
+if __name__ == "__main__":
+    # section of marciniak_stamping_example, for several punch radii
+    t0, K, n, mu = 0.8, 750, 0.23, 0.1
+    a, Rf, Rd, sBC, sEF = 330, 2800, 10, 28, 80
+    Rp = np.array([5, 10, 20])
+    e1O = 0.03
+    T1O = K*e1O**n*t0*np.exp(-e1O)
+    thetaOA = np.arcsin((a-Rp)/Rf)
+    segments = [punch(Rf, thetaOA), punch(Rp, np.pi/2-thetaOA), straight(sBC),
+                die(Rd, np.pi/2), flange(sEF)]
+    res = propagate(segments, T1O, mu, K, n, t0)
+    print('Tension at O, A, B, C, D, F:\n', res['T1'])
+    print('Punch force:', res['F'])
+    print('Blankholder force:', res['B'][:, 0])
+    plot_section(res, 1, ['O', 'A', 'B', 'C', 'D', 'F'])
@@ -11,15 +11,13 @@ import matplotlib.pyplot as plt
 from matplotlib import patches, gridspec
 from scipy.optimize import fsolve
 
-def plot_stretching(R, TL, CL, mu, t0, K, n, angle):
+def solve_stretching(R, TL, CL, mu, t0, K, n, angle):
     if angle == 0:
         angle = 0.001
     ca = cos(radians(angle))
     sa = sin(radians(angle))
     ta = tan(radians(angle))
     s = R*(1-ca)-ta*(R*sa-TL/2)
-    xP = 0
-    yP = s-R
     xA = R*sa
     yA = s-R*(1-ca)
     xM = TL/2
@@ -50,6 +48,78 @@ def plot_stretching(R, TL, CL, mu, t0, K, n, angle):
     T1A = funcT1(e1A)
     p = T1O/R
     F = 2*T1A*sa
+    geometry = (s, xA, yA, xB, yB, sOA, sAB, e1pro)
+    return geometry, (e1O, e1A, tO, tA, T1O, T1A, p, F)
+
+def geometry_batch(R, TL, CL, angle):
+    ''' Array version of the geometry of solve_stretching: (s, xA, yA, xB, yB, sOA, sAB, e1pro)'''
+    R, TL, CL, angle = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (R, TL, CL, angle)])
+    th = np.radians(np.where(angle == 0, 0.001, angle))
+    ca, sa, ta = np.cos(th), np.sin(th), np.tan(th)
+    s = R*(1-ca)-ta*(R*sa-TL/2)
+    xA = R*sa
+    yA = s-R*(1-ca)
+    xB = TL/2 - CL*ca
+    yB = CL*sa
+    sOA = R*th
+    sAB = np.hypot(xA-xB, yA-yB)
+    e1pro = np.log((sOA+sAB)/(TL/2-CL))
+    return s, xA, yA, xB, yB, sOA, sAB, e1pro
+
+def solve_stretching_batch(R, TL, CL, mu, t0, K, n, angle, e0=0, tol=1e-12, maxiter=50):
+    ''' Array version of solve_stretching: returns (s, e1O, e1A, tO, tA, T1O, T1A, p, F)
+
+    e0: pre-strain of the sheet (major strain), s1 = Kp*(e0 + e1)**n'''
+    R, TL, CL, mu, t0, K, n, angle, e0 = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (R, TL, CL, mu, t0, K, n, angle, e0)])
+    flat = angle == 0
+    th = np.radians(np.where(flat, 0.001, angle))
+    sa = np.sin(th)
+    s, xA, yA, xB, yB, sOA, sAB, e1pro = geometry_batch(R, TL, CL, angle)
+
+    # eq1 gives e1O = c0 - c1*e1A, so eq2 becomes g(e1A) = 0 with a root in (e1pro, c0/c1)
+    c0 = 2*e1pro*(sOA+sAB)/sOA
+    c1 = 2*sAB/sOA + 1
+    lo, hi = e1pro.copy(), c0/c1
+    x = (lo+hi)/2
+    pre = np.any(e0)   # without pre-strain the e0 terms are skipped
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skip = flat | ~(lo < hi)   # no root to converge to (empty bracket or nan)
+        for i in range(maxiter):
+            e1O = c0 - c1*x
+            uA, uO = (e0+x, e0+e1O) if pre else (x, e1O)
+            g = n*np.log(uA/uO) + e1O - x - mu*th
+            lo = np.where(g < 0, x, lo)
+            hi = np.where(g > 0, x, hi)
+            xn = x - g/(n*(1/uA + c1/uO) - c1 - 1)
+            # fall back to bisection when Newton leaves the bracket
+            xn = np.where((xn >= lo) & (xn <= hi), xn, (lo+hi)/2)
+            done = np.all((np.abs(xn-x) <= tol*np.abs(x)) | skip)
+            x = xn
+            if done:
+                break
+    e1A = np.where(flat, 0, x)
+    e1O = np.where(flat, 0, c0 - c1*x)
+    tO = t0*np.exp(-e1O)
+    tA = t0*np.exp(-e1A)
+
+    Kp = 2*K/np.sqrt(3) # plane strain
+    T1O = Kp*(e0+e1O)**n*tO
+    T1A = Kp*(e0+e1A)**n*tA
+    p = T1O/R
+    F = 2*T1A*sa
+    return s, e1O, e1A, tO, tA, T1O, T1A, p, F
+
+def plot_stretching(R, TL, CL, mu, t0, K, n, angle):
+    geometry, solution = solve_stretching(R, TL, CL, mu, t0, K, n, angle)
+    s, xA, yA, xB, yB, sOA, sAB, e1pro = geometry
+    e1O, e1A, tO, tA, T1O, T1A, p, F = solution
+    if angle == 0:
+        angle = 0.001
+    xP = 0
+    yP = s-R
+    xM = TL/2
+    yM = 0
+    Kp = 2*K/sqrt(3) # plane strain
 
     fig = plt.figure(figsize=(8,8))
     gs = gridspec.GridSpec(2, 2, width_ratios=[1.5, 1])
@@ -30,8 +30,8 @@ def get_vars(params, length, theta, tension):
     pthetaAB = [thetaOA + thetaAB*i/19 for i in range(20)]
     pthetaCD = [thetaOB - thetaDC*i/19 for i in range(20)]
     psOA = [i*Rf for i in pthetaOA]
-    psAB = [i*Rp+sA for i in pthetaAB]
-    psCD = [i*Rd+sC for i in pthetaAB]
+    psAB = [(i-thetaOA)*Rp+sA for i in pthetaAB]
+    psCD = [(thetaOB-i)*Rd+sC for i in pthetaCD]
     psEF = [sE, sF]
     pT1OA = [T1O*math.exp(mu*i) for i in pthetaOA]
     pT1AB = [T1O*math.exp(mu*i) for i in pthetaAB]
@@ -52,6 +52,41 @@ def get_vars(params, length, theta, tension):
     
     return position, ps, pT1, pp, ps2
 
+def strain_from_tension(T1, K, n, t0, e1=0.01):
+    ''' Major strain e1 (plane strain, s1 = K*e1**n) that carries the tension T1'''
+    funcT1 = lambda x : K*x[0]**n*t0*math.exp(-x[0])
+    return fsolve(lambda x : T1 - funcT1(x), e1)[0]
+
+def strain_from_tension_batch(T1, K, n, t0, e0=0, tol=1e-12, maxiter=50):
+    ''' Array version of strain_from_tension (stable root e1 < n - e0, nan if T1 exceeds the maximum)
+
+    e0: pre-strain of the sheet (major strain), s1 = K*(e0 + e1)**n'''
+    T1, K, n, t0, e0 = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in (T1, K, n, t0, e0)])
+    # log form: g(e1) = n*ln(e0+e1) - e1 + ln(K*t0/T1), increasing in (0, n-e0)
+    pre = np.any(e0)   # without pre-strain the e0 terms are skipped
+    top = np.maximum(n-e0, 0) if pre else n
+    lo, hi = np.zeros_like(n), top.copy()
+    x = hi/2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        c = np.log(K*t0/T1)
+        gmax = n*np.log(np.maximum(n, e0) if pre else n) - top + c
+        elastic = (n*np.log(e0) + c >= 0) if pre else False   # T1 below the yield tension of the pre-strained sheet
+        # no root to converge to: T1 above the maximum, elastic or nan
+        skip = ~(gmax >= 0) | elastic | (T1 == 0)
+        for i in range(maxiter):
+            u = e0+x if pre else x
+            g = n*np.log(u) - x + c
+            lo = np.where(g < 0, x, lo)
+            hi = np.where(g > 0, x, hi)
+            xn = x - g/(n/u - 1)
+            xn = np.where((xn >= lo) & (xn <= hi), xn, (lo+hi)/2)
+            done = np.all((np.abs(xn-x) <= tol*np.abs(x)) | skip)
+            x = xn
+            if done:
+                break
+    x = np.where((T1 == 0) | elastic, 0, x)
+    return np.where(gmax < 0, np.nan, x)
+
 def plot_T1(params, length, theta, tension):
     position, ps, pT1, pp, ps2 = get_vars(params, length, theta, tension)
     sO, sA, sB, sC, sD, sE, sF = position
@@ -76,13 +111,8 @@ def plot_strain(params, length, theta, tension, strain, thickness):
     e1O, e1A, e1B, e1C, e1D, e1E, e1F = strain
 
     pstrain = [e1O]
-    s1 = lambda e1: K*e1**n
-    funcT1 = lambda x : s1(x)*t0*math.exp(-x)
     for i in range(len(pT1)-2):
-        t1 = pT1[i+1]
-        e1 = pstrain[i]
-        funct1 = lambda x : t1 - funcT1(x)
-        pstrain.append(fsolve(funct1, e1))
+        pstrain.append(strain_from_tension(pT1[i+1], K, n, t0, pstrain[i]))
     pstrain.append(e1F)
     #pstrain = [fsolve(funcA, e1O) for i in pT1]
 
@@ -169,14 +199,10 @@ if __name__ == "__main__":
     B = T1E/(2*mu)
     F = 2*T1B*math.sin(thetaOB)
     
-    funcT1 = lambda x : s1(x)*t0*math.exp(-x)
-    funcA = lambda x : T1A - funcT1(x)
-    funcB = lambda x : T1B - funcT1(x)
-    funcD = lambda x : T1D - funcT1(x)
-    e1A = fsolve(funcA, e1O)
-    e1B = fsolve(funcB, e1A)
+    e1A = strain_from_tension(T1A, K, n, t0, e1O)
+    e1B = strain_from_tension(T1B, K, n, t0, e1A)
     e1C = e1B
-    e1D = fsolve(funcD, e1C)
+    e1D = strain_from_tension(T1D, K, n, t0, e1C)
     e1E = e1D
     e1F = 0
 
@@ -44,6 +44,9 @@ def s1(y, rho, Ep, Yp):
     s1e = Ep*e1(y,rho)
     return s1e if abs(e1(y,rho))<Yp/Ep else Yp*signo
 
+def s1_batch(y, rho, Ep, Yp):
+    return np.clip(Ep*e1(y,rho), -Yp, Yp)
+
 def bending_char(t, Ep, Yp):
     rhoe = Ep*t/(2*Yp)
     Me = Yp*t**2/6
@@ -53,6 +56,10 @@ def bending_char(t, Ep, Yp):
 def M(rho, rhoe, Me):
     return Me*rhoe/rho if rho>rhoe else Me*(3-(rho/rhoe)**2)/2
 
+def M_batch(rho, rhoe, Me):
+    rho = np.asarray(rho, dtype=float)
+    return np.where(rho>rhoe, Me*rhoe/rho, Me*(3-(rho/rhoe)**2)/2)
+
 def plot_moment_curvature(rhoe, Me, Mp):
     x = np.arange(1/rhoe, 0.01, 1e-4)
     y = [M(1/i, rhoe, Me) for i in x]
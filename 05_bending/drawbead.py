@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Restraining force of a circular drawbead: the sheet is bent and unbent over
+the entry shoulder, the bead and the exit shoulder, and slides over each of
+them with friction.
+
+Each bend or unbend over a radius R increases the tension by M/rho, with
+rho = R + t/2 and M the bending moment of bending.M; the contact over a wrap
+angle theta multiplies it by exp(mu*theta). The whole bead is then an affine
+relation between the tension entering from the flange (T_in) and leaving to
+the die (T_out):
+
+    T_out = factor*T_in + offset
+
+which is the drawbead segment of the draw section (draw_section.drawbead).
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import bending as bd
+
+def bend_unbend(t, Ep, Yp, R):
+    ''' Tension increase of one bend (or unbend) over the radius R'''
+    rhoe, Me, Mp = bd.bending_char(t, Ep, Yp)
+    rho = R + t/2
+    return bd.M_batch(rho, rhoe, Me)/rho
+
+def bead_coefficients(t, Ep, Yp, Rs, Rb, theta, mu):
+    ''' Coefficients (factor, offset) of T_out = factor*T_in + offset
+
+    Rs: radius of the shoulders, Rb: radius of the bead, theta: wrap angle
+    over each shoulder (the bead is wrapped 2*theta).'''
+    dTs = bend_unbend(t, Ep, Yp, Rs)
+    dTb = bend_unbend(t, Ep, Yp, Rb)
+    f1 = np.exp(mu*theta)
+    f2 = np.exp(2*mu*theta)
+    # entry shoulder, bead and exit shoulder: bend, slide, unbend
+    factor = f1*f2*f1
+    offset = ((dTs*f1 + dTs + dTb)*f2 + dTb + dTs)*f1 + dTs
+    return factor, offset
+
+def restraint(T_in, t, Ep, Yp, Rs, Rb, theta, mu):
+    ''' Increase of tension through the drawbead, T_out - T_in'''
+    factor, offset = bead_coefficients(t, Ep, Yp, Rs, Rb, theta, mu)
+    return (factor-1)*T_in + offset
+
+def plot_restraint(t, Ep, Yp, Rs, theta, mu):
+    ''' Drawbead restraining force (no back tension) as a function of the bead radius'''
+    Rb = np.linspace(2, 20, 100)
+    fig, ax = plt.subplots()
+    for mu_ in np.atleast_1d(mu):
+        factor, offset = bead_coefficients(t, Ep, Yp, Rs, Rb, theta, mu_)
+        ax.plot(Rb, offset, label=r'$\mu=%s$' % mu_)
+    ax.set_ylim(0)
+    ax.set_xlabel(r'Bead radius, $R_b$ (mm)')
+    ax.set_ylabel(r'Restraining force, $T_{out}$ (kN/m)')
+    plt.title(r'$t=%s$ mm, $R_s=%s$ mm, $\theta=%.0f^{\circ}$' % (t, Rs, np.degrees(theta)))
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    t = 0.8
+    E = 210e3
+    nu = 0.3
+    Y = 200
+    Ep, Yp = bd.constants_plane_strain(E, nu, Y)
+
+    # thousands of candidate beads evaluated at once
+    rng = np.random.default_rng(0)
+    Rs = rng.uniform(3, 10, 5000)
+    Rb = rng.uniform(3, 10, 5000)
+    theta = np.radians(rng.uniform(30, 90, 5000))
+    factor, offset = bead_coefficients(t, Ep, Yp, Rs, Rb, theta, 0.1)
+    print('Restraining force (kN/m): min %.1f, max %.1f' % (offset.min(), offset.max()))
+    plot_restraint(t, Ep, Yp, 4, np.radians(60), (0.05, 0.1, 0.15))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Layered sheet section for bending histories (bend, unbend, rebend), e.g.
+the passes of a roll-forming line or a drawbead.
+
+The thickness t is divided into layers at y (midpoint rule), with strain
+e1 = y*curvature (bending.e1) and plane strain elastic-plastic behaviour,
+Ep = E/(1-nu^2), Yp = sqrt(3)/2*Y (bending.constants_plane_strain), with
+optional linear kinematic hardening H (H = 0: bending.s1). The state of the
+layers of many sheets (strain, stress, plastic strain, back stress) is kept
+in preallocated arrays of shape (sheets, layers) and updated in place at
+each curvature step; the moment is M = sum(s1*y*dy) (Nm/m).
+"""
+
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+import bending as bd
+
+class Section:
+
+    def __init__(self, t, Ep, Yp, H=0, layers=200, sheets=1):
+        ''' Section of thickness t; t, Ep, Yp and H are scalars or arrays (sheets,)'''
+        self.t, self.layers, self.sheets = t, layers, sheets
+        col = lambda x: np.broadcast_to(np.asarray(x, dtype=float), (sheets,))[:, None].copy()
+        if np.ndim(t):
+            t = col(t)   # layers of each sheet (sheets, layers)
+        dy = t/layers
+        self.y = -t/2 + dy*(np.arange(layers)+0.5)
+        self.yw = self.y*dy
+        self.Ep, self.Yp, self.H = col(Ep), col(Yp), col(H)
+        self.curvature = np.zeros(sheets)
+        self.e = np.zeros((sheets, layers))       # total strain
+        self.s = np.zeros((sheets, layers))       # stress
+        self.ep = np.zeros((sheets, layers))      # accumulated plastic strain
+        self.alpha = np.zeros((sheets, layers))   # back stress
+        self._w = np.empty((sheets, layers))      # work arrays
+        self._f = np.empty((sheets, layers))
+        self._sign = np.empty((sheets, layers))
+        self._dg = np.empty((sheets, layers))
+
+    def reset(self):
+        for a in (self.curvature, self.e, self.s, self.ep, self.alpha):
+            a.fill(0)
+
+    def step(self, curvature):
+        ''' Advances the layers to the curvature (sheets,) and returns the moment (sheets,)'''
+        w, f, sign, dg = self._w, self._f, self._sign, self._dg
+        # elastic trial: s = s + Ep*(y*curvature - e)
+        np.multiply(np.asarray(curvature, dtype=float).reshape(-1, 1), self.y, out=w)
+        np.subtract(w, self.e, out=f)
+        self.e[...] = w
+        f *= self.Ep
+        self.s += f
+        # radial return: f = |s - alpha| - Yp
+        np.subtract(self.s, self.alpha, out=w)
+        np.sign(w, out=sign)
+        np.abs(w, out=f)
+        f -= self.Yp
+        np.maximum(f, 0, out=f)
+        np.divide(f, self.Ep + self.H, out=dg)
+        self.ep += dg
+        dg *= sign
+        np.multiply(dg, self.Ep, out=w)
+        self.s -= w
+        np.multiply(dg, self.H, out=w)
+        self.alpha += w
+        self.curvature[:] = curvature
+        return self.moment()
+
+    def moment(self):
+        return self.s @ self.yw if self.yw.ndim == 1 else np.einsum('ij,ij->i', self.s, self.yw)
+
+    def run(self, history, out=None):
+        ''' Curvature history (steps, sheets) -> moment at each step (steps, sheets)'''
+        history = np.asarray(history, dtype=float).reshape(len(history), -1)
+        out = np.empty((len(history), self.sheets)) if out is None else out
+        for i, k in enumerate(history):
+            out[i] = self.step(np.broadcast_to(k, (self.sheets,)))
+        return out
+
+    def springback(self):
+        ''' Elastic unloading to M = 0: curvature after springback and residual stresses'''
+        I = self.t**3/12
+        dk = -self.moment()/(self.Ep[:, 0]*I)
+        return self.curvature + dk, self.s + self.Ep*self.y*dk[:, None]
+
+
+def bend_unbend_history(radii, steps=20):
+    ''' Curvature history that bends to each radius in turn (inf: flat), with steps per pass'''
+    k = np.concatenate(([0], [0 if np.isinf(R) else 1/R for R in radii]))
+    w = np.linspace(0, 1, steps+1)[1:]
+    return np.concatenate([k0 + (k1-k0)*w for k0, k1 in zip(k[:-1], k[1:])])
+
+def plot_history(history, M, sec, i=0):
+    ''' Moment-curvature loop and stress through the thickness at the end of the history'''
+    fig, ax = plt.subplots(1, 2, figsize=(11,5))
+    ax[0].axhline(y=0, color='k', lw=0.2)
+    ax[0].axvline(x=0, color='k', lw=0.2)
+    ax[0].plot(history[:, i] if history.ndim > 1 else history, M[:, i], 'b-')
+    ax[0].set_xlabel(r'Sheet curvature, $1/\rho$ (mm$^{-1}$)')
+    ax[0].set_ylabel(r'Bending moment, $M$ (Nm/m)')
+    k, sres = sec.springback()
+    ax[1].axvline(x=0, color='k', ls=':', lw=0.5)
+    ax[1].plot(sec.s[i], sec.y, 'r-', label='Loaded')
+    ax[1].plot(sres[i], sec.y, 'g--', label=r'After springback ($1/\rho=%.4f$)' % k[i])
+    ax[1].set_xlabel(r'Major stress, $\sigma_1$ (MPa)')
+    ax[1].set_ylabel(r'Thickness, $t$ (mm)')
+    plt.legend()
+    plt.show()
+
+
+if __name__ == "__main__":
+    t = 1.2
+    E = 210e3
+    nu = 0.3
+    Y = 100
+    Ep, Yp = bd.constants_plane_strain(E, nu, Y)
+    rhoe, Me, Mp = bd.bending_char(t, Ep, Yp)
+
+    # monotonic bending against the closed form of bending.M
+    sec = Section(t, Ep, Yp, layers=400)
+    rho = np.linspace(5*rhoe, rhoe/20, 100)
+    M = sec.run(1/rho)[:, 0]
+    print('Max. difference with bending.M: %.2e Nm/m' % np.abs(M - bd.M_batch(rho, rhoe, Me)).max())
+
+    # 1000 sheets through 100 bend/unbend passes over radii of 5-20 mm (drawbead, roll forming)
+    sheets = 1000
+    R = np.random.default_rng(0).uniform(5, 20, sheets)
+    history = np.concatenate([np.outer(bend_unbend_history([1, np.inf], 10), 1/R)]*100)
+    sec = Section(t, Ep, Yp, H=Ep/100, sheets=sheets, layers=100)
+    t0 = time.perf_counter()
+    M = sec.run(history)
+    print('%d sheets x %d steps: %.2f s, max. plastic strain %.3f' % (sheets, len(history), time.perf_counter()-t0, sec.ep.max()))
+
+    sec = Section(t, Ep, Yp, H=Ep/100)
+    history = bend_unbend_history([10, np.inf, -10, 20], 40)
+    M = sec.run(history)
+    plot_history(history, M, sec)
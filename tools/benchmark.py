@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Benchmark of the compute kernels of the five chapters.
+
+Each case times the scalar function (called in a Python loop, as the
+notebooks do) and its array counterpart at N = 1, 10^3 and 10^6 points
+(plus the extra sizes of EXTRA_SIZES), after checking that both paths give
+the same numbers. Timings are compared
+with a stored baseline (benchmark_baseline.json) to catch regressions:
+
+    python tools/benchmark.py            # compare with the baseline
+    python tools/benchmark.py --save     # store a new baseline
+    python tools/benchmark.py --save fld # update the baseline of one case
+    python tools/benchmark.py --quick    # skip N = 10^6
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+import numpy as np
+
+import chapters
+import functions
+import hosford_thin_wall_tube as tube
+import anisotropy
+import necking
+import examen_2019_stretching as stretching
+import marciniak_stamping_example as stamping
+import bending
+import fld
+
+SIZES = (1, 10**3, 10**6)
+SCALAR_MAX = 10**3   # the scalar loops are not timed above this size
+EXTRA_SIZES = {'fld': (10**7,)}   # full-size meshes, not run with --quick
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+# Inputs of each case: dict of arrays with N values
+
+def stress_inputs(N, rng):
+    keys = ('sx', 'sy', 'sz', 'sxy', 'sxz', 'syz')
+    return {k: rng.uniform(-300, 300, N) for k in keys}
+
+def plane_stress_inputs(N, rng):
+    return {'s1': rng.uniform(100, 500, N), 'alpha': rng.uniform(-1, 1, N),
+            'r0': rng.uniform(0.5, 2, N), 'r90': rng.uniform(0.5, 2, N)}
+
+def necking_inputs(N, rng):
+    return {'b': rng.uniform(-0.9, 1, N), 'n': rng.uniform(0.1, 0.4, N),
+            'e0': rng.uniform(0, 0.1, N)}
+
+def tube_inputs(N, rng):
+    return {'Y': rng.uniform(200, 400, N), 't': rng.uniform(1, 3, N), 'D': rng.uniform(50, 120, N),
+            'F': rng.uniform(0, 10000, N), 'T': rng.uniform(0, 500, N)}
+
+def stretching_inputs(N, rng):
+    return {'R': rng.uniform(900, 1300, N), 'TL': np.full(N, 3000.), 'CL': rng.uniform(200, 400, N),
+            'mu': rng.uniform(0.05, 0.2, N), 't0': rng.uniform(0.8, 1.5, N), 'K': rng.uniform(500, 900, N),
+            'n': rng.uniform(0.2, 0.3, N), 'angle': rng.uniform(15, 35, N)}
+
+def tension_inputs(N, rng):
+    K = rng.uniform(500, 900, N)
+    n = rng.uniform(0.15, 0.3, N)
+    t0 = rng.uniform(0.6, 1.2, N)
+    e1 = rng.uniform(0.01, 0.9, N)*n
+    return {'T1': K*e1**n*t0*np.exp(-e1), 'K': K, 'n': n, 't0': t0}
+
+def fld_inputs(N, rng):
+    e1 = rng.uniform(0.01, 0.5, N)
+    return {'strain': np.stack((e1, rng.uniform(-0.9, 1, N)*e1), axis=-1)}
+
+def bending_inputs(N, rng):
+    return {'rho': rng.uniform(5, 2000, N), 'rhoe': np.full(N, 1000.), 'Me': np.full(N, 20.)}
+
+
+# Scalar paths: loops over the original functions
+
+def loop(func, d, *keys):
+    return np.array([func(*args) for args in zip(*(d[k] for k in keys))])
+
+def principal_scalar(d):
+    ps = loop(functions.principal_stresses, d, 'sx', 'sy', 'sz', 'sxy', 'sxz', 'syz')
+    return -np.sort(-ps.real, axis=-1)
+
+def compute_p_scalar(d):
+    return np.array([tube.compute_p(params) for params in zip(d['Y'], d['t'], d['D'], d['F'], d['T'])])
+
+def stretching_scalar(d):
+    keys = ('R', 'TL', 'CL', 'mu', 't0', 'K', 'n', 'angle')
+    out = [stretching.solve_stretching(*args)[1] for args in zip(*(d[k] for k in keys))]
+    return np.array(out)[:, [0, 1, 7]]   # e1O, e1A, F
+
+def stretching_batch(d):
+    s, e1O, e1A, tO, tA, T1O, T1A, p, F = stretching.solve_stretching_batch(**d)
+    return np.stack((e1O, e1A, F), axis=-1)
+
+def tension_scalar(d):
+    return np.array([stamping.strain_from_tension(T1, K, n, t0) for T1, K, n, t0 in zip(d['T1'], d['K'], d['n'], d['t0'])])
+
+FLD_N = 0.22
+FLD_TABLE = fld.limit_table(FLD_N)
+
+def fld_scalar(d):
+    e1lim = [necking.e1h(e2/e1, FLD_N) if e2 <= 0 else necking.e1s(e2/e1, FLD_N) for e1, e2 in d['strain']]
+    return np.array(e1lim) - d['strain'][:, 0]
+
+def fld_batch(d):
+    state, thinning = fld.assess(d['strain'], FLD_TABLE)
+    e1, e2 = d['strain'][:, 0], d['strain'][:, 1]
+    return thinning/(1+e2/e1)   # distance to the limit in major strain
+
+
+# name: (inputs, scalar path, array path, relative tolerance)
+CASES = {
+    'principal_stresses': (stress_inputs, principal_scalar,
+        lambda d: functions.principal_stresses_batch(**d), 1e-6),
+    'mises': (stress_inputs, lambda d: loop(functions.mises, d, 'sx', 'sy', 'sz', 'sxy', 'sxz', 'syz'),
+        lambda d: functions.mises_batch(**d), 1e-12),
+    'eff_stress_Hosford': (plane_stress_inputs,
+        lambda d: np.array([anisotropy.eff_stress_Hosford(s1, al, r0, r90, 8) for s1, al, r0, r90 in zip(d['s1'], d['alpha'], d['r0'], d['r90'])]),
+        lambda d: anisotropy.eff_stress_Hosford(d['s1'], d['alpha'], d['r0'], d['r90'], 8), 1e-12),
+    'e1s': (necking_inputs, lambda d: loop(necking.e1s, d, 'b', 'n'),
+        lambda d: necking.e1s_batch(d['b'], d['n']), 1e-12),
+    'e1h': (necking_inputs, lambda d: loop(necking.e1h, d, 'b', 'n', 'e0'),
+        lambda d: necking.e1h_batch(d['b'], d['n'], d['e0']), 1e-12),
+    'compute_p': (tube_inputs, compute_p_scalar, lambda d: tube.compute_p_batch(**d), 1e-6),
+    'stretching': (stretching_inputs, stretching_scalar, stretching_batch, 1e-6),
+    'strain_from_tension': (tension_inputs, tension_scalar,
+        lambda d: stamping.strain_from_tension_batch(**d), 1e-6),
+    'fld': (fld_inputs, fld_scalar, fld_batch, 1e-3),
+    'bending_M': (bending_inputs, lambda d: loop(bending.M, d, 'rho', 'rhoe', 'Me'),
+        lambda d: bending.M_batch(**d), 1e-12),
+}
+
+
+def best_time(func, d, repeat):
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func(d)
+        t.append(time.perf_counter() - t0)
+    return min(t)
+
+def check(name, scalar, batch, d, rtol):
+    ys = scalar(d)
+    yb = batch(d)
+    np.testing.assert_allclose(yb, ys, rtol=rtol, atol=1e-9, err_msg=name)
+
+def run(sizes=SIZES, repeat=5, seed=0, cases=None):
+    results = {}
+    for name, (inputs, scalar, batch, rtol) in CASES.items():
+        if cases and name not in cases:
+            continue
+        rng = np.random.default_rng(seed)
+        check(name, scalar, batch, inputs(100, rng), rtol)
+        results[name] = {'scalar': {}, 'batch': {}}
+        for N in sizes + (EXTRA_SIZES.get(name, ()) if SIZES[-1] in sizes else ()):
+            d = inputs(N, rng)
+            if N <= SCALAR_MAX:
+                results[name]['scalar'][str(N)] = best_time(scalar, d, repeat)
+            results[name]['batch'][str(N)] = best_time(batch, d, repeat)
+    return results
+
+def compare(results, baseline, tolerance, floor):
+    regressions = []
+    for name, paths in results.items():
+        for path, times in paths.items():
+            for N, t in times.items():
+                tb = baseline.get(name, {}).get(path, {}).get(N)
+                if tb is None or max(t, tb) < floor:
+                    continue
+                if t > (1+tolerance)*tb:
+                    regressions.append((name, path, N, t, tb))
+    return regressions
+
+def print_results(results):
+    print('%-22s %-7s %10s %14s %14s' % ('case', 'path', 'N', 'time (s)', 'per point (s)'))
+    for name, paths in results.items():
+        for path, times in paths.items():
+            for N, t in times.items():
+                print('%-22s %-7s %10s %14.3e %14.3e' % (name, path, N, t, t/int(N)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--save', action='store_true', help='store the timings as the new baseline')
+    parser.add_argument('--quick', action='store_true', help='skip N = 10^6')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown (0.5 = 50%%)')
+    parser.add_argument('--floor', type=float, default=1e-4, help='ignore timings below this value (s)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('cases', nargs='*', help='cases to run (default: all)')
+    args = parser.parse_args()
+
+    # fsolve complains when it steps outside the domain of the scalar functions
+    warnings.simplefilter('ignore', RuntimeWarning)
+    sizes = SIZES[:-1] if args.quick else SIZES
+    results = run(sizes, args.repeat, cases=args.cases)
+    print_results(results)
+
+    if args.save:
+        if args.cases and os.path.exists(args.baseline):
+            # only the selected cases are replaced
+            with open(args.baseline) as fp:
+                results = dict(json.load(fp)['results'], **results)
+        with open(args.baseline, 'w') as fp:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'results': results}, fp, indent=1)
+        print('Baseline saved to %s' % args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)['results']
+        regressions = compare(results, baseline, args.tolerance, args.floor)
+        for name, path, N, t, tb in regressions:
+            print('REGRESSION %s (%s, N=%s): %.3e s vs %.3e s in the baseline' % (name, path, N, t, tb))
+        sys.exit(1 if regressions else 0)
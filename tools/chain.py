@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Process chains of the forming operations of the chapters, e.g. stretching
+over a punch, drawing of a section and bending, where each stage starts from
+the state of the sheet left by the previous one:
+
+    t          thickness (mm)
+    eeff       effective strain
+    residual   residual stress through the thickness (MPa), (parts, layers)
+    K, n, Y    material: Hollomon law s = K*e^n and initial yield stress
+    necked     the part necked in a previous stage
+
+All the arrays have one value per part (or section), so many parts are run
+at once. The stretching and drawing stages are plane strain: the sheet
+enters with the pre-strain e0 = sqrt(3)/2*eeff of the major strain
+(s1 = K*(e0 + e1)^n in examen_2019_stretching.solve_stretching_batch and
+draw_section.propagate), the state is taken at the most strained point
+and a plastic membrane stage leaves no residual stresses. The bending
+stage (layered_bending.Section) bends the sheet with the flow stress
+K*eeff^n (at least Y) and the residual stresses of the previous stages,
+and returns the springback and the new residual stresses.
+
+A part that necks in a membrane stage (nan strain at any point of the
+stretched or drawn section) is flagged as necked, and its thickness and
+effective strain, and then all the outputs of the following stages, are nan.
+
+The outputs of each stage are cached (in memory and npz files) by the hash
+of its parameters and of the state it starts from, so changing a stage only
+runs that stage and the following ones.
+
+    state = material(t0=1.2, K=810, n=0.24, Y=250, parts=1000)
+    res = run(state, [('stretching', {...}), ('drawing', {...}), ('bending', {'R': 10})])
+    res[-1]['outputs']['springback'], res[-1]['state']['residual']
+"""
+
+import hashlib
+import math
+import os
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+import chapters
+import models
+import examen_2019_stretching as stretching_
+import draw_section as ds
+import bending as bd
+import layered_bending as lb
+
+CACHE = os.path.join(chapters.ROOT, '.cache', 'chain')
+PLANE = math.sqrt(3)/2   # major strain of plane strain over the effective strain
+
+def material(t0, K, n, Y, parts=1):
+    ''' State of virgin sheets'''
+    col = lambda x: np.broadcast_to(np.asarray(x, dtype=float), (parts,)).copy()
+    return {'t': col(t0), 'eeff': np.zeros(parts), 'residual': np.zeros((parts, 0)),
+            'K': col(K), 'n': col(n), 'Y': col(Y), 'necked': np.zeros(parts, dtype=bool)}
+
+def _next(state, e1):
+    ''' State after a plane strain membrane stage with major strain e1 (>= 0, nan: necked)'''
+    plastic = (e1 > 0)[:, None]
+    residual = np.where(plastic, 0, state['residual']) if state['residual'].size else state['residual']
+    return dict(state, t=state['t']*np.exp(-e1), eeff=state['eeff'] + e1/PLANE, residual=residual,
+                necked=state.get('necked', False) | np.isnan(e1))
+
+def stretching(state, R, TL, CL, mu, angle):
+    ''' Stretching over a punch (examen_2019_stretching), state at O or A (the most strained)'''
+    e0 = PLANE*state['eeff']
+    s, e1O, e1A, tO, tA, T1O, T1A, p, F = stretching_.solve_stretching_batch(
+        R, TL, CL, mu, state['t'], state['K'], state['n'], angle, e0)
+    e1 = np.maximum(e1O, e1A)
+    out = {'stroke': s, 'force': F, 'e1O': e1O, 'e1A': e1A, 'thinning': 1-np.exp(-e1),
+           'margin': state['n'] - (e0 + e1), 'necked': np.isnan(e1)}
+    return _next(state, e1), out
+
+def drawing(state, Rf, a, Rp, Rd, sBC, sEF, mu, e1O):
+    ''' Draw section of marciniak_stamping_example with the strain e1O at the pole'''
+    e0 = PLANE*state['eeff']
+    K, n, t = state['K'], state['n'], state['t']
+    T1O = K*(e0 + e1O)**n*t*np.exp(-e1O)
+    res = ds.propagate(models.draw_segments(Rf, a, Rp, Rd, sBC, sEF), T1O, mu, K, n, t, e0)
+    e1 = np.max(res['e1'], axis=-1)   # nan if the section necked anywhere
+    out = {'force': res['F'], 'blankholder': res['B'][..., 0], 'thinning': 1-np.exp(-e1),
+           'margin': n - (e0 + e1), 'necked': np.isnan(e1)}
+    return _next(state, e1), out
+
+def bending(state, R, E=210e3, nu=0.3, layers=100, steps=20, hardening=True):
+    ''' Bending to the radius R and springback (layered_bending.Section)'''
+    t, K, n, eeff = state['t'], state['K'], state['n'], state['eeff']
+    Ep, Yp = bd.constants_plane_strain(E, nu, np.maximum(state['Y'], K*eeff**n))
+    # linear kinematic hardening with the slope of the Hollomon law at eeff
+    H = n*K*np.maximum(eeff, 0.002)**(n-1) if hardening else 0
+    sec = lb.Section(t, Ep, Yp, H, layers, len(t))
+    sec.s[:] = _resample(state['residual'], layers)
+    rho = np.asarray(R, dtype=float) + t/2
+    M = sec.run(np.linspace(0, 1, steps+1)[1:, None]/rho)[-1]
+    k, residual = sec.springback()
+    ep = sec.ep.max(axis=-1)
+    out = {'moment': M, 'springback': k*rho, 'radius_unloaded': 1/k - t/2, 'plastic_strain': ep,
+           'residual_max': np.abs(residual).max(axis=-1)}
+    return dict(state, eeff=eeff + ep/PLANE, residual=residual), out
+
+def _resample(profile, layers):
+    ''' Profiles through the thickness (parts, m) at layers points (m = 0: zero)'''
+    parts, m = profile.shape
+    if m == layers:
+        return profile
+    if m == 0:
+        return np.zeros((parts, layers))
+    x = (np.arange(layers)+0.5)/layers*m - 0.5
+    i = np.clip(np.floor(x).astype(np.intp), 0, max(m-2, 0))
+    w = np.clip(x-i, 0, 1) if m > 1 else np.zeros(layers)
+    return profile[:, i]*(1-w) + profile[:, np.minimum(i+1, m-1)]*w
+
+STAGES = {'stretching': stretching, 'drawing': drawing, 'bending': bending}
+
+_source = {}
+_memory = {}
+
+def _update(h, x):
+    a = np.asarray(x)
+    h.update(('%s%s' % (a.dtype.str, a.shape)).encode())
+    h.update(np.ascontiguousarray(a).tobytes())
+
+def state_key(state):
+    ''' Hash of a state'''
+    h = hashlib.sha256()
+    for k in sorted(state):
+        h.update(k.encode())
+        _update(h, state[k])
+    return h.hexdigest()[:20]
+
+def source_hash():
+    ''' Hash of the source of the stages and of their kernels'''
+    if not _source:
+        h = hashlib.sha256()
+        for f in (__file__, models.__file__, stretching_.__file__, ds.__file__, ds.mse.__file__, bd.__file__, lb.__file__):
+            with open(f, 'rb') as fh:
+                h.update(fh.read())
+        _source['hash'] = h.hexdigest()
+    return _source['hash']
+
+def stage_key(parent, name, params):
+    ''' Hash of a stage from the key of the state it starts from (parent) and its parameters'''
+    h = hashlib.sha256((parent + name + source_hash()).encode())
+    for k in sorted(params):
+        h.update(k.encode())
+        _update(h, params[k])
+    return h.hexdigest()[:20]
+
+def _save(filename, state, out):
+    np.savez(filename + '.tmp.npz', **{'state/' + k: v for k, v in state.items()},
+             **{'out/' + k: v for k, v in out.items()})
+    os.replace(filename + '.tmp.npz', filename)
+
+def _load(filename):
+    with np.load(filename) as data:
+        state = {k[6:]: data[k] for k in data.files if k.startswith('state/')}
+        out = {k[4:]: data[k] for k in data.files if k.startswith('out/')}
+    return state, out
+
+def run(state, stages, cache=CACHE, memory=True):
+    ''' Runs the stages [(name, params), ...] from the state
+
+    Returns one dict per stage with its 'name', 'key', the 'state' after it,
+    its 'outputs' and whether it was 'cached'. cache: folder of the npz files
+    (None: not on disk); memory: keep the results in this process.'''
+    key = state_key(state)
+    results = []
+    for name, params in stages:
+        key = stage_key(key, name, params)
+        filename = os.path.join(cache, key + '.npz') if cache else None
+        cached = True
+        if memory and key in _memory:
+            state, out = _memory[key]
+        elif filename and os.path.exists(filename):
+            state, out = _load(filename)
+        else:
+            with np.errstate(all='ignore'):
+                state, out = STAGES[name](state, **params)
+            out = {k: np.broadcast_to(v, state['t'].shape) for k, v in out.items()}
+            cached = False
+            if filename:
+                os.makedirs(cache, exist_ok=True)
+                _save(filename, state, out)
+        if memory:
+            _memory[key] = state, out
+        results.append({'name': name, 'key': key, 'state': state, 'outputs': out, 'cached': cached})
+    return results
+
+def plot_chain(state, results, i=0):
+    ''' Thickness and effective strain after each stage and residual stresses of one part'''
+    fig, ax = plt.subplots(1, 2, figsize=(11,4.5))
+    names = ['initial'] + [r['name'] for r in results]
+    t = [state['t'][i]] + [r['state']['t'][i] for r in results]
+    e = [state['eeff'][i]] + [r['state']['eeff'][i] for r in results]
+    ax[0].plot(names, t, 'bo-')
+    ax[0].set_ylabel(r'Thickness, $t$ (mm)', color='b')
+    ax2 = ax[0].twinx()
+    ax2.plot(names, e, 'rs--')
+    ax2.set_ylabel(r'Effective strain, $\varepsilon_{eff}$', color='r')
+    residual = results[-1]['state']['residual'][i]
+    if residual.size:
+        tt = results[-1]['state']['t'][i]
+        y = -tt/2 + tt*(np.arange(len(residual))+0.5)/len(residual)
+        ax[1].axvline(x=0, color='k', lw=0.5)
+        ax[1].plot(residual, y, 'g-')
+    ax[1].set_xlabel(r'Residual stress, $\sigma_1$ (MPa)')
+    ax[1].set_ylabel(r'Thickness, $t$ (mm)')
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    # 10000 parts with coil-to-coil scatter of the material
+    parts = 10000
+    rng = np.random.default_rng(0)
+    state = material(t0=rng.normal(1.2, 0.02, parts), K=rng.normal(810, 25, parts),
+                     n=rng.normal(0.24, 0.01, parts), Y=250, parts=parts)
+    st = dict(models.NOMINAL['stretching'], angle=20)
+    stages = [('stretching', {k: st[k] for k in ('R', 'TL', 'CL', 'mu', 'angle')}),
+              ('drawing', {'Rf': 2800, 'a': 330, 'Rp': 10, 'Rd': 10, 'sBC': 28, 'sEF': 80, 'mu': 0.05, 'e1O': 0.02}),
+              ('bending', {'R': 10})]
+    for R in (10, 5):
+        stages[-1] = ('bending', {'R': R})
+        t0 = time.perf_counter()
+        res = run(state, stages)
+        print('Bending radius %g mm: %.2f s (%s)' % (R, time.perf_counter()-t0,
+              ', '.join('%s %s' % (r['name'], 'cached' if r['cached'] else 'run') for r in res)))
+        for r in res:
+            print('  %-10s %5d necked, t = %.4f mm, eeff = %.4f' % (r['name'], r['state']['necked'].sum(),
+                  np.nanmean(r['state']['t']), np.nanmean(r['state']['eeff']))
+                  + ''.join(', %s = %.4g' % (k, np.nanmean(r['outputs'][k])) for k in ('force', 'margin', 'springback')
+                            if k in r['outputs']))
+    # virgin sheet bent to the same radius
+    res0 = run(state, stages[-1:])
+    print('Springback without the previous stages: %.4f' % np.nanmean(res0[0]['outputs']['springback']))
+    plot_chain(state, res)
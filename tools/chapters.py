@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Makes the chapter modules importable from the tools, the same way the
+notebooks import them from their own folder:
+
+    import chapters
+    import necking, bending
+
+This is the only place where the path is set. Each chapter only imports
+the modules of its own folder, so its scripts and notebooks also run from
+there; scripts can be run from anywhere through this file:
+
+    python tools/chapters.py 03_failure/warm_necking.py [args]
+"""
+
+import os
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAPTERS = ('01_plasticity', '02_anisotropy', '03_failure', '04_stamping', '05_bending')
+
+for chapter in CHAPTERS:
+    path = os.path.join(ROOT, chapter)
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit('usage: python tools/chapters.py SCRIPT [ARGS]')
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+    runpy.run_path(sys.argv[0], run_name='__main__')
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Streaming readers of measured (DIC) and simulated (FE) strain and stress
+fields, for the batch evaluators of the failure and plasticity chapters:
+forming limits and fracture line (fld.assess) and principal and Mises
+stresses (stress_field.analyze, field_statistics).
+
+The readers yield chunks of points as dicts name -> array (points,) or
+(points, components):
+
+    .csv, .txt   header row with the names of the columns (or columns=[...])
+    .npy         memory-mapped; structured arrays give their fields, 2D arrays need columns=[...]
+    .npz         one array per name; the stored (not compressed) ones are memory-mapped
+    .vtk         legacy VTK points and point data (SCALARS, VECTORS, TENSORS, FIELD),
+                 ASCII or BINARY (memory-mapped)
+
+Strains are taken from the columns e1, e2 (major and minor strains) or exx,
+eyy, exy (in-plane tensor components, principal strains computed), or from
+an array 'strain' of 2, 3 or 9 (tensor) components. Stresses from the
+columns sx, sy, sz, sxy, sxz, syz or an array 'stress' of 6 or 9 components.
+The names of other exports are mapped with rename={'Major strain': 'e1', ...}.
+
+The next chunks are read in a background thread while the current one is
+evaluated (prefetch, double buffering by default).
+
+    for res in assess_file('part.vtk', n=0.22, e3f=0.9):
+        ...
+    stress_statistics('part.npy', columns=['sx', 'sy', 'sz', 'sxy', 'sxz', 'syz'])
+"""
+
+import itertools
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import numpy as np
+
+import chapters
+import fld
+import stress_field as sf
+
+def _rename(chunk, rename):
+    return {rename.get(k, k): v for k, v in chunk.items()} if rename else chunk
+
+def read_csv(filename, chunk=10**6, columns=None, delimiter=','):
+    ''' Text file with one point per row (a header row with the names unless columns are given)'''
+    with open(filename) as fp:
+        if columns is None:
+            columns = [c.strip() for c in fp.readline().split(delimiter)]
+        while True:
+            lines = list(itertools.islice(fp, chunk))
+            if not lines:
+                break
+            data = np.loadtxt(lines, delimiter=delimiter, ndmin=2)
+            yield {k: data[:, j] for j, k in enumerate(columns)}
+
+def _chunks(arrays, chunk):
+    ''' Chunks of a dict of (memory-mapped) arrays, copied to memory'''
+    N = len(next(iter(arrays.values())))
+    for i in range(0, N, chunk):
+        yield {k: np.array(v[i:i+chunk]) for k, v in arrays.items()}
+
+def read_npy(filename, chunk=10**6, columns=None):
+    ''' .npy file, memory-mapped: structured array or 2D array (points, columns)'''
+    data = np.load(filename, mmap_mode='r')
+    if data.dtype.names:
+        arrays = {k: data[k] for k in data.dtype.names}
+    elif columns is not None:
+        arrays = {k: data[:, j] for j, k in enumerate(columns)}
+    else:
+        raise ValueError('The columns of %s are needed (2D array)' % filename)
+    yield from _chunks(arrays, chunk)
+
+def _npz_arrays(filename):
+    ''' Arrays of a .npz file, the stored (not compressed) ones memory-mapped'''
+    arrays = {}
+    with zipfile.ZipFile(filename) as zf, open(filename, 'rb') as fp:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as fh:
+                    arrays[name] = np.lib.format.read_array(fh)
+                continue
+            # data after the local file header (30 bytes, name and extra field)
+            fp.seek(info.header_offset + 26)
+            n, m = np.frombuffer(fp.read(4), dtype='<u2')
+            fp.seek(info.header_offset + 30 + int(n) + int(m))
+            version = np.lib.format.read_magic(fp)
+            header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = header(fp)
+            arrays[name] = np.memmap(filename, dtype=dtype, mode='r', offset=fp.tell(), shape=shape,
+                                     order='F' if fortran else 'C')
+    return arrays
+
+def read_npz(filename, chunk=10**6, columns=None):
+    ''' .npz file with one array (points,) or (points, components) per name'''
+    arrays = _npz_arrays(filename)
+    if columns is not None:
+        arrays = {k: arrays[k] for k in columns}
+    yield from _chunks(arrays, chunk)
+
+VTK_TYPES = {'bit': 'u1', 'unsigned_char': 'u1', 'char': 'i1', 'unsigned_short': 'u2', 'short': 'i2',
+             'unsigned_int': 'u4', 'int': 'i4', 'unsigned_long': 'u8', 'long': 'i8', 'float': 'f4',
+             'double': 'f8', 'vtktypeint64': 'i8', 'vtktypeuint64': 'u8'}
+
+def _vtk_array(fp, filename, binary, dtype, shape):
+    count = int(np.prod(shape))
+    if binary:
+        dt = np.dtype(VTK_TYPES[dtype]).newbyteorder('>')
+        a = np.memmap(filename, dtype=dt, mode='r', offset=fp.tell(), shape=shape)
+        fp.seek(fp.tell() + count*dt.itemsize)
+        return a
+    values = []
+    while count > 0:
+        v = fp.readline().split()
+        values += v
+        count -= len(v)
+    return np.array(values, dtype=VTK_TYPES[dtype]).reshape(shape)
+
+def read_vtk_arrays(filename):
+    ''' Points and point data of a legacy VTK file: dict name -> array (points, ...)'''
+    arrays = {}
+    cells = 0
+    with open(filename, 'rb') as fp:
+        fp.readline()
+        fp.readline()                    # title
+        binary = fp.readline().strip().upper() == b'BINARY'
+        while True:
+            line = fp.readline()
+            if not line:
+                break
+            words = line.decode('ascii').split()
+            if not words or words[0].upper() in ('DATASET', 'METADATA', 'INFORMATION', 'NAME'):
+                continue
+            key = words[0].upper()
+            if key == 'POINTS':
+                arrays['points'] = _vtk_array(fp, filename, binary, words[2], (int(words[1]), 3))
+            elif key in ('CELLS', 'POLYGONS', 'LINES', 'VERTICES', 'TRIANGLE_STRIPS'):
+                cells, size = int(words[1]), int(words[2])
+                if not fp.peek(7)[:7].upper().startswith(b'OFFSETS'):
+                    _vtk_array(fp, filename, binary, 'int', (size,))
+                # else format 5: OFFSETS (cells values) and CONNECTIVITY (size values) follow
+            elif key == 'OFFSETS':
+                _vtk_array(fp, filename, binary, words[1], (cells,))
+            elif key == 'CONNECTIVITY':
+                _vtk_array(fp, filename, binary, words[1], (size,))
+            elif key == 'CELL_TYPES':
+                _vtk_array(fp, filename, binary, 'int', (int(words[1]),))
+            elif key == 'POINT_DATA':
+                N = int(words[1])
+            elif key == 'SCALARS':
+                ncomp = int(words[3]) if len(words) > 3 else 1
+                fp.readline()            # LOOKUP_TABLE
+                a = _vtk_array(fp, filename, binary, words[2], (N, ncomp))
+                arrays[words[1]] = a[:, 0] if ncomp == 1 else a
+            elif key in ('VECTORS', 'NORMALS'):
+                arrays[words[1]] = _vtk_array(fp, filename, binary, words[2], (N, 3))
+            elif key == 'TENSORS':
+                arrays[words[1]] = _vtk_array(fp, filename, binary, words[2], (N, 9))
+            elif key == 'FIELD':
+                for i in range(int(words[2])):
+                    line = fp.readline().split()
+                    while not line:
+                        line = fp.readline().split()
+                    name, ncomp, ntuples, dtype = line[0].decode(), int(line[1]), int(line[2]), line[3].decode()
+                    a = _vtk_array(fp, filename, binary, dtype, (ntuples, ncomp))
+                    arrays[name] = a[:, 0] if ncomp == 1 else a
+            elif key == 'CELL_DATA':
+                break                    # only the point data is read
+            else:
+                raise ValueError('Unsupported VTK section in %s: %s' % (filename, key))
+    return arrays
+
+def read_vtk(filename, chunk=10**6, columns=None):
+    ''' Legacy VTK file (points and point data)'''
+    arrays = read_vtk_arrays(filename)
+    if columns is not None:
+        arrays = {k: arrays[k] for k in columns}
+    yield from _chunks(arrays, chunk)
+
+READERS = {'.csv': read_csv, '.txt': read_csv, '.npy': read_npy, '.npz': read_npz, '.vtk': read_vtk}
+
+class _Error:
+    def __init__(self, exc):
+        self.exc = exc
+
+_END = object()
+
+def prefetch(chunks, depth=2):
+    ''' Iterates over the chunks while the next ones (up to depth) are read in a
+    background thread (depth=0: no thread)'''
+    if depth <= 0:
+        yield from chunks
+        return
+    q = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def producer():
+        try:
+            for c in chunks:
+                if not put(c):
+                    return
+        except BaseException as e:
+            put(_Error(e))
+        put(_END)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _END:
+                break
+            if isinstance(item, _Error):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def read(filename, chunk=10**6, columns=None, rename=None, depth=2, **kwargs):
+    ''' Chunks of a field file (reader chosen by the extension), prefetched'''
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in READERS:
+        raise ValueError('Unknown field file type: %s' % filename)
+    chunks = (_rename(c, rename) for c in READERS[ext](filename, chunk, columns, **kwargs))
+    return prefetch(chunks, depth)
+
+def principal_strains(exx, eyy, exy):
+    ''' Major and minor in-plane strains of the tensor components (exy: tensor shear strain)'''
+    c = (exx+eyy)/2
+    r = np.hypot((exx-eyy)/2, exy)
+    return c+r, c-r
+
+def strains(chunk):
+    ''' Major and minor strains (points, 2) of a chunk'''
+    if 'e1' in chunk and 'e2' in chunk:
+        return np.stack((chunk['e1'], chunk['e2']), axis=-1)
+    if 'exx' in chunk:
+        exx, eyy, exy = chunk['exx'], chunk['eyy'], chunk['exy']
+    elif 'strain' in chunk:
+        e = chunk['strain']
+        if e.shape[-1] == 2:
+            return np.asarray(e, dtype=float)
+        exx, eyy, exy = (e[:, 0], e[:, 1], e[:, 2]) if e.shape[-1] == 3 else (e[:, 0], e[:, 4], e[:, 1])
+    else:
+        raise KeyError('No strains in the chunk: %s' % ', '.join(chunk))
+    return np.stack(principal_strains(exx, eyy, exy), axis=-1)
+
+def stresses(chunk):
+    ''' Stress components sx, sy, sz, sxy, sxz, syz (points, 6) of a chunk'''
+    if 'stress' in chunk:
+        s = chunk['stress']
+        return np.asarray(s[:, [0, 4, 8, 1, 2, 5]] if s.shape[-1] == 9 else s, dtype=float)
+    return np.stack([chunk[k] for k in ('sx', 'sy', 'sz', 'sxy', 'sxz', 'syz')], axis=-1)
+
+def assess_file(filename, n, criterion='hill', e3f=np.inf, margin=0.1, chunk=10**6, **kwargs):
+    ''' FLD assessment (fld.assess) of the strains of a file; yields per chunk a dict
+    with the 'state' and 'thinning' margin of its points, and the chunk'''
+    table = fld.limit_table(n, criterion)
+    for c in read(filename, chunk, **kwargs):
+        state, thinning = fld.assess(strains(c), table, e3f, margin, chunk)
+        yield {'state': state, 'thinning': thinning, 'chunk': c}
+
+def fld_summary(filename, n, criterion='hill', e3f=np.inf, margin=0.1, chunk=10**6, **kwargs):
+    ''' Number of points of each class and the minimum thinning margin of a file'''
+    counts = np.zeros(len(fld.LABELS), dtype=np.int64)
+    tmin = np.inf
+    for res in assess_file(filename, n, criterion, e3f, margin, chunk, **kwargs):
+        counts += np.bincount(res['state'], minlength=len(fld.LABELS))
+        tmin = min(tmin, res['thinning'].min(initial=np.inf))
+    return dict(zip(fld.LABELS, counts.tolist()), min_thinning=tmin)
+
+def stress_statistics(filename, key='mises', k=100, bins=100, ranges=None, chunk=10**6, **kwargs):
+    ''' stress_field.field_statistics of the stresses of a file'''
+    return sf.field_statistics((stresses(c) for c in read(filename, chunk, **kwargs)), key, k, bins, ranges)
+
+def write_vtk(filename, points, data, binary=True):
+    ''' Legacy VTK file (POLYDATA) of points with point data (name -> array (points,), (points, 3) or (points, 9))'''
+    kind = {1: 'SCALARS %s double 1\nLOOKUP_TABLE default', 3: 'VECTORS %s double', 9: 'TENSORS %s double'}
+    with open(filename, 'wb') as fp:
+        fp.write(b'# vtk DataFile Version 3.0\nfields\n%s\nDATASET POLYDATA\n' % (b'BINARY' if binary else b'ASCII'))
+
+        def array(a):
+            a = np.asarray(a, dtype=float)
+            if binary:
+                fp.write(a.astype('>f8').tobytes() + b'\n')
+            else:
+                np.savetxt(fp, a.reshape(len(a), -1), fmt='%.9g')
+
+        fp.write(b'POINTS %d double\n' % len(points))
+        array(points)
+        fp.write(b'POINT_DATA %d\n' % len(points))
+        for name, a in data.items():
+            a = np.asarray(a)
+            fp.write((kind[1 if a.ndim == 1 else a.shape[1]] % name + '\n').encode())
+            array(a)
+
+
+if __name__ == "__main__":
+    # synthetic DIC/FE field of 2 million points written in every format
+    N = 2*10**6
+    rng = np.random.default_rng(0)
+    exx, eyy, exy = rng.uniform(0, 0.35, N), rng.uniform(-0.15, 0.2, N), rng.uniform(-0.05, 0.05, N)
+    stress = rng.normal(0, 100, (N, 6))
+    folder = tempfile.mkdtemp()
+    files = {}
+    files['npy'] = os.path.join(folder, 'field.npy')
+    rec = np.empty(N, dtype=[(k, 'f8') for k in ('exx', 'eyy', 'exy', 'sx', 'sy', 'sz', 'sxy', 'sxz', 'syz')])
+    for j, k in enumerate(('exx', 'eyy', 'exy')):
+        rec[k] = (exx, eyy, exy)[j]
+    for j, k in enumerate(('sx', 'sy', 'sz', 'sxy', 'sxz', 'syz')):
+        rec[k] = stress[:, j]
+    np.save(files['npy'], rec)
+    files['npz'] = os.path.join(folder, 'field.npz')
+    np.savez(files['npz'], strain=np.stack((exx, eyy, exy), axis=-1), stress=stress)
+    files['vtk'] = os.path.join(folder, 'field.vtk')
+    tensor = np.zeros((N, 9))
+    tensor[:, [0, 4, 8, 1, 2, 5]] = stress
+    tensor[:, [3, 6, 7]] = stress[:, [3, 4, 5]]
+    write_vtk(files['vtk'], np.zeros((N, 3)), {'exx': exx, 'eyy': eyy, 'exy': exy, 'stress': tensor})
+    files['csv'] = os.path.join(folder, 'field.csv')
+    M = 2*10**5   # text files are much slower: a smaller field
+    with open(files['csv'], 'w') as fp:
+        fp.write('exx,eyy,exy\n')
+        np.savetxt(fp, np.stack((exx[:M], eyy[:M], exy[:M]), axis=-1), delimiter=',', fmt='%.9g')
+
+    table = fld.limit_table(0.22)
+    ref = fld.assess(np.stack(principal_strains(exx, eyy, exy), axis=-1), table, e3f=0.3)[0]
+    for kind, filename in files.items():
+        for depth in (0, 2):
+            t0 = time.perf_counter()
+            res = fld_summary(filename, 0.22, e3f=0.3, chunk=2*10**5, depth=depth)
+            ok = np.bincount(ref[:M if kind == 'csv' else N], minlength=4).tolist() == [res[k] for k in fld.LABELS]
+            print('%s prefetch %d: %.2f s, %s, %s' % (kind, depth, time.perf_counter()-t0,
+                                                     {k: res[k] for k in fld.LABELS}, 'ok' if ok else 'WRONG'))
+    t0 = time.perf_counter()
+    res = stress_statistics(files['vtk'], chunk=2*10**5)
+    print('Stresses (vtk): %d points, max. Mises %.1f MPa, %.2f s' % (res['count'], res['max']['mises'], time.perf_counter()-t0))
+    shutil.rmtree(folder)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Interactive versions of the figures of the chapters (bending.plot_bending,
+examen_2019_stretching.plot_stretching and anisotropy.plot_ys) for parameter
+sweeps with sliders.
+
+The quantities of a figure are the nodes of a graph: the inputs (e.g. t, E,
+nu, Y and curvature of the bending figure) and the quantities computed from
+other nodes (plane strain constants, moment-curvature curve, stress through
+the thickness...). Changing an input only invalidates the nodes that depend
+on it, they are recomputed when they are read, and only the artists drawn
+from them are updated, in place (set_data, set_text, patch properties): the
+figure is built once.
+
+    view = BendingView(t=1.2, E=210e3, nu=0.3, Y=100, curvature=0.05)
+    view.update(curvature=0.08)     # the moment-curvature curve is not recomputed
+    add_sliders(view)
+    plt.show()
+
+    python tools/interactive.py bending
+    python tools/interactive.py stretching --benchmark 200
+"""
+
+import argparse
+import math
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import patches, gridspec
+from matplotlib.widgets import Slider
+
+import chapters
+import bending as bd
+import examen_2019_stretching as es
+import anisotropy as an
+from functions import polar_locus
+
+class Graph:
+
+    def __init__(self):
+        self.deps = {}       # node -> its dependencies (inputs: None)
+        self.func = {}
+        self.children = {}
+        self.values = {}
+        self.dirty = set()
+        self.counts = {}     # evaluations of each node
+
+    def input(self, name, value):
+        ''' New input node'''
+        self.deps[name] = None
+        self.children.setdefault(name, set())
+        self.values[name] = value
+        self.counts[name] = 0
+
+    def node(self, name, deps, func):
+        ''' New node name = func(*deps)'''
+        self.deps[name] = tuple(deps)
+        self.func[name] = func
+        self.children.setdefault(name, set())
+        for d in deps:
+            self.children[d].add(name)
+        self.dirty.add(name)
+        self.counts[name] = 0
+
+    def set(self, **inputs):
+        ''' Changes inputs; returns the set of changed inputs and invalidated nodes'''
+        changed = set()
+        for name, value in inputs.items():
+            if self.deps[name] is not None:
+                raise KeyError('%s is not an input' % name)
+            if not np.array_equal(self.values[name], value):
+                self.values[name] = value
+                changed.add(name)
+        stack = list(changed)
+        while stack:
+            for c in self.children[stack.pop()]:
+                if c not in changed:
+                    changed.add(c)
+                    self.dirty.add(c)
+                    stack.append(c)
+        return changed
+
+    def __getitem__(self, name):
+        if name in self.dirty:
+            self.values[name] = self.func[name](*[self[d] for d in self.deps[name]])
+            self.dirty.discard(name)
+            self.counts[name] += 1
+        return self.values[name]
+
+class View:
+    ''' Figure whose artists are drawn from the nodes of a graph
+
+    The artists updated in place are animated: they are drawn over a copy of
+    the rest of the figure (blitting) and the whole figure is only drawn
+    again when the axes change (limits).'''
+
+    RANGES = {}     # slider ranges of the inputs: name -> (min, max)
+
+    def __init__(self, fig, inputs):
+        self.fig = fig
+        self.graph = Graph()
+        for k, v in inputs.items():
+            self.graph.input(k, v)
+        self.binds = []      # (nodes, function that updates the artists from their values, artists)
+        self.animated = []
+        self.background = None
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def bind(self, nodes, func, artists=()):
+        ''' Calls func(*values of the nodes) now and when any of them changes.
+        artists: those updated by func (none: func changes the axes)'''
+        self.binds.append((tuple(nodes), func, tuple(artists)))
+        for a in artists:
+            if a not in self.animated:
+                a.set_animated(True)
+                self.animated.append(a)
+        func(*[self.graph[n] for n in nodes])
+
+    def update(self, **inputs):
+        ''' Changes inputs and updates the artists of the nodes that changed'''
+        changed = self.graph.set(**inputs)
+        full = False
+        for nodes, func, artists in self.binds:
+            if changed.intersection(nodes):
+                func(*[self.graph[n] for n in nodes])
+                full |= not artists
+        if full or self.background is None or not self.fig.canvas.supports_blit:
+            self.fig.canvas.draw_idle()
+        elif changed:
+            self.fig.canvas.restore_region(self.background)
+            self._draw_animated()
+            self.fig.canvas.blit(self.fig.bbox)
+            self.fig.canvas.flush_events()
+        return changed
+
+    def _draw_animated(self):
+        for a in self.animated:
+            a.axes.draw_artist(a)
+
+    def _on_draw(self, event):
+        if self.fig.canvas.is_saving():     # savefig draws the animated artists
+            return
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+def _line(line, x, y):
+    line.set_data(x, y)
+
+class BendingView(View):
+    ''' bending.plot_bending: element, strain and stress through the thickness and moment-curvature'''
+
+    RANGES = {'t': (0.5, 3), 'E': (50e3, 250e3), 'nu': (0.2, 0.45), 'Y': (50, 400), 'curvature': (0.001, 0.25)}
+
+    def __init__(self, t=1.2, E=210e3, nu=0.3, Y=100, curvature=0.001, fig=None):
+        super().__init__(fig or plt.figure(figsize=(10,7)), dict(t=t, E=E, nu=nu, Y=Y, curvature=curvature))
+        g = self.graph
+        g.node('plane', ('E', 'nu', 'Y'), bd.constants_plane_strain)
+        g.node('char', ('t', 'plane'), lambda t, p: bd.bending_char(t, *p))
+        g.node('element', ('curvature',), self.element)
+        g.node('strain', ('t', 'curvature'), lambda t, k: (np.array([-t/2, t/2])*k, np.array([-t/2, t/2])))
+        g.node('stress', ('t', 'curvature', 'plane'), self.stress)
+        g.node('curve', ('char',), self.curve)
+        g.node('moment', ('curvature', 'char'), lambda k, c: float(bd.M_batch(1/k, c[0], c[1])))
+
+        gs = gridspec.GridSpec(2, 3, figure=self.fig)
+        ax1, ax2, ax3 = [self.fig.add_subplot(gs[0, i]) for i in range(3)]
+        ax4 = self.fig.add_subplot(gs[1, :])
+
+        arc = patches.Arc((0, 0), 1, 1, angle=90)
+        ax1.add_patch(arc)
+        side = [ax1.plot([], [], 'k:')[0] for i in range(2)]
+        ax1.axis([-5, 5, -2, 1])
+        ax1.set_axis_off()
+        ax1.set_aspect("equal")
+        self.bind(('element',), lambda e: self._element(arc, side, e), [arc] + side)
+
+        ax2.axvline(x=0, color='k', ls=':', lw=0.5)
+        strain, = ax2.plot([], [], 'r-')
+        ax2.set_xlim(-0.15, 0.15)
+        ax2.set_xlabel(r'Major strain, $\varepsilon_1$')
+        ax2.set_ylabel(r'Thickness, $t$')
+        self.bind(('strain',), lambda s: _line(strain, *s), [strain])
+
+        ax3.axvline(x=0, color='k', ls=':', lw=0.5)
+        stress, = ax3.plot([], [], 'r-')
+        ax3.set_xlabel(r'Major stress, $\sigma_1$')
+        ax3.set_ylabel(r'Thickness, $t$')
+        self.bind(('stress',), lambda s: _line(stress, *s), [stress])
+        self.bind(('t',), lambda t: (ax2.set_ylim(-t/2, t/2), ax3.set_ylim(-t/2, t/2)))
+        self.bind(('plane',), lambda p: ax3.set_xlim(-p[1]-10, p[1]+10))
+
+        curve, = ax4.plot([], [], 'b-')
+        marker, = ax4.plot([], [], 'r-')
+        text = ax4.text(0.08, 0, '')
+        ax4.set_xlim(0, 0.25)
+        ax4.set_xlabel(r'Sheet curvature, $1/\rho$')
+        ax4.set_ylabel(r'Bending moment, $M$')
+        self.bind(('curve',), lambda c: _line(curve, *c), [curve])
+        self.bind(('char',), lambda c: (ax4.set_ylim(0, 1.1*c[2]), text.set_y(c[2]/2)))
+        self.bind(('curvature', 'moment', 'char'), lambda k, M1, c: (
+            marker.set_data([k, k], [0, M1]),
+            text.set_text(r'$M=%.1f$ Nm/m (%s)' % (M1, 'fully elastic' if M1 < c[1] else 'elastic+plastic'))),
+            [marker, text])
+        self.fig.tight_layout()
+
+    @staticmethod
+    def element(curvature, l=10):
+        ''' Radius and half angle (rad) of an element of length l'''
+        rho = 1/curvature
+        return rho, l/rho/2
+
+    @staticmethod
+    def _element(arc, side, element):
+        rho, theta = element
+        arc.set_center((0, -rho/2))
+        arc.set_width(rho)
+        arc.set_height(rho)
+        arc.theta1, arc.theta2 = -math.degrees(theta), math.degrees(theta)
+        arc.stale = True
+        for line, th in zip(side, (-theta, theta)):
+            line.set_data([0, rho/2*math.sin(th)], [-rho/2, -rho/2+rho/2*math.cos(th)])
+
+    @staticmethod
+    def stress(t, curvature, plane, points=401):
+        ''' Stress through the thickness: (s1, y)'''
+        y = np.linspace(-t/2, t/2, points)
+        return bd.s1_batch(y, 1/curvature, *plane), y
+
+    @staticmethod
+    def curve(char, kmax=0.25, points=500):
+        ''' Moment-curvature curve: (1/rho, M)'''
+        rhoe, Me, Mp = char
+        k = np.concatenate(([0], np.linspace(1/rhoe, max(kmax, 1/rhoe), points)))
+        return k, np.concatenate(([0], bd.M_batch(1/k[1:], rhoe, Me)))
+
+class StretchingView(View):
+    ''' examen_2019_stretching.plot_stretching: sheet over the punch, strain and thickness, tension and pressure'''
+
+    RANGES = {'R': (700, 2000), 'TL': (2000, 4000), 'CL': (100, 500), 'mu': (0, 0.3), 't0': (0.5, 3),
+              'K': (300, 1200), 'n': (0.1, 0.4), 'angle': (5, 60)}
+
+    # labels of the note, drawn once, and their values, in plain text (mathtext
+    # is parsed again for every new number)
+    NOTE = [('Punch stroke s =', '%.1f mm'), ('\u03b8 =', '%.1f\u00b0'), ('Length OA =', '%.1f mm'),
+            ('Length AB =', '%.1f mm'), ('Total length OAB =', '%.1f mm'), ('Average strain \u03b5\u2081 =', '%.3f'),
+            ('Strain in O: \u03b5\u2081 =', '%.3f'), ('Strain in AB: \u03b5\u2081 =', '%.3f'),
+            ('Thickness in O: t =', '%.3f mm'), ('Thickness in AB: t =', '%.3f mm'),
+            ('Force in O: T\u2081 =', '%.1f kN/m'), ('Force in AB: T\u2081 =', '%.1f kN/m'),
+            ('Punch pressure: p =', '%.1f MPa'), ('Punch force: F =', '%.1f kN/m')]
+
+    def __init__(self, R=1100, TL=3000, CL=300, mu=0.1, t0=1.2, K=810, n=0.24, angle=38, fig=None):
+        super().__init__(fig or plt.figure(figsize=(8,8)), dict(R=R, TL=TL, CL=CL, mu=mu, t0=t0, K=K, n=n, angle=angle))
+        g = self.graph
+        g.node('theta', ('angle',), lambda a: a if a != 0 else 0.001)
+        g.node('geometry', ('R', 'TL', 'CL', 'angle'), lambda *p: tuple(float(i) for i in es.geometry_batch(*p)))
+        g.node('solution', ('R', 'TL', 'CL', 'mu', 't0', 'K', 'n', 'angle'),
+               lambda *p: tuple(float(i) for i in es.solve_stretching_batch(*p)[1:]))
+        g.node('Kp', ('K',), lambda K: 2*K/math.sqrt(3))
+        g.node('xmax', ('TL', 'CL'), lambda TL, CL: 1.5*(TL/2 - CL))
+
+        gs = gridspec.GridSpec(2, 2, width_ratios=[1.5, 1], figure=self.fig)
+        ax1 = self.fig.add_subplot(gs[:, 0])
+        ax2 = self.fig.add_subplot(gs[0, 1])
+        ax3 = self.fig.add_subplot(gs[1, 1])
+
+        circle = plt.Circle((0, 0), 1, ec=None, color='#cccccc')
+        ax1.add_patch(circle)
+        arc = patches.Arc((0, 0), 1, 1, theta1=0, ec='b', lw=3)
+        ax1.add_patch(arc)
+        AB, = ax1.plot([], [], 'b-', lw=3)
+        BM, = ax1.plot([], [], color='#cccccc', lw=20)
+        note = ax1.annotate('\n'.join(i[0] for i in self.NOTE), xy=(0, 0), xytext=(-60, 0),
+                            textcoords='offset points', ha='right', va='top')
+        values = ax1.text(0, 0, '', ha='right', va='top')
+        fmt = '\n'.join(i[1] for i in self.NOTE)
+        points = [ax1.text(0, 0, i, color='r') for i in 'OAB']
+        ax1.set_aspect("equal")
+        self.bind(('R', 'TL', 'theta', 'geometry'), lambda *p: self._punch(circle, arc, AB, BM, points, *p),
+                  [circle, arc, AB, BM] + points)
+        self.bind(('TL',), lambda TL: (ax1.axis([0, TL/2, 0, TL]), setattr(note, 'xy', (TL/2, TL)),
+                                       values.set_position((TL/2, TL))))
+        self.bind(('theta', 'geometry', 'solution'), lambda th, geo, sol: values.set_text(
+            fmt % ((geo[0], th) + geo[5:7] + (geo[5]+geo[6], geo[7]) + sol)), [values])
+
+        # strain and thickness
+        lines2 = [ax2.axvline(x=0, color='k', ls=':', lw=0.5) for i in range(2)]
+        limit = ax2.axhline(y=0, color='b', ls='--', lw=0.5)
+        limit_text = ax2.text(0, 0, 'Limit strain', ha='right', color='b')
+        strain, = ax2.plot([], [], 'b-')
+        ax2.set_xlabel('Length along the sheet')
+        ax2.set_ylabel(r'Strain, $\varepsilon_1$', color='b')
+        ax2p = ax2.twinx()
+        thickness, = ax2p.plot([], [], 'c--')
+        ax2p.set_ylabel(r'Sheet thickness, $t$ (mm)', color='c')
+        labels = [ax2p.text(0, 0.01, i) for i in 'OAB']
+        self.bind(('n', 'xmax'), lambda n, xmax: (limit.set_ydata([n, n]), limit_text.set_position((xmax, n)),
+                                                  ax2.set_ylim(0, n+0.1)))
+        self.bind(('t0',), lambda t0: ax2p.set_ylim(0, t0))
+
+        # tension and pressure
+        lines3 = [ax3.axvline(x=0, color='k', ls=':', lw=0.5) for i in range(2)]
+        tension, = ax3.plot([], [], 'm-')
+        ax3.set_xlabel('Length along the sheet')
+        ax3.set_ylabel(r'Tension, $T_1$ (kN/m)', color='m')
+        ax3p = ax3.twinx()
+        pressure, = ax3p.plot([], [], 'r--')
+        ax3p.set_ylabel(r'Punch pressure, $p$ (MPa)', color='r')
+        self.bind(('xmax',), lambda xmax: (ax2p.set_xlim(0, xmax), ax3p.set_xlim(0, xmax)))
+        self.bind(('R', 'Kp'), lambda R, Kp: (ax3.set_ylim(0, Kp), ax3p.set_ylim(0, 2*Kp/R)))
+
+        def profiles(R, geo, sol):
+            sOA, sAB = geo[5:7]
+            e1O, e1A, tO, tA, T1O, T1A = sol[:6]
+            x = (0, sOA, sOA+sAB)
+            for lines in (lines2, lines3):
+                lines[0].set_xdata([sOA, sOA])
+                lines[1].set_xdata([sOA+sAB, sOA+sAB])
+            strain.set_data(x, (e1O, e1A, e1A))
+            thickness.set_data(x, (tO, tA, tA))
+            for label, xi in zip(labels, x):
+                label.set_x(xi)
+            x = (0, sOA, sOA, sOA+sAB, sOA+sAB)
+            tension.set_data(x, (T1O, T1A, T1A, T1A, T1A))
+            pressure.set_data(x, (T1O/R, T1A/R, 0, 0, 0))
+        self.bind(('R', 'geometry', 'solution'), profiles, lines2 + lines3 + [strain, thickness, tension, pressure] + labels)
+        self.fig.tight_layout()
+
+    @staticmethod
+    def _punch(circle, arc, AB, BM, points, R, TL, theta, geometry):
+        s, xA, yA, xB, yB = geometry[:5]
+        circle.set_center((0, s-R))
+        circle.set_radius(R)
+        arc.set_center((0, s-R))
+        arc.set_width(2*R)
+        arc.set_height(2*R)
+        arc.set_angle(90-theta)
+        arc.theta2 = theta
+        arc.stale = True
+        AB.set_data([xA, xB], [yA, yB])
+        BM.set_data([xB, TL/2], [yB, 0])
+        for p, xy in zip(points, ((0, s), (xA, yA), (xB, yB))):
+            p.set_position(xy)
+
+class YieldView(View):
+    ''' anisotropy.plot_ys: Mises, Hill and Hosford yield loci'''
+
+    RANGES = {'sy': (100, 500), 'r0': (0.3, 3), 'r90': (0.3, 3), 'r45': (0.3, 3), 'a': (2, 12)}
+
+    def __init__(self, sy=300, r0=1.2, r90=1.8, a=8, r45=1, fig=None):
+        super().__init__(fig or plt.figure(figsize=(6,6)), dict(sy=sy, r0=r0, r90=r90, a=a, r45=r45))
+        g = self.graph
+        g.node('mises', ('sy',), lambda sy: self.locus(sy, 1, 1, 2))
+        g.node('hill', ('sy', 'r0', 'r90'), lambda sy, r0, r90: self.locus(sy, r0, r90, 2))
+        g.node('hosford', ('sy', 'r0', 'r90', 'a'), self.locus)
+        g.node('anisotropy', ('r0', 'r90', 'r45'), lambda r0, r90, r45: (
+            an.planar_anisotropy(r0, r90, r45), an.normal_anisotropy(r0, r90, r45)))
+
+        ax = self.fig.add_subplot()
+        ax.axvline(x=0, color='k', linewidth=0.2)
+        ax.axhline(y=0, color='k', linewidth=0.2)
+        for name, fmt, label in (('mises', 'g-', 'Mises'), ('hill', 'r--', 'Hill'), ('hosford', 'b:', 'Hosford')):
+            line, = ax.plot([], [], fmt, label=label)
+            self.bind((name,), lambda xy, line=line: _line(line, *xy), [line])
+        texts = [ax.text(500, y, '') for y in (700, 600, 500)]
+        self.bind(('anisotropy', 'r45'), lambda ra, r45: [
+            t.set_text(s % v) for t, s, v in zip(texts, (r'$\Delta r = %0.3f$', r'$\overline{r} = %0.3f$', r'$r_{45} = %0.3f$'),
+                                                  ra + (r45,))], texts)
+        ax.axis([-800, 800, -800, 800])
+        ax.set_aspect('equal')
+        ax.set_xlabel(r'$\sigma_2$')
+        ax.set_ylabel(r'$\sigma_1$')
+        ax.legend(title='Yield surface', loc='lower right')
+
+    @staticmethod
+    def locus(sy, r0, r90, a):
+        ''' Polar locus (sigma_2, sigma_1) within sy/1000 of the exact curve'''
+        return polar_locus(lambda th: sy/an.eff_stress_Hosford_batch(np.sin(th), np.cos(th), r0, r90, a), sy/1000)
+
+VIEWS = {'bending': BendingView, 'stretching': StretchingView, 'ys': YieldView}
+
+def add_sliders(view, names=None, row=0.35):
+    ''' Sliders of the inputs of the view (default: all with RANGES) in a panel
+    added at the bottom of its figure, row inches per slider'''
+    names = list(names or view.RANGES)
+    fig, p = view.fig, view.fig.subplotpars
+    h = fig.get_figheight()
+    panel = row*(len(names)+1.5)
+    fig.set_figheight(h + panel)
+    H = h + panel
+    fig.subplots_adjust(bottom=(panel + p.bottom*h)/H, top=1 - (1-p.top)*h/H)
+    sliders = []
+    for i, name in enumerate(names):
+        ax = fig.add_axes([0.2, (panel - row*(i+1))/H, 0.6, 0.7*row/H])
+        lo, hi = view.RANGES[name]
+        s = Slider(ax, name, lo, hi, valinit=view.graph.values[name])
+        s.on_changed(lambda value, name=name: view.update(**{name: value}))
+        sliders.append(s)
+    view.sliders = sliders    # keep the widgets alive
+    return sliders
+
+def benchmark(name, frames=100, input=None):
+    ''' Frames per second of a sweep of one input (default: the last one) from
+    scratch (plot function of the chapter) and with the view (Agg canvas)'''
+    cls = VIEWS[name]
+    view = cls()
+    input = input or list(cls.RANGES)[-1]
+    lo, hi = cls.RANGES[input]
+    values = np.linspace(lo, hi, frames)
+    inputs = {k: v for k, v in view.graph.values.items() if view.graph.deps[k] is None}
+    t0 = time.perf_counter()
+    for v in values:
+        view.update(**{input: v})
+    t1 = time.perf_counter()
+    counts = {k: c for k, c in view.graph.counts.items() if k in view.graph.func}
+    plt.close(view.fig)
+    show, plt.show = plt.show, lambda *args, **kw: None
+    try:
+        for v in values:
+            p = dict(inputs, **{input: v})
+            if name == 'bending':
+                Ep, Yp = bd.constants_plane_strain(p['E'], p['nu'], p['Y'])
+                bd.plot_bending(p['t'], Ep, Yp, *bd.bending_char(p['t'], Ep, Yp), p['curvature'])
+            elif name == 'stretching':
+                es.plot_stretching(**p)
+            else:
+                an.plot_ys(**p)
+            fig = plt.gcf()
+            fig.canvas.draw()
+            plt.close(fig)
+    finally:
+        plt.show = show
+    t2 = time.perf_counter()
+    return {'input': input, 'view': frames/(t1-t0), 'replot': frames/(t2-t1), 'counts': counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('view', choices=list(VIEWS))
+    parser.add_argument('--benchmark', type=int, default=0, metavar='FRAMES',
+                        help='frames per second of a sweep, without a window')
+    parser.add_argument('--input', default=None, help='input swept by the benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        plt.switch_backend('Agg')
+        res = benchmark(args.view, args.benchmark, args.input)
+        print('%s, sweep of %s: %.1f fps in place, %.1f fps replotting' % (args.view, res['input'], res['view'], res['replot']))
+        print('Evaluations (%d frames): %s' % (args.benchmark, ', '.join('%s %d' % i for i in res['counts'].items())))
+    else:
+        view = VIEWS[args.view]()
+        add_sliders(view)
+        plt.show()
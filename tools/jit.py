@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Optional compiled versions of the small scalar kernels of the chapters:
+
+    functions.I1, I2, I3, mises     bending.s1, M
+    necking.e1s                     anisotropy.eff_stress_Hosford
+
+Each kernel is written once below as a scalar function (math only). With
+numba installed it is compiled to a parallel ufunc (loops over the arrays in
+several threads) on its first call; otherwise the NumPy array versions of
+the chapters are used. The backend is chosen at run time:
+
+    import jit
+    jit.set_backend('numba')      # 'numpy', 'numba' or 'auto' (numba if installed)
+    jit.mises(sx, sy, sz, sxy, sxz, syz)
+
+or with the environment variable SMF_JIT_BACKEND. models.py evaluates the
+bending moment and the Swift limit strain with them. Running this file
+checks that the available backends agree with the scalar functions and
+prints the cost per element of each one:
+
+    python tools/jit.py [--sizes 1000 1000000]
+
+and the same checks for both backends run as tests (test_jit.py):
+
+    python -m pytest tools/test_jit.py
+"""
+
+import argparse
+import math
+import os
+import numpy as np
+
+import chapters
+import functions
+import anisotropy
+import necking
+import bending
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# Scalar kernels (compiled by numba)
+
+def _I1(sx, sy, sz, sxy, sxz, syz):
+    return sx + sy + sz
+
+def _I2(sx, sy, sz, sxy, sxz, syz):
+    return sxy**2 + sxz**2 + syz**2 - sy*sz - sz*sx - sx*sy
+
+def _I3(sx, sy, sz, sxy, sxz, syz):
+    return sx*sy*sz + 2*syz*sxz*sxy - sx*syz**2 - sy*sxz**2 - sz*sxy**2
+
+def _mises(sx, sy, sz, sxy, sxz, syz):
+    return math.sqrt(0.5*((sx-sy)**2 + (sy-sz)**2 + (sz-sx)**2 + 6*(sxy**2 + sxz**2 + syz**2)))
+
+def _s1(y, rho, Ep, Yp):
+    e = y/rho
+    return Ep*e if abs(e) < Yp/Ep else math.copysign(Yp, e)
+
+def _M(rho, rhoe, Me):
+    return Me*rhoe/rho if rho > rhoe else Me*(3 - (rho/rhoe)**2)/2
+
+def _e1s(b, n):
+    a = (2*b+1)/(2+b)
+    return n*math.sqrt(3)/(2*math.sqrt(1+b+b**2)) * 4*(1-a+a**2)**1.5 / ((2-a)**2 + (2*a-1)**2*a)
+
+def _eff_stress_Hosford(s1, alpha, r0, r90, a):
+    return s1*((r90 + r0*alpha**a + r0*r90*(1-alpha)**a)/(r90*(1+r0)))**(1/a)
+
+# name: (scalar kernel, NumPy version, scalar function of the chapters)
+KERNELS = {
+    'I1': (_I1, functions.I1, functions.I1),
+    'I2': (_I2, functions.I2, functions.I2),
+    'I3': (_I3, functions.I3, functions.I3),
+    'mises': (_mises, functions.mises_batch, functions.mises),
+    's1': (_s1, bending.s1_batch, bending.s1),
+    'M': (_M, bending.M_batch, bending.M),
+    'e1s': (_e1s, necking.e1s_batch, necking.e1s),
+    'eff_stress_Hosford': (_eff_stress_Hosford, anisotropy.eff_stress_Hosford, anisotropy.eff_stress_Hosford),
+}
+
+BACKENDS = ('auto', 'numpy', 'numba')
+_active = {}
+_compiled = {}
+backend = None
+
+
+def _compile(kernel):
+    ''' Parallel ufunc of a scalar kernel (float64 arguments, broadcasting as NumPy)'''
+    nargs = kernel.__code__.co_argcount
+    signature = numba.float64(*[numba.float64]*nargs)
+    return numba.vectorize([signature], target='parallel', nopython=True)(kernel)
+
+def set_backend(name='auto'):
+    ''' Selects the implementation of all the kernels: 'numpy', 'numba' or 'auto' '''
+    global backend
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend: %s (%s)' % (name, ', '.join(BACKENDS)))
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'numpy'
+    if name == 'numba':
+        if numba is None:
+            raise ImportError('The numba backend needs numba (pip install numba)')
+        # compiled on the first call (_kernel)
+        _active.update({key: _compiled.get(key) for key in KERNELS})
+    else:
+        _active.update({key: array for key, (kernel, array, scalar) in KERNELS.items()})
+    backend = name
+    return backend
+
+
+# Dispatch to the active backend
+
+def _kernel(name):
+    ''' Active implementation of a kernel (numba kernels are compiled on the first call)'''
+    func = _active[name]
+    if func is None:
+        func = _active[name] = _compiled[name] = _compile(KERNELS[name][0])
+    return func
+
+def I1(sx, sy, sz, sxy=0, sxz=0, syz=0):
+    return _kernel('I1')(sx, sy, sz, sxy, sxz, syz)
+
+def I2(sx, sy, sz, sxy=0, sxz=0, syz=0):
+    return _kernel('I2')(sx, sy, sz, sxy, sxz, syz)
+
+def I3(sx, sy, sz, sxy=0, sxz=0, syz=0):
+    return _kernel('I3')(sx, sy, sz, sxy, sxz, syz)
+
+def mises(sx, sy, sz, sxy=0, sxz=0, syz=0):
+    return _kernel('mises')(sx, sy, sz, sxy, sxz, syz)
+
+def s1(y, rho, Ep, Yp):
+    return _kernel('s1')(y, rho, Ep, Yp)
+
+def M(rho, rhoe, Me):
+    return _kernel('M')(rho, rhoe, Me)
+
+def e1s(b, n):
+    return _kernel('e1s')(b, n)
+
+def eff_stress_Hosford(s1, alpha, r0, r90, a):
+    return _kernel('eff_stress_Hosford')(s1, alpha, r0, r90, a)
+
+set_backend(os.environ.get('SMF_JIT_BACKEND', 'auto'))
+
+
+# Equivalence checks and cost per element
+
+def inputs(name, N, rng):
+    if name in ('I1', 'I2', 'I3', 'mises'):
+        return [rng.uniform(-300, 300, N) for i in range(6)]
+    if name == 's1':
+        return [rng.uniform(-0.6, 0.6, N), rng.uniform(5, 2000, N), np.full(N, 230e3), np.full(N, 86.6)]
+    if name == 'M':
+        return [rng.uniform(5, 2000, N), np.full(N, 1000.), np.full(N, 20.)]
+    if name == 'e1s':
+        return [rng.uniform(-0.9, 1, N), rng.uniform(0.1, 0.4, N)]
+    return [rng.uniform(100, 500, N), rng.uniform(0, 1, N), rng.uniform(0.5, 2, N), rng.uniform(0.5, 2, N), np.full(N, 8.)]
+
+def check(name, N=1000, seed=0, rtol=1e-12):
+    ''' Compares the active backend with the scalar function of the chapters'''
+    args = inputs(name, N, np.random.default_rng(seed))
+    expected = np.array([KERNELS[name][2](*i) for i in zip(*args)])
+    np.testing.assert_allclose(globals()[name](*args), expected, rtol=rtol, atol=1e-12, err_msg=name)
+
+def per_element(name, N, repeat=5, seed=0):
+    import time
+    args = inputs(name, N, np.random.default_rng(seed))
+    func = globals()[name]
+    func(*args)   # first call (compilation of lazy backends)
+    t = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        t.append(time.perf_counter() - t0)
+    return min(t)/N
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10**6])
+    args = parser.parse_args()
+
+    available = ['numpy'] + (['numba'] if numba is not None else [])
+    if numba is None:
+        print('numba is not installed: only the numpy backend is available')
+    print('%-20s %-7s' % ('kernel', 'backend') + ''.join('%14s' % ('N=%d' % N) for N in args.sizes) + '   (s per element)')
+    for name in KERNELS:
+        for b in available:
+            set_backend(b)
+            check(name)
+            print('%-20s %-7s' % (name, b) + ''.join('%14.3e' % per_element(name, N) for N in args.sizes))
+    set_backend(os.environ.get('SMF_JIT_BACKEND', 'auto'))
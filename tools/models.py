@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Forming models as functions of arrays of inputs (one value per sample)
+returning a dict of scalar outputs per sample, for the uncertainty,
+sensitivity and optimization tools:
+
+    stretching    examen_2019_stretching.solve_stretching_batch
+    draw_section  section of marciniak_stamping_example (draw_section.propagate)
+    bending       bending.M_batch (jit.M) and elastic springback
+    necking       necking.e1s_batch (jit.e1s, real inputs) / e1h_batch
+
+NOMINAL holds the inputs of the examples of each chapter. The limit strain
+margin is n - e1 (the limit e1 < n plotted by the stamping examples); it is
+nan when there is no solution (e.g. a draw section over its maximum tension).
+"""
+
+import numpy as np
+
+import chapters
+import jit
+import examen_2019_stretching as stretching_
+import draw_section as ds
+import bending as bd
+import necking as nk
+
+def stretching(R, TL, CL, mu, t0, K, n, angle):
+    s, e1O, e1A, tO, tA, T1O, T1A, p, F = stretching_.solve_stretching_batch(R, TL, CL, mu, t0, K, n, angle)
+    return {'stroke': s, 'thinning_O': 1-tO/t0, 'thinning_A': 1-tA/t0, 'force': F,
+            'margin': n - np.maximum(e1O, e1A)}
+
+def draw_segments(Rf, a, Rp, Rd, sBC, sEF):
+    ''' Segments O-A-B-C-D-E-F of the section of marciniak_stamping_example'''
+    thetaOA = np.arcsin((a-Rp)/Rf)
+    return [ds.punch(Rf, thetaOA), ds.punch(Rp, np.pi/2-thetaOA), ds.straight(sBC),
+            ds.die(Rd, np.pi/2), ds.flange(sEF)]
+
+def draw_section(Rf, a, Rp, Rd, sBC, sEF, mu, K, n, t0, e1O):
+    T1O = K*e1O**n*t0*np.exp(-e1O)
+    res = ds.propagate(draw_segments(Rf, a, Rp, Rd, sBC, sEF), T1O, mu, K, n, t0)
+    # a point over the maximum tension (necked) has no strain: nan thinning and margin
+    return {'thinning': 1 - np.min(res['t'], axis=-1)/t0, 'force': res['F'],
+            'blankholder': res['B'][..., 0], 'margin': n - np.max(res['e1'], axis=-1)}
+
+def bending(t, E, nu, Y, R):
+    Ep, Yp = bd.constants_plane_strain(E, nu, Y)
+    rhoe, Me, Mp = bd.bending_char(t, Ep, Yp)
+    rho = R + t/2
+    M = jit.M(rho, rhoe, Me)
+    # elastic unloading: change of curvature M/(Ep*I), I = t^3/12 per unit width
+    k = 1/rho - M/(Ep*t**3/12)
+    return {'moment': M, 'springback': k*rho, 'radius_unloaded': 1/k - t/2}
+
+def necking(beta, n, e0, e1):
+    # the compiled kernels are real: complex inputs (complex step of sensitivity) use the NumPy version
+    e1s = nk.e1s_batch if np.iscomplexobj(beta) or np.iscomplexobj(n) else jit.e1s
+    e1lim = np.where(beta > 0, e1s(beta, n), nk.e1h_batch(beta, n, e0))
+    return {'limit': e1lim, 'margin': e1lim - e1}
+
+NOMINAL = {
+    'stretching': {'R': 1100, 'TL': 3000, 'CL': 300, 'mu': 0.1, 't0': 1.2, 'K': 810, 'n': 0.24, 'angle': 38},
+    'draw_section': {'Rf': 2800, 'a': 330, 'Rp': 10, 'Rd': 10, 'sBC': 28, 'sEF': 80,
+                     'mu': 0.1, 'K': 750, 'n': 0.23, 't0': 0.8, 'e1O': 0.03},
+    'bending': {'t': 1.2, 'E': 210e3, 'nu': 0.3, 'Y': 100, 'R': 10},
+    'necking': {'beta': -0.5, 'n': 0.22, 'e0': 0.0, 'e1': 0.3},
+}
+
+MODELS = {'stretching': stretching, 'draw_section': draw_section, 'bending': bending, 'necking': necking}
+
+def evaluate(model, inputs, dtype=float):
+    ''' Outputs of the model for a dict of inputs (missing inputs take the nominal value)'''
+    args = dict(NOMINAL[model], **inputs)
+    with np.errstate(all='ignore'):
+        return MODELS[model](**{k: np.asarray(v, dtype=dtype) for k, v in args.items()})
+
+
+if __name__ == "__main__":
+    for name in MODELS:
+        print(name, {k: round(float(v), 4) for k, v in evaluate(name, {}).items()})
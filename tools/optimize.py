@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Design of the tools and the lubrication with the forming models (models.py):
+punch radius R, length CL and friction mu of the stretching example, punch
+and die radii Rp, Rd and friction mu of the draw section, for minimum punch
+force or maximum stroke subject to the limit strain e1 < n (margin > 0).
+
+Differential evolution (rand/1/bin) with the feasibility rules of Deb: a
+feasible design beats an infeasible one, two infeasible designs are compared
+by the violation of the constraint (designs without solution have an
+infinite violation). Every generation of a population is evaluated in one
+batched call of the model. Several populations (islands) evolve in parallel
+processes with their own seeds and, every epoch, the best design of each
+island replaces the worst one of the next island (ring migration).
+
+    res = optimize('stretching', DESIGNS['stretching'], 'force')
+    res['x'], res['outputs']
+
+    python tools/optimize.py draw_section --objective force
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+
+import chapters
+import models
+
+def violation(y, min_margin=0):
+    ''' Violation of the constraint margin >= min_margin (0: feasible, inf: no solution)'''
+    v = np.maximum(min_margin - y['margin'], 0)
+    return np.where(np.isfinite(v), v, np.inf)
+
+def _evaluate(problem, pop):
+    model, names, objective, sign, fixed, min_margin = problem
+    y = models.evaluate(model, dict(fixed, **dict(zip(names, pop.T))))
+    f = sign*np.broadcast_to(y[objective], (len(pop),))
+    v = violation(y, min_margin)
+    return np.where(np.isfinite(f), f, np.inf), np.broadcast_to(v, (len(pop),))
+
+def better(f1, v1, f2, v2):
+    ''' Deb's rules: design 1 is not worse than design 2'''
+    return (v1 < v2) | ((v1 == v2) & (f1 <= f2))
+
+def _evolve(args):
+    problem, lo, hi, pop, f, v, generations, F, CR, seed = args
+    rng = np.random.default_rng(seed)
+    n, d = pop.shape
+    evaluations = 0
+    if f is None:
+        f, v = _evaluate(problem, pop)
+        evaluations += n
+    for g in range(generations):
+        # three different partners of each design, other than itself
+        r = np.argsort(rng.random((n, n)) + np.eye(n), axis=1)[:, :3]
+        mutant = np.clip(pop[r[:, 0]] + F*(pop[r[:, 1]] - pop[r[:, 2]]), lo, hi)
+        cross = rng.random((n, d)) < CR
+        cross[np.arange(n), rng.integers(0, d, n)] = True
+        trial = np.where(cross, mutant, pop)
+        ft, vt = _evaluate(problem, trial)
+        evaluations += n
+        win = better(ft, vt, f, v)
+        pop = np.where(win[:, None], trial, pop)
+        f, v = np.where(win, ft, f), np.where(win, vt, v)
+    return pop, f, v, evaluations
+
+def best(f, v):
+    ''' Index of the best design'''
+    return np.lexsort((f, v))[0]
+
+def optimize(model, variables, objective='force', sense='min', fixed=None, min_margin=0,
+             population=40, islands=8, epochs=10, generations=10, F=0.7, CR=0.9,
+             seed=0, workers=None):
+    ''' Optimum design of the model
+
+    variables: dict name -> (lower, upper) bounds; fixed: inputs other than
+    the nominal ones; sense: 'min' or 'max' of the objective output.
+    islands x population designs evolve for epochs x generations; the result
+    depends on the seed only, workers (processes, 1: none) sets how many
+    islands run at the same time. Returns a
+    dict with the best design 'x', its 'outputs', whether it is 'feasible',
+    the best objective after each epoch ('history') and the number of
+    model 'evaluations'.'''
+    names = list(variables)
+    lo = np.array([variables[k][0] for k in names], dtype=float)
+    hi = np.array([variables[k][1] for k in names], dtype=float)
+    sign = {'min': 1, 'max': -1}[sense]
+    problem = (model, names, objective, sign, dict(fixed or {}), min_margin)
+    seeds = np.random.SeedSequence(seed).spawn(islands)
+    # Latin hypercube initial populations
+    pops = []
+    for s in seeds:
+        rng = np.random.default_rng(s.spawn(1)[0])
+        u = (np.argsort(rng.random((len(names), population)), axis=1).T + rng.random((population, len(names))))/population
+        pops.append(lo + u*(hi-lo))
+    fs, vs = [None]*islands, [None]*islands
+    history, evaluations = [], 0
+    pool = ProcessPoolExecutor(min(workers or os.cpu_count(), islands)) if workers != 1 and islands > 1 else None
+    try:
+        for epoch in range(epochs):
+            jobs = [(problem, lo, hi, pops[i], fs[i], vs[i], generations, F, CR, seeds[i].spawn(1)[0])
+                    for i in range(islands)]
+            results = list(pool.map(_evolve, jobs) if pool else map(_evolve, jobs))
+            pops, fs, vs = [list(i) for i in zip(*[r[:3] for r in results])]
+            evaluations += sum(r[3] for r in results)
+            # ring migration: the best of each island replaces the worst of the next one
+            b = [best(f, v) for f, v in zip(fs, vs)]
+            moved = [(pops[i][b[i]].copy(), fs[i][b[i]], vs[i][b[i]]) for i in range(islands)]
+            for i in range(islands):
+                j = (i+1) % islands
+                w = np.lexsort((-fs[j], -vs[j]))[0]
+                pops[j][w], fs[j][w], vs[j][w] = moved[i]
+            i = min(range(islands), key=lambda i: (vs[i][b[i]], fs[i][b[i]]))
+            history.append((sign*fs[i][b[i]], vs[i][b[i]]))
+    finally:
+        if pool:
+            pool.shutdown()
+    pop, f, v = np.concatenate(pops), np.concatenate(fs), np.concatenate(vs)
+    k = best(f, v)
+    x = dict(zip(names, pop[k]))
+    outputs = {key: float(val) for key, val in models.evaluate(model, dict(problem[4], **x)).items()}
+    return {'model': model, 'objective': objective, 'sense': sense, 'x': x, 'outputs': outputs,
+            'feasible': bool(v[k] == 0), 'history': np.array(history), 'evaluations': evaluations,
+            'population': pop, 'f': sign*f, 'violation': v}
+
+def plot_history(res):
+    ''' Best objective after each epoch and final designs over the first two variables'''
+    fig, ax = plt.subplots(1, 2, figsize=(11,4.5))
+    ax[0].plot(np.arange(1, len(res['history'])+1), res['history'][:, 0], 'bo-')
+    ax[0].set_xlabel('Epoch')
+    ax[0].set_ylabel('Best %s (%s)' % (res['objective'], res['sense']))
+    names = list(res['x'])[:2]
+    ok = res['violation'] == 0
+    p = res['population']
+    ax[1].plot(p[~ok, 0], p[~ok, 1], 'x', color='gray', ms=4, label='Infeasible')
+    sc = ax[1].scatter(p[ok, 0], p[ok, 1], c=res['f'][ok], s=10, cmap='viridis', label='Feasible')
+    ax[1].plot(res['x'][names[0]], res['x'][names[1]], 'r*', ms=14, label='Best')
+    ax[1].set_xlabel(names[0])
+    ax[1].set_ylabel(names[1])
+    plt.colorbar(sc, ax=ax[1], label=res['objective'])
+    ax[1].legend()
+    plt.tight_layout()
+    plt.show()
+
+# design variables of the chapter examples and their bounds
+DESIGNS = {
+    'stretching': {'R': (600, 2000), 'CL': (150, 450), 'mu': (0.02, 0.2)},
+    'draw_section': {'Rp': (3, 30), 'Rd': (3, 30), 'mu': (0.02, 0.2)},
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('model', choices=list(DESIGNS))
+    parser.add_argument('--objective', default='force')
+    parser.add_argument('--sense', choices=('min', 'max'), default='min')
+    parser.add_argument('--min-margin', type=float, default=0)
+    parser.add_argument('--population', type=int, default=40)
+    parser.add_argument('--islands', type=int, default=8)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    nominal = models.evaluate(args.model, {})
+    t0 = time.perf_counter()
+    res = optimize(args.model, DESIGNS[args.model], args.objective, args.sense, min_margin=args.min_margin,
+                   population=args.population, islands=args.islands, epochs=args.epochs,
+                   generations=args.generations, seed=args.seed, workers=args.workers)
+    print('%s: %s %s, %d evaluations, %.1f s' % (args.model, args.sense, args.objective, res['evaluations'],
+                                                 time.perf_counter()-t0))
+    print('Design:  ' + ', '.join('%s = %.4g (nominal %.4g)' % (k, v, models.NOMINAL[args.model][k]) for k, v in res['x'].items()))
+    print('%s = %.5g (nominal %.5g), margin = %.4f (nominal %.4f)%s'
+          % (args.objective, res['outputs'][args.objective], float(nominal[args.objective]),
+             res['outputs']['margin'], float(nominal['margin']), '' if res['feasible'] else ' INFEASIBLE'))
+    if args.plot:
+        plot_history(res)
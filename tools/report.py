@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Reports of a list of parts without the notebooks: each section runs the
+chapter functions that the notebooks call, with the printed output and the
+figures (rendered headless) assembled in one HTML page per part and an
+index of the whole pack (optionally one PDF per part).
+
+Parts are read from a CSV file (header row, one part per row) or a JSON list
+of dicts, with an 'id' and the parameters of the sections:
+
+    tube        Y, t, D, F, T                      hosford_thin_wall_tube
+    stretching  R, TL, CL, mu, t0, K, n, angle     examen_2019_stretching
+    necking     n, e0 (optional)                   necking
+    bending     t, E, nu, Y, curvature             bending
+
+A part gets the sections whose parameters it has. The sections are run in
+parallel processes and cached by the hash of their inputs and of the source
+of the modules they use, so that a rebuild only runs the sections that
+changed:
+
+    python tools/report.py parts.csv -o report
+    python tools/report.py parts.csv -o report --pdf --workers 8
+"""
+
+import argparse
+import base64
+import contextlib
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+import chapters
+import functions
+import hosford_thin_wall_tube as tube
+import examen_2019_stretching as stretching
+import necking
+import bending
+
+
+def tube_section(Y, t, D, F, T):
+    p = float(tube.compute_p_batch(Y, t, D, F, T))
+    tube.plot_mohr_mises(Y, t, D, F, T, p)
+
+def stretching_section(R, TL, CL, mu, t0, K, n, angle):
+    stretching.plot_stretching(R, TL, CL, mu, t0, K, n, angle)
+
+def necking_section(n, e0=0):
+    if e0:
+        necking.plot_Hill(n, [e0])
+    else:
+        necking.plot_Swift_Hill(n)
+
+def bending_section(t, E, nu, Y, curvature):
+    Ep, Yp = bending.constants_plane_strain(E, nu, Y)
+    print('Material constants in plane strain: Ep = %.1f GPa, Yp = %.1f MPa' % (Ep/1e3, Yp))
+    rhoe, Me, Mp = bending.bending_char(t, Ep, Yp)
+    print('Limiting elastic curvature: (1/rho)e = %.6f mm-1 --> radius = %.0f mm' % (1/rhoe, rhoe))
+    print('Limiting elastic moment: Me = %.1f Nm/m' % (Me))
+    print('Fully plastic moment: Mp = %.1f Nm/m' % (Mp))
+    plt.figure(figsize=(10, 7))   # plot_bending draws on the current figure
+    bending.plot_bending(t, Ep, Yp, rhoe, Me, Mp, curvature)
+
+# name: (function, parameters, optional parameters, modules)
+SECTIONS = {
+    'tube': (tube_section, ('Y', 't', 'D', 'F', 'T'), (), (tube, functions)),
+    'stretching': (stretching_section, ('R', 'TL', 'CL', 'mu', 't0', 'K', 'n', 'angle'), (), (stretching,)),
+    'necking': (necking_section, ('n',), ('e0',), (necking, functions)),
+    'bending': (bending_section, ('t', 'E', 'nu', 'Y', 'curvature'), (), (bending,)),
+}
+
+_source = {}
+
+def source_hash(modules):
+    ''' Hash of the source of the modules (a change of the code rebuilds the sections)'''
+    h = hashlib.sha256()
+    for m in modules:
+        if m.__file__ not in _source:
+            with open(m.__file__, 'rb') as fh:
+                _source[m.__file__] = hashlib.sha256(fh.read()).hexdigest()
+        h.update(_source[m.__file__].encode())
+    return h.hexdigest()
+
+def section_key(name, params, dpi):
+    func, required, optional, modules = SECTIONS[name]
+    data = json.dumps([name, params, dpi, source_hash(modules + (chapters,))], sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:20]
+
+def section_params(name, part):
+    ''' Parameters of a section for a part, or None if the part does not have them'''
+    func, required, optional, modules = SECTIONS[name]
+    if not all(k in part and part[k] not in ('', None) for k in required):
+        return None
+    return {k: float(part[k]) for k in required + optional if k in part and part[k] not in ('', None)}
+
+def run_section(job):
+    ''' Runs one section and returns its printed text and figures (PNG, base64)'''
+    name, params, dpi = job
+    func = SECTIONS[name][0]
+    plt.close('all')
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            func(**params)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    figures = []
+    for i in plt.get_fignums():
+        buf = io.BytesIO()
+        plt.figure(i).savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+        figures.append(base64.b64encode(buf.getvalue()).decode())
+    plt.close('all')
+    return {'section': name, 'params': params, 'text': out.getvalue(), 'figures': figures,
+            'error': error, 'time': time.perf_counter()-t0}
+
+def read_parts(filename):
+    if filename.endswith('.json'):
+        with open(filename) as fh:
+            parts = json.load(fh)
+    else:
+        with open(filename, newline='') as fh:
+            parts = list(csv.DictReader(fh))
+    for i, part in enumerate(parts):
+        part['id'] = str(part.get('id') or i)
+    return parts
+
+def page_name(part_id):
+    ''' File name of the page of a part: the id with only [A-Za-z0-9_.-] and
+    not starting with a dot, plus a hash of the id when it had to be changed'''
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', part_id).lstrip('.')
+    if name != part_id:
+        name += '-' + hashlib.sha256(part_id.encode()).hexdigest()[:8]
+    return name
+
+def write_part(part, results, outdir, pdf=False):
+    ''' HTML page (figures embedded) and optional PDF of one part'''
+    folder = os.path.join(outdir, 'parts')
+    body = ['<h1>Part %s</h1>' % html.escape(part['id'])]
+    for res in results:
+        body.append('<h2>%s</h2>' % res['section'].capitalize())
+        body.append('<p class="params">%s</p>' % ', '.join('%s = %g' % kv for kv in sorted(res['params'].items())))
+        if res['text']:
+            body.append('<pre>%s</pre>' % html.escape(res['text']))
+        if res['error']:
+            body.append('<pre class="error">%s</pre>' % html.escape(res['error']))
+        body.extend('<img src="data:image/png;base64,%s">' % fig for fig in res['figures'])
+    name = os.path.join(folder, page_name(part['id']))
+    with open(name + '.html', 'w') as fh:
+        fh.write(PAGE % ('Part %s' % html.escape(part['id']), '\n'.join(body)))
+    if pdf:
+        with PdfPages(name + '.pdf') as doc:
+            for res in results:
+                for fig64 in res['figures']:
+                    img = plt.imread(io.BytesIO(base64.b64decode(fig64)), format='png')
+                    fig = plt.figure(figsize=(img.shape[1]/100, img.shape[0]/100), dpi=100)
+                    fig.figimage(img)
+                    doc.savefig(fig)
+                    plt.close(fig)
+
+def write_index(parts, status, outdir):
+    rows = ['<tr><th>Part</th><th>Sections</th><th>Errors</th></tr>']
+    for part in parts:
+        names, errors = status[part['id']]
+        rows.append('<tr><td><a href="parts/%s.html">%s</a></td><td>%s</td><td>%s</td></tr>'
+                    % (page_name(part['id']), html.escape(part['id']), ', '.join(names), ', '.join(errors)))
+    with open(os.path.join(outdir, 'index.html'), 'w') as fh:
+        fh.write(PAGE % ('Report (%d parts)' % len(parts), '<table>%s</table>' % '\n'.join(rows)))
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%s</title>
+<style>body{font-family:sans-serif;margin:2em} img{max-width:100%%;display:block;margin:1em 0}
+pre{background:#f4f4f4;padding:0.5em} .error{color:#a00} .params{color:#555}
+table{border-collapse:collapse} td,th{border:1px solid #ccc;padding:0.2em 0.6em}</style>
+</head><body>
+%s
+</body></html>
+'''
+
+def build(parts, outdir, sections=None, workers=None, dpi=80, pdf=False, force=False):
+    ''' Builds the report of the parts; returns the number of sections run and reused'''
+    cache = os.path.join(outdir, '.cache')
+    os.makedirs(cache, exist_ok=True)
+    os.makedirs(os.path.join(outdir, 'parts'), exist_ok=True)
+    sections = sections or list(SECTIONS)
+
+    # sections of every part, keyed by the hash of their inputs (shared between equal parts)
+    plan, jobs = {}, {}
+    for part in parts:
+        plan[part['id']] = []
+        for name in sections:
+            params = section_params(name, part)
+            if params is None:
+                continue
+            key = section_key(name, params, dpi)
+            plan[part['id']].append(key)
+            if force or not os.path.exists(os.path.join(cache, key + '.json')):
+                jobs[key] = (name, params, dpi)
+
+    # run the new sections in parallel and store them as they finish
+    keys = list(jobs)
+    if keys:
+        workers = workers or os.cpu_count()
+        chunk = max(1, min(20, len(keys)//(4*workers)))
+        if workers == 1:
+            results = map(run_section, jobs.values())
+        else:
+            pool = ProcessPoolExecutor(workers)
+            results = pool.map(run_section, jobs.values(), chunksize=chunk)
+        for key, res in zip(keys, results):
+            if res['error'] is None:
+                with open(os.path.join(cache, key + '.json'), 'w') as fh:
+                    json.dump(res, fh)
+            else:
+                jobs[key] = res   # not cached: the section is run again in the next build
+        if workers != 1:
+            pool.shutdown()
+
+    # pages of the parts with any section rebuilt (or without a page)
+    status = {}
+    for part in parts:
+        res = []
+        for key in plan[part['id']]:
+            if isinstance(jobs.get(key), dict):
+                res.append(jobs[key])
+            else:
+                with open(os.path.join(cache, key + '.json')) as fh:
+                    res.append(json.load(fh))
+        status[part['id']] = ([r['section'] for r in res], [r['section'] for r in res if r['error']])
+        page = os.path.join(outdir, 'parts', page_name(part['id']))
+        missing = not os.path.exists(page + '.html') or (pdf and not os.path.exists(page + '.pdf'))
+        if force or missing or any(key in jobs for key in plan[part['id']]):
+            write_part(part, res, outdir, pdf)
+    write_index(parts, status, outdir)
+    return len(keys), sum(len(i) for i in plan.values()) - len(keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('parts', help='CSV or JSON file with the parts')
+    parser.add_argument('-o', '--output', default='report', help='output folder')
+    parser.add_argument('-s', '--sections', nargs='+', choices=list(SECTIONS), help='sections to include (default: all)')
+    parser.add_argument('--workers', type=int, default=None, help='parallel processes (default: all the cores)')
+    parser.add_argument('--dpi', type=int, default=80)
+    parser.add_argument('--pdf', action='store_true', help='also write one PDF per part')
+    parser.add_argument('--force', action='store_true', help='rebuild all the sections')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    parts = read_parts(args.parts)
+    run, cached = build(parts, args.output, args.sections, args.workers, args.dpi, args.pdf, args.force)
+    print('%d parts: %d sections run, %d reused, %.1f s -> %s'
+          % (len(parts), run, cached, time.perf_counter()-t0, os.path.join(args.output, 'index.html')))
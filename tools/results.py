@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Results of the batch solvers in one NumPy structured array per analysis
+(one record per case), instead of tuples of arrays or lists of floats:
+
+    res = results.tube(Y, t, D, F, T)
+    res['p'], res.units['p']          # field (a view) and its units
+    res.to_numpy()                    # the structured array itself, no copy
+    memoryview(res.data)              # buffer export (e.g. to Arrow or a socket);
+                                      # memoryview(res) needs Python >= 3.12 (PEP 688)
+    res.columns()                     # dict of fields (views, no copy)
+    res.save('tube.npy'); results.load('tube.npy')
+
+Fields with one value per point of a profile (draw section) are subarray
+fields of shape (points,). The analyses are tube, stretching, draw_section,
+bending and necking; dtype=np.float32 halves the memory of large runs.
+"""
+
+import json
+import numpy as np
+
+import chapters
+import hosford_thin_wall_tube as tube_
+import tube_envelope
+import examen_2019_stretching as stretching_
+import draw_section as ds
+import bending as bending_
+import necking as necking_
+
+
+class Results:
+    ''' Structured array of results with the units of its fields'''
+    __slots__ = ('analysis', 'data', 'units')
+
+    def __init__(self, analysis, data, units):
+        self.analysis = analysis
+        self.data = data
+        self.units = units
+
+    @classmethod
+    def from_fields(cls, analysis, fields, units, dtype=np.float64):
+        ''' Builds the results from a dict of arrays (broadcast to the same number of cases)'''
+        fields = {k: np.asarray(v) for k, v in fields.items()}
+        N = max(np.shape(v)[0] if np.ndim(v) else 1 for v in fields.values())
+        dt = np.dtype([(k, dtype, v.shape[1:]) if v.ndim > 1 else (k, dtype) for k, v in fields.items()])
+        data = np.empty(N, dtype=dt)
+        for k, v in fields.items():
+            data[k] = v if v.ndim > 1 else np.broadcast_to(v, (N,))
+        return cls(analysis, data, {k: units.get(k, '') for k in fields})
+
+    @property
+    def fields(self):
+        return self.data.dtype.names
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        return Results(self.analysis, self.data[key], self.units)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.data.dtype:
+            return self.data.copy() if copy else self.data
+        if copy is False:
+            raise ValueError('Converting the results to %s needs a copy' % np.dtype(dtype))
+        return self.data.astype(dtype)
+
+    def __buffer__(self, flags):     # Python >= 3.12
+        return memoryview(self.data)
+
+    def __repr__(self):
+        fields = ', '.join('%s (%s)' % (k, u) if u else k for k, u in self.units.items())
+        return '<%s results: %d cases, %s>' % (self.analysis, len(self), fields)
+
+    def to_numpy(self):
+        return self.data
+
+    def columns(self):
+        return {k: self.data[k] for k in self.fields}
+
+    def save(self, filename):
+        ''' .npy file of the array, with the units in a .json file next to it'''
+        np.save(filename, self.data)
+        with open(str(filename).rsplit('.npy', 1)[0] + '.json', 'w') as fh:
+            json.dump({'analysis': self.analysis, 'units': self.units}, fh)
+
+def load(filename, mmap_mode='r'):
+    ''' Results saved with Results.save (memory-mapped by default)'''
+    with open(str(filename).rsplit('.npy', 1)[0] + '.json') as fh:
+        meta = json.load(fh)
+    return Results(meta['analysis'], np.load(filename, mmap_mode=mmap_mode), meta['units'])
+
+
+# Analyses
+
+def tube(Y, t, D, F, T, dtype=np.float64):
+    ''' Yield pressure of thin-walled tubes (Mises) and stresses at yielding'''
+    p = tube_.compute_p_batch(Y, t, D, F, T)
+    st, sz, srt = tube_envelope.stresses(p, F, T, t, D)
+    return Results.from_fields('tube', {'Y': Y, 't': t, 'D': D, 'F': F, 'T': T, 'p': p, 'st': st, 'sz': sz, 'srt': srt},
+                               {'Y': 'MPa', 't': 'mm', 'D': 'mm', 'F': 'N', 'T': 'Nm', 'p': 'MPa',
+                                'st': 'MPa', 'sz': 'MPa', 'srt': 'MPa'}, dtype)
+
+def stretching(R, TL, CL, mu, t0, K, n, angle, dtype=np.float64):
+    ''' Stretching over a punch of radius R (examen_2019_stretching)'''
+    out = stretching_.solve_stretching_batch(R, TL, CL, mu, t0, K, n, angle)
+    fields = dict(zip(('R', 'TL', 'CL', 'mu', 't0', 'K', 'n', 'angle'), (R, TL, CL, mu, t0, K, n, angle)))
+    fields.update(zip(('s', 'e1O', 'e1A', 'tO', 'tA', 'T1O', 'T1A', 'p', 'F'), out))
+    return Results.from_fields('stretching', fields,
+                               {'R': 'mm', 'TL': 'mm', 'CL': 'mm', 't0': 'mm', 'K': 'MPa', 'angle': 'deg',
+                                's': 'mm', 'tO': 'mm', 'tA': 'mm', 'T1O': 'kN/m', 'T1A': 'kN/m',
+                                'p': 'MPa', 'F': 'kN/m'}, dtype)
+
+def draw_section(segments, T1O, mu, K, n, t0, dtype=np.float64, **kw):
+    ''' Draw section (draw_section.propagate): values at the ends of the
+    segments and profiles as subarray fields'''
+    res = ds.propagate(segments, T1O, mu, K, n, t0, **kw)
+    N = res['T1'].shape[:-1] or (1,)
+    fields = {k: np.reshape(v, N + v.shape[-1:]) for k, v in res.items() if k != 'F'}
+    fields['F'] = np.reshape(res['F'], N)
+    return Results.from_fields('draw_section', fields,
+                               {'position': 'mm', 'T1': 'kN/m', 's': 'mm', 'T1_profile': 'kN/m',
+                                'p': 'MPa', 't': 'mm', 'B': 'kN/m', 'F': 'kN/m'}, dtype)
+
+def bending(t, Ep, Yp, rho, dtype=np.float64):
+    ''' Elastic-perfectly plastic bending (plane strain) to the radius rho'''
+    rhoe, Me, Mp = bending_.bending_char(t, Ep, Yp)
+    return Results.from_fields('bending', {'t': t, 'Ep': Ep, 'Yp': Yp, 'rho': rho, 'rhoe': rhoe,
+                                           'Me': Me, 'Mp': Mp, 'M': bending_.M_batch(rho, rhoe, Me)},
+                               {'t': 'mm', 'Ep': 'MPa', 'Yp': 'MPa', 'rho': 'mm', 'rhoe': 'mm',
+                                'Me': 'Nm/m', 'Mp': 'Nm/m', 'M': 'Nm/m'}, dtype)
+
+def necking(beta, n, e0=0, dtype=np.float64):
+    ''' Swift (diffuse) and Hill (localized) limit strains for the strain ratios beta'''
+    e1s = necking_.e1s_batch(np.asarray(beta, dtype=float), n)
+    with np.errstate(divide='ignore'):
+        e1h = necking_.e1h_batch(np.asarray(beta, dtype=float), n, e0)
+    return Results.from_fields('necking', {'beta': beta, 'n': n, 'e0': e0, 'e1s': e1s, 'e2s': beta*e1s,
+                                           'e1h': e1h, 'e2h': beta*e1h}, {}, dtype)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    N = 10**6
+    res = tube(rng.uniform(200, 400, N), rng.uniform(1, 3, N), rng.uniform(50, 120, N), 8000, 2000)
+    print(res)
+    print('%.1f MB (float64 structured array)' % (res.data.nbytes/1e6))
+    print('Buffer: %s, %d bytes per case' % (memoryview(res.data).format[:40] + '...', res.data.itemsize))
+
+    res = necking(np.linspace(-0.5, 1, 7), 0.22, dtype=np.float32)
+    print(res)
+    print(res.to_numpy())
+
+    segments = [ds.punch(2800, 0.1), ds.punch(np.array([5, 10, 20]), np.pi/2-0.1), ds.straight(28),
+                ds.die(10, np.pi/2), ds.flange(80)]
+    res = draw_section(segments, 200, 0.1, 750, 0.23, 0.8)
+    print(res, res.data.dtype['T1_profile'])
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Sensitivity of the outputs of the forming models (models.py) to their
+inputs, e.g. of the punch force and the thinning at point O of the
+stretching and draw section models, or of the springback of the bending
+model.
+
+Local sensitivities at one or many design points: derivatives by complex
+step, f'(x) = Im(f(x + ih))/h, when the model keeps complex inputs (the
+necking limits); the solvers of the other models work in float arrays, so
+they use central differences. All the perturbed points are evaluated in one
+batched call. The elasticities (x/y)*dy/dx compare inputs of any units.
+
+    res = gradient('stretching')
+    res['elasticity']['force']['mu']
+
+Global sensitivities: Sobol indices of the inputs with a distribution
+(uncertainty.SPECS) by the Saltelli sampling scheme, N*(p+2) evaluations
+with the matrices A, B and AB_i (A with the column i of B), first order
+indices by the Saltelli (2010) estimator and total indices by the Jansen
+estimator. The evaluations are run by chunks in parallel processes and
+cached (npz files keyed by the hash of the inputs and of the source of the
+models), so the reports do not evaluate the models again.
+
+    res = sobol('bending', SPECS['bending'], 10**4)
+    res['S1']['springback'], res['ST']['springback']
+
+    python tools/sensitivity.py stretching -N 10000
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+
+import chapters
+import models
+from uncertainty import SPECS, sample
+
+CACHE = os.path.join(chapters.ROOT, '.cache', 'sensitivity')
+
+def _flat(inputs):
+    ''' Inputs broadcast to a common shape'''
+    return dict(zip(inputs, np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in inputs.values()])))
+
+def _complex_step(model, x, names, h=1e-20):
+    p = len(names)
+    xc = {k: np.repeat(v[None], p, axis=0).astype(complex) for k, v in x.items()}
+    for j, k in enumerate(names):
+        xc[k][j] += 1j*h
+    with warnings.catch_warnings():
+        # a model that drops the imaginary part would return zero derivatives
+        warnings.simplefilter('error', np.exceptions.ComplexWarning)
+        y = models.evaluate(model, xc, dtype=complex)
+    value = {k: np.real(v[0]) for k, v in y.items()}
+    return value, {k: {name: np.imag(v[j])/h for j, name in enumerate(names)} for k, v in y.items()}
+
+def _central(model, x, names, rel=1e-5):
+    p = len(names)
+    xc = {k: np.repeat(v[None], 2*p+1, axis=0) for k, v in x.items()}
+    h = {}
+    for j, k in enumerate(names):
+        h[k] = rel*np.maximum(np.abs(x[k]), 1e-3)
+        xc[k][2*j+1] += h[k]
+        xc[k][2*j+2] -= h[k]
+    y = {k: np.broadcast_to(v, (2*p+1,) + x[names[0]].shape) for k, v in models.evaluate(model, xc).items()}
+    value = {k: v[0] for k, v in y.items()}
+    return value, {k: {name: (v[2*j+1]-v[2*j+2])/(2*h[name]) for j, name in enumerate(names)}
+                   for k, v in y.items()}
+
+def gradient(model, x0=None, names=None, method='auto'):
+    ''' Local sensitivities of the outputs at x0 (dict of scalars or arrays of design
+    points, missing inputs take the nominal value)
+
+    method: 'complex' (complex step), 'central' (central differences) or 'auto'
+    (complex step if the model supports it). Returns a dict with the 'value' of
+    the outputs, the 'gradient' and the 'elasticity' (dicts output -> input).'''
+    x = _flat(dict(models.NOMINAL[model], **(x0 or {})))
+    names = list(names or models.NOMINAL[model])
+    if method in ('auto', 'complex'):
+        try:
+            value, grad = _complex_step(model, x, names)
+            method = 'complex'
+        except (TypeError, ValueError, np.exceptions.ComplexWarning):
+            if method == 'complex':
+                raise
+    if method in ('auto', 'central'):
+        value, grad = _central(model, x, names)
+        method = 'central'
+    elif method != 'complex':
+        raise ValueError('Unknown method: %s' % method)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        elasticity = {k: {name: d*x[name]/value[k] for name, d in g.items()} for k, g in grad.items()}
+    return {'model': model, 'method': method, 'x': x, 'value': value, 'gradient': grad, 'elasticity': elasticity}
+
+def _run_chunk(args):
+    model, spec, N, seed, method = args
+    rngA, rngB = [np.random.default_rng(s) for s in seed.spawn(2)]
+    A, B = sample(spec, N, rngA, method), sample(spec, N, rngB, method)
+    factors = [k for k, d in spec.items() if isinstance(d, (tuple, list))]
+    # rows: A, B, AB_1 ... AB_p
+    x = {k: np.stack([A[k], B[k]] + [B[k] if j == k else A[k] for j in factors]) for k in A}
+    y = models.evaluate(model, x)
+    return {k: np.broadcast_to(v, (len(factors)+2, N)) for k, v in y.items()}
+
+def _source_hash():
+    ''' Hash of the source of the models and of the chapter modules'''
+    h = hashlib.sha256()
+    files = [models.__file__] + sorted(f for c in chapters.CHAPTERS for f in glob.glob(os.path.join(chapters.ROOT, c, '*.py')))
+    for f in files:
+        with open(f, 'rb') as fh:
+            h.update(hashlib.sha256(fh.read()).digest())
+    return h.hexdigest()
+
+def cache_key(model, spec, N, seed, chunk, method):
+    data = json.dumps([model, spec, N, seed, chunk, method, models.NOMINAL[model], _source_hash()], sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:20]
+
+def evaluations(model, spec, N, seed=0, chunk=10**4, method='lhs', workers=None, cache=CACHE):
+    ''' Model outputs at the Saltelli sample: dict output -> array (p+2, N), rows
+    A, B, AB_1 ... AB_p for the inputs with a distribution in spec order.
+    cache: folder of the npz files (None: no cache)'''
+    filename = os.path.join(cache, cache_key(model, spec, N, seed, chunk, method) + '.npz') if cache else None
+    if filename and os.path.exists(filename):
+        with np.load(filename) as data:
+            return {k: data[k] for k in data.files}
+    sizes = [min(chunk, N-i) for i in range(0, N, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(model, spec, n, s, method) for n, s in zip(sizes, seeds)]
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) == 1:
+        results = list(map(_run_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    y = {k: np.concatenate([r[k] for r in results], axis=1) for k in results[0]}
+    if filename:
+        os.makedirs(cache, exist_ok=True)
+        np.savez(filename + '.tmp.npz', **y)
+        os.replace(filename + '.tmp.npz', filename)
+    return y
+
+def indices(y, resamples=100, seed=0):
+    ''' First order and total Sobol indices (p,) from the evaluations (p+2, N) of
+    one output, and their bootstrap standard errors. Samples with any output
+    without solution are not used.'''
+    ok = np.all(np.isfinite(y), axis=0)
+    # centred outputs: the estimators are not spoilt by a large mean (e.g. springback ratio ~ 1)
+    y = y[:, ok] - np.mean(y[:2, ok])
+    fA, fB, fAB = y[0], y[1], y[2:]
+
+    def estimate(i):
+        V = np.var(np.concatenate((fA[i], fB[i])))
+        S1 = np.mean(fB[i]*(fAB[:, i]-fA[i]), axis=-1)/V
+        ST = 0.5*np.mean((fA[i]-fAB[:, i])**2, axis=-1)/V
+        return S1, ST
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        S1, ST = estimate(slice(None))
+        rng = np.random.default_rng(seed)
+        boot = [estimate(rng.integers(0, len(fA), len(fA))) for i in range(resamples)]
+    S1_se, ST_se = np.std([b[0] for b in boot], axis=0), np.std([b[1] for b in boot], axis=0)
+    return S1, ST, S1_se, ST_se, 1 - ok.mean()
+
+def sobol(model, spec, N, seed=0, chunk=10**4, method='lhs', workers=None, cache=CACHE, outputs=None):
+    ''' Sobol indices of the inputs with a distribution in spec for each output
+
+    Returns a dict with the 'names' of the inputs and per output the first order
+    'S1' and total 'ST' indices, their standard errors 'S1_se', 'ST_se' and the
+    fraction of samples without solution ('nan').'''
+    y = evaluations(model, spec, N, seed, chunk, method, workers, cache)
+    names = [k for k, d in spec.items() if isinstance(d, (tuple, list))]
+    res = {'model': model, 'N': N, 'names': names, 'evaluations': N*(len(names)+2),
+           'S1': {}, 'ST': {}, 'S1_se': {}, 'ST_se': {}, 'nan': {}}
+    for k in outputs or y:
+        res['S1'][k], res['ST'][k], res['S1_se'][k], res['ST_se'][k], res['nan'][k] = indices(y[k], seed=seed)
+    return res
+
+def print_gradient(res, outputs=None):
+    names = list(next(iter(res['elasticity'].values())))
+    print('%s: elasticities (x/y)*dy/dx (%s)' % (res['model'], res['method']))
+    print('%-14s' % 'output' + ''.join('%9s' % k for k in names))
+    for k in outputs or res['elasticity']:
+        print('%-14s' % k + ''.join('%9.3f' % float(np.ravel(res['elasticity'][k][n])[0]) for n in names))
+
+def print_sobol(res):
+    print('%s: Sobol indices, %d evaluations' % (res['model'], res['evaluations']))
+    print('%-14s %4s' % ('output', '') + ''.join('%9s' % k for k in res['names']))
+    for k in res['S1']:
+        print('%-14s %4s' % (k, 'S1') + ''.join('%9.3f' % v for v in res['S1'][k]))
+        print('%-14s %4s' % ('', 'ST') + ''.join('%9.3f' % v for v in res['ST'][k]))
+
+def plot_sobol(res, outputs=None):
+    ''' First order and total indices of each input, one plot per output'''
+    outputs = outputs or list(res['S1'])
+    fig, ax = plt.subplots(1, len(outputs), figsize=(4*len(outputs), 3.5), squeeze=False)
+    x = np.arange(len(res['names']))
+    for a, k in zip(ax[0], outputs):
+        a.bar(x-0.2, res['S1'][k], 0.4, yerr=res['S1_se'][k], color='b', label='First order')
+        a.bar(x+0.2, res['ST'][k], 0.4, yerr=res['ST_se'][k], color='orange', label='Total')
+        a.set_xticks(x)
+        a.set_xticklabels(res['names'])
+        a.set_ylim(0, 1.05)
+        a.set_title(k)
+    ax[0][0].set_ylabel('Sobol index')
+    ax[0][0].legend()
+    plt.tight_layout()
+    plt.show()
+
+def plot_elasticities(res, output):
+    ''' Tornado plot of the elasticities of one output at the design point'''
+    e = {k: float(np.ravel(v)[0]) for k, v in res['elasticity'][output].items()}
+    names = sorted(e, key=lambda k: abs(e[k]))
+    fig, ax = plt.subplots()
+    ax.barh(names, [e[k] for k in names], color=['r' if e[k] < 0 else 'b' for k in names])
+    ax.axvline(x=0, color='k', lw=0.5)
+    ax.set_xlabel(r'Elasticity of %s, $(x/y)\,\partial y/\partial x$' % output)
+    plt.tight_layout()
+    plt.show()
+
+# outputs of interest of each model
+OUTPUTS = {'stretching': ['force', 'thinning_O'], 'draw_section': ['force', 'thinning'],
+           'bending': ['springback'], 'necking': ['limit']}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('model', choices=list(models.MODELS))
+    parser.add_argument('-N', type=int, default=10**4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=10**4)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    res = gradient(args.model)
+    print_gradient(res, OUTPUTS[args.model])
+    t0 = time.perf_counter()
+    res = sobol(args.model, SPECS[args.model], args.N, args.seed, args.chunk, workers=args.workers,
+                cache=None if args.no_cache else CACHE, outputs=OUTPUTS[args.model])
+    print_sobol(res)
+    print('%.1f s' % (time.perf_counter()-t0))
+    if args.plot:
+        plot_sobol(res)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Local HTTP/JSON service for the forming calculators.
+
+    POST /tube       {"Y", "t", "D", "F", "T"}                   yield pressure p
+    POST /stretching {"R", "TL", "CL", "mu", "t0", "K", "n", "angle"}
+                                                                  strains, tensions, punch force
+    POST /bending    {"t", "Ep", "Yp", "rho"}                    rhoe, Me, Mp and moment M
+    POST /necking    {"beta", "n", "e0"}                         limit strains e1s, e1h
+    GET  /metrics                                                 requests, batches, p50/p99 latency
+
+Concurrent requests to the same endpoint are grouped (micro-batching) into
+one call of the array version of the calculator, which runs in a process
+pool so that the event loop keeps accepting requests:
+
+    python tools/service.py --port 8000
+    python tools/service.py --demo           # local server + client, prints the metrics
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import chapters
+import hosford_thin_wall_tube as tube
+import examen_2019_stretching as stretching
+import necking
+import bending
+
+
+# Array kernels: dict of arrays in, dict of arrays out (top level, so they can be pickled)
+
+def tube_kernel(Y, t, D, F, T):
+    return {'p': tube.compute_p_batch(Y, t, D, F, T)}
+
+def stretching_kernel(R, TL, CL, mu, t0, K, n, angle):
+    keys = ('s', 'e1O', 'e1A', 'tO', 'tA', 'T1O', 'T1A', 'p', 'F')
+    return dict(zip(keys, stretching.solve_stretching_batch(R, TL, CL, mu, t0, K, n, angle)))
+
+def bending_kernel(t, Ep, Yp, rho):
+    rhoe, Me, Mp = bending.bending_char(t, Ep, Yp)
+    return {'rhoe': rhoe, 'Me': Me, 'Mp': Mp, 'M': bending.M_batch(rho, rhoe, Me)}
+
+def necking_kernel(beta, n, e0):
+    return {'e1s': necking.e1s_batch(beta, n), 'e1h': necking.e1h_batch(beta, n, e0)}
+
+# path: (kernel, input names, default values)
+ENDPOINTS = {
+    '/tube': (tube_kernel, ('Y', 't', 'D', 'F', 'T'), {}),
+    '/stretching': (stretching_kernel, ('R', 'TL', 'CL', 'mu', 't0', 'K', 'n', 'angle'), {}),
+    '/bending': (bending_kernel, ('t', 'Ep', 'Yp', 'rho'), {}),
+    '/necking': (necking_kernel, ('beta', 'n', 'e0'), {'e0': 0}),
+}
+
+def run_batch(kernel, columns):
+    with np.errstate(all='ignore'):
+        out = kernel(*[np.asarray(c, dtype=float) for c in columns])
+    N = len(columns[0])
+    return {k: np.broadcast_to(v, (N,)).tolist() for k, v in out.items()}
+
+
+class Batcher:
+    ''' Groups the requests to one endpoint that arrive within max_delay (s)'''
+
+    def __init__(self, kernel, names, defaults, pool, max_batch=4096, max_delay=0.002):
+        self.kernel, self.names, self.defaults = kernel, names, defaults
+        self.pool, self.max_batch, self.max_delay = pool, max_batch, max_delay
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.task = asyncio.get_running_loop().create_task(self.loop())
+
+    async def submit(self, params):
+        row = [float(params[k]) if k in params else float(self.defaults[k]) for k in self.names]
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            columns = list(zip(*[row for row, future in items]))
+            try:
+                out = await loop.run_in_executor(self.pool, run_batch, self.kernel, columns)
+            except Exception as e:
+                for row, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            # the future of a request is cancelled when its client is gone
+            for i, (row, future) in enumerate(items):
+                if not future.done():
+                    future.set_result({k: v[i] for k, v in out.items()})
+
+
+class Service:
+
+    def __init__(self, workers=None, max_delay=0.002):
+        self.pool = ProcessPoolExecutor(workers) if workers != 0 else None
+        self.max_delay = max_delay
+        self.batchers = {}
+        # latency of the last 10000 requests to each endpoint, and number of requests
+        self.latency = {path: collections.deque(maxlen=10000) for path in ENDPOINTS}
+        self.requests = dict.fromkeys(ENDPOINTS, 0)
+
+    def metrics(self):
+        out = {}
+        for path, t in self.latency.items():
+            t = np.array(t)*1000
+            out[path] = {'requests': self.requests[path],
+                         'batches': self.batchers[path].batches if path in self.batchers else 0,
+                         'p50_ms': float(np.percentile(t, 50)) if t.size else None,
+                         'p99_ms': float(np.percentile(t, 99)) if t.size else None}
+        return out
+
+    async def handle(self, reader, writer):
+        ''' One request per connection (Connection: close)'''
+        try:
+            try:
+                method, path, version = (await reader.readline()).decode().split()
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, value = line.decode().split(':', 1)
+                    if key.strip().lower() == 'content-length':
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b''
+            except ValueError as e:   # malformed request line or headers
+                status, out = 400, {'error': 'bad request: %s' % e}
+            else:
+                status, out = await self.dispatch(method, path, body)
+            data = json.dumps(out).encode()
+            writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n'
+                         % (status, b'OK' if status == 200 else b'Error', len(data)) + data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics()
+        if method != 'POST' or path not in ENDPOINTS:
+            return 404, {'error': 'unknown endpoint %s %s' % (method, path)}
+        t0 = time.perf_counter()
+        if path not in self.batchers:
+            self.batchers[path] = Batcher(*ENDPOINTS[path], self.pool, max_delay=self.max_delay)
+        try:
+            out = await self.batchers[path].submit(json.loads(body))
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {'error': 'bad request: %s' % e}
+        except Exception as e:   # e.g. BrokenProcessPool
+            return 500, {'error': 'internal error: %s: %s' % (type(e).__name__, e)}
+        self.latency[path].append(time.perf_counter() - t0)
+        self.requests[path] += 1
+        return 200, out
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        server = await asyncio.start_server(self.handle, host, port)
+        # warm up the workers, so that the first requests do not pay their start-up
+        if self.pool:
+            await asyncio.get_running_loop().run_in_executor(self.pool, run_batch, necking_kernel, [[0], [0.2], [0]])
+        return server
+
+    async def close(self, server):
+        server.close()
+        await server.wait_closed()
+        for batcher in self.batchers.values():
+            batcher.task.cancel()
+        if self.pool:
+            self.pool.shutdown()
+
+
+# Local client
+
+async def request(host, port, path, payload=None):
+    ''' One HTTP request to the service; returns the decoded JSON answer'''
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    method = b'POST' if payload is not None else b'GET'
+    writer.write(b'%s %s HTTP/1.1\r\nHost: %s\r\nContent-Length: %d\r\n\r\n' % (method, path.encode(), host.encode(), len(body)) + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, value = line.decode().split(':', 1)
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    out = json.loads(await reader.readexactly(length))
+    writer.close()
+    await writer.wait_closed()
+    if status != 200:
+        raise RuntimeError(out.get('error', status))
+    return out
+
+async def demo(port, clients=500, workers=None):
+    service = Service(workers)
+    server = await service.serve('127.0.0.1', port)
+    rng = np.random.default_rng(0)
+    jobs = []
+    for i in range(clients):
+        jobs.append(request('127.0.0.1', port, '/tube', {'Y': 250, 't': 2, 'D': 80, 'F': 8000, 'T': float(rng.uniform(0, 3000))}))
+        jobs.append(request('127.0.0.1', port, '/stretching', {'R': 1100, 'TL': 3000, 'CL': 300, 'mu': 0.1, 't0': 1.2,
+                                                              'K': 810, 'n': 0.24, 'angle': float(rng.uniform(10, 40))}))
+        jobs.append(request('127.0.0.1', port, '/bending', {'t': 1.2, 'Ep': 230e3, 'Yp': 86.6, 'rho': float(rng.uniform(5, 2000))}))
+        jobs.append(request('127.0.0.1', port, '/necking', {'beta': float(rng.uniform(-0.9, 1)), 'n': 0.22}))
+    t0 = time.perf_counter()
+    out = await asyncio.gather(*jobs)
+    print('%d requests in %.3f s' % (len(jobs), time.perf_counter()-t0))
+    print('Tube yield pressure: %.2f MPa' % out[0]['p'])
+    print(json.dumps(await request('127.0.0.1', port, '/metrics'), indent=1))
+    await service.close(server)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help='processes of the pool (0: run in the event loop threads)')
+    parser.add_argument('--delay', type=float, default=0.002, help='maximum wait to group requests (s)')
+    parser.add_argument('--demo', action='store_true', help='run a local client against the service and exit')
+    args = parser.parse_args()
+
+    if args.demo:
+        asyncio.run(demo(args.port, workers=args.workers))
+    else:
+        async def main():
+            server = await Service(args.workers, args.delay).serve(args.host, args.port)
+            print('Serving on http://%s:%d' % (args.host, args.port))
+            await server.serve_forever()
+        asyncio.run(main())
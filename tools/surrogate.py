@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Lookup tables of the forming models (models.py) for repeated queries, e.g.
+the stretching example at any (angle, mu, K, n) without solving the
+equilibrium of the sheet each time.
+
+The table holds the outputs of the model at the nodes of a grid (the other
+inputs are fixed) and they are interpolated multilinearly. The error of the
+interpolation is estimated against the model at the centre of each cell
+(where it is largest for smooth outputs) and at random points in it. A query is answered by the model,
+in one batched call for all such points, when the point is outside the
+grid, the estimated error of its cell is over the tolerance of an output,
+or a fixed input is different. A cell without solution at all its nodes and
+points (e.g. a necked draw section) gives nan from the table.
+
+The tables are built offline in parallel processes and saved as .npy files
+(values and errors) with the grid in a .json file; they are loaded
+memory-mapped, so the start of a service takes milliseconds and only the
+cells used are read from the disk.
+
+    table = build('stretching', TABLES['stretching']['axes'], TABLES['stretching']['tol'])
+    table.save('stretching.npy')
+    table = load('stretching.npy')
+    table({'angle': [30, 38], 'mu': 0.1, 'K': 810, 'n': 0.24})['force']
+
+    python tools/surrogate.py stretching -o stretching.npy
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import ndimage
+
+import chapters
+import models
+
+class Table:
+
+    __slots__ = ('model', 'axes', 'uniform', 'names', 'outputs', 'fixed', 'tol', 'values', 'error', 'stats')
+
+    def __init__(self, model, axes, outputs, fixed, tol, values, error):
+        ''' axes: dict input -> grid (increasing); values (nodes..., outputs), error (cells..., outputs)'''
+        self.model = model
+        self.names = list(axes)
+        self.axes = [np.asarray(axes[k], dtype=float) for k in self.names]
+        # uniform axes: the cell is found by index arithmetic instead of a search
+        self.uniform = [np.allclose(np.diff(g), (g[-1]-g[0])/(len(g)-1)) for g in self.axes]
+        self.outputs = list(outputs)
+        self.fixed = dict(fixed)
+        self.tol = dict(tol)
+        self.values = values
+        self.error = error
+        self.stats = {'queries': 0, 'exact': 0}
+
+    def __repr__(self):
+        return 'Table(%s: %s, %d nodes, outputs %s)' % (self.model, ' x '.join(
+            '%s[%d]' % (k, len(g)) for k, g in zip(self.names, self.axes)), self.values[..., 0].size, self.outputs)
+
+    def interpolate(self, x):
+        ''' Interpolated outputs (N, outputs), estimated error of the cells (N, outputs)
+        and whether the points (N, inputs) are inside the grid'''
+        shape = self.values.shape[:-1]
+        node, cell = np.zeros(len(x), dtype=np.intp), np.zeros(len(x), dtype=np.intp)
+        w = []
+        inside = np.ones(len(x), dtype=bool)
+        for j, g in enumerate(self.axes):
+            if self.uniform[j]:
+                i = np.clip(((x[:, j]-g[0])*((len(g)-1)/(g[-1]-g[0]))).astype(np.intp), 0, len(g)-2)
+            else:
+                i = np.clip(np.searchsorted(g, x[:, j], side='right') - 1, 0, len(g)-2)
+            node = node*shape[j] + i
+            cell = cell*(shape[j]-1) + i
+            w.append(((x[:, j]-g[i])/(g[i+1]-g[i]))[:, None])
+            inside &= (x[:, j] >= g[0]) & (x[:, j] <= g[-1])
+        values = self.values.reshape(-1, self.values.shape[-1])
+        strides = np.cumprod((1,) + shape[:0:-1])[::-1]
+        # linear interpolation along one axis at a time between the corners of the cells
+        def lerp(j, index):
+            if j == len(w):
+                return values.take(index, axis=0)
+            a = lerp(j+1, index)
+            b = lerp(j+1, index + strides[j])
+            b -= a
+            b *= w[j]
+            b += a
+            return b
+        return lerp(0, node), self.error.reshape(-1, values.shape[1]).take(cell, axis=0), inside
+
+    def __call__(self, inputs, tol=None):
+        ''' Outputs of the model for a dict of inputs (missing inputs take the fixed value),
+        from the table when it is accurate enough, otherwise from the model'''
+        tol = dict(self.tol, **(tol or {}))
+        x = dict(self.fixed, **inputs)
+        x = dict(zip(x, np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in x.values()])))
+        shape = x[self.names[0]].shape
+        X = np.stack([x[k].ravel() for k in self.names], axis=-1)
+        y, err, exact = self.interpolate(X)
+        exact = ~exact | np.any(~(err <= np.array([tol.get(k, np.inf) for k in self.outputs])), axis=-1)
+        for k, v in self.fixed.items():
+            exact |= x[k].ravel() != v
+        if exact.any():
+            ye = models.evaluate(self.model, {k: v.ravel()[exact] for k, v in x.items()})
+            y[exact] = np.stack([np.broadcast_to(ye[k], (exact.sum(),)) for k in self.outputs], axis=-1)
+        self.stats['queries'] += len(X)
+        self.stats['exact'] += int(exact.sum())
+        return {k: y[:, j].reshape(shape) for j, k in enumerate(self.outputs)}
+
+    def save(self, filename):
+        ''' .npy files of the values and of the errors, with the grid in a .json file'''
+        base = str(filename).rsplit('.npy', 1)[0]
+        np.save(base + '.npy', np.ascontiguousarray(self.values))
+        np.save(base + '.err.npy', np.ascontiguousarray(self.error))
+        with open(base + '.json', 'w') as fh:
+            json.dump({'model': self.model, 'axes': {k: g.tolist() for k, g in zip(self.names, self.axes)},
+                       'outputs': self.outputs, 'fixed': self.fixed, 'tol': self.tol}, fh)
+
+def load(filename, mmap_mode='r'):
+    ''' Table saved with Table.save (memory-mapped by default)'''
+    base = str(filename).rsplit('.npy', 1)[0]
+    with open(base + '.json') as fh:
+        meta = json.load(fh)
+    return Table(meta['model'], meta['axes'], meta['outputs'], meta['fixed'], meta['tol'],
+                 np.load(base + '.npy', mmap_mode=mmap_mode), np.load(base + '.err.npy', mmap_mode=mmap_mode))
+
+def _run_chunk(args):
+    model, inputs, outputs, n = args
+    y = models.evaluate(model, inputs)
+    return np.stack([np.broadcast_to(y[k], (n,)) for k in outputs], axis=-1)
+
+def _evaluate(model, grid, fixed, outputs, chunk, pool, mesh=True):
+    ''' Outputs at the nodes of the grid (dict input -> 1D array): array (nodes..., outputs),
+    or at the points (mesh=False): array (points, outputs)'''
+    names = list(grid)
+    if mesh:
+        grid = dict(zip(names, np.meshgrid(*grid.values(), indexing='ij')))
+    shape = next(iter(grid.values())).shape
+    flat = [m.ravel() for m in grid.values()]
+    jobs = [(model, dict(fixed, **{k: m[i:i+chunk] for k, m in zip(names, flat)}), outputs, len(flat[0][i:i+chunk]))
+            for i in range(0, len(flat[0]), chunk)]
+    results = list(pool.map(_run_chunk, jobs) if pool else map(_run_chunk, jobs))
+    return np.concatenate(results).reshape(shape + (len(outputs),))
+
+def build(model, axes, tol, outputs=None, fixed=None, checks=1, seed=0, chunk=10**4, workers=None):
+    ''' Table of the model over the grid axes (dict input -> increasing grid); the
+    other inputs are fixed (default: nominal). tol: dict output -> absolute tolerance
+
+    The error of each cell is the largest one at its centre and at checks random
+    points in it, and of its neighbour cells (a kink of the outputs near a face
+    of the cell is not seen from inside).'''
+    fixed = {k: float(v) for k, v in dict(models.NOMINAL[model], **(fixed or {})).items() if k not in axes}
+    outputs = list(outputs or tol)
+    axes = {k: np.asarray(g, dtype=float) for k, g in axes.items()}
+    cells = tuple(len(g)-1 for g in axes.values())
+    # points of each cell: centre and random points, in local coordinates (points, cells..., inputs)
+    u = np.concatenate((np.full((1,) + cells + (len(axes),), 0.5),
+                        np.random.default_rng(seed).random((checks,) + cells + (len(axes),))))
+    lower = np.meshgrid(*[g[:-1] for g in axes.values()], indexing='ij')
+    width = np.meshgrid(*[np.diff(g) for g in axes.values()], indexing='ij')
+    points = {k: (lower[j] + u[..., j]*width[j]).ravel() for j, k in enumerate(axes)}
+    pool = ProcessPoolExecutor(workers or os.cpu_count()) if workers != 1 else None
+    try:
+        values = _evaluate(model, axes, fixed, outputs, chunk, pool)
+        exact = _evaluate(model, points, fixed, outputs, chunk, pool, mesh=False)
+    finally:
+        if pool:
+            pool.shutdown()
+    table = Table(model, axes, outputs, fixed, tol, values, np.zeros(cells + (len(outputs),)))
+    y = table.interpolate(np.stack(list(points.values()), axis=-1))[0]
+    # no solution at the nodes and at the points: the table gives nan; at some of them: the cell is never used
+    err = np.where(np.isfinite(y) & np.isfinite(exact), np.abs(y - exact),
+                   np.where(np.isnan(y) & np.isnan(exact), 0, np.inf))
+    err = err.reshape(u.shape[:-1] + (len(outputs),)).max(axis=0)
+    table.error = ndimage.maximum_filter(err, size=(3,)*len(cells) + (1,), mode='nearest')
+    return table
+
+# grids of the chapter examples: stretching at any (angle, mu, K, n), draw section at any (mu, K, n, e1O)
+TABLES = {
+    'stretching': {'axes': {'angle': np.linspace(20, 60, 41), 'mu': np.linspace(0.02, 0.2, 19),
+                            'K': np.linspace(400, 1200, 3), 'n': np.linspace(0.1, 0.4, 31)},
+                   'tol': {'force': 1.0, 'thinning_O': 1e-3, 'thinning_A': 1e-3, 'margin': 1e-3}},
+    'draw_section': {'axes': {'mu': np.linspace(0.02, 0.2, 37), 'K': np.linspace(400, 1200, 2),
+                              'n': np.linspace(0.1, 0.4, 61), 'e1O': np.linspace(0.01, 0.1, 37)},
+                     'tol': {'force': 1.0, 'thinning': 1e-3, 'margin': 1e-3}},
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('model', choices=list(TABLES))
+    parser.add_argument('-o', '--output', default=None, help='table file (default: <model>.npy)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('-N', type=int, default=10**5, help='random queries to check the table')
+    args = parser.parse_args()
+    filename = args.output or args.model + '.npy'
+
+    t0 = time.perf_counter()
+    table = build(args.model, TABLES[args.model]['axes'], TABLES[args.model]['tol'], workers=args.workers)
+    table.save(filename)
+    print('%r built in %.1f s' % (table, time.perf_counter()-t0))
+
+    t0 = time.perf_counter()
+    table = load(filename)
+    print('Loaded in %.1f ms' % (1e3*(time.perf_counter()-t0)))
+    rng = np.random.default_rng(0)
+    axes = dict(zip(table.names, table.axes))
+    q = {k: rng.uniform(g[0], g[-1], args.N) for k, g in axes.items()}
+    t0 = time.perf_counter()
+    y = table(q)
+    t1 = time.perf_counter()
+    ye = models.evaluate(args.model, q)
+    t2 = time.perf_counter()
+    print('%d queries: table %.3f s (%d exact), model %.3f s' % (args.N, t1-t0, table.stats['exact'], t2-t1))
+    for k in table.outputs:
+        e = np.abs(y[k]-ye[k])
+        print('  %-12s max. error %.3g (tolerance %g)' % (k, np.nanmax(e), table.tol[k]))
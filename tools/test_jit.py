@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Equivalence of the backends of jit with the scalar functions of the
+chapters (the numba tests are skipped when it is not installed):
+
+    python -m pytest tools/test_jit.py
+"""
+
+import os
+import numpy as np
+import pytest
+
+import jit
+import models
+import sensitivity
+
+BACKENDS = ['numpy', pytest.param('numba', marks=pytest.mark.skipif(jit.numba is None, reason='numba is not installed'))]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    jit.set_backend(request.param)
+    yield request.param
+    jit.set_backend(os.environ.get('SMF_JIT_BACKEND', 'auto'))
+
+
+@pytest.mark.parametrize('name', list(jit.KERNELS))
+def test_kernel(backend, name):
+    jit.check(name)
+
+
+@pytest.mark.parametrize('name', list(jit.KERNELS))
+def test_broadcasting(backend, name):
+    args = jit.inputs(name, 12, np.random.default_rng(1))
+    args = [a.reshape(3, 4) for a in args[:-1]] + [args[-1][:4]]
+    expected = np.array([jit.KERNELS[name][2](*i) for i in zip(*[a.ravel() for a in np.broadcast_arrays(*args)])]).reshape(3, 4)
+    np.testing.assert_allclose(getattr(jit, name)(*args), expected, rtol=1e-12, atol=1e-12)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        jit.set_backend('fortran')
+
+
+def test_necking_complex_step(backend):
+    # models.necking uses the compiled e1s for real inputs only
+    res = sensitivity.gradient('necking', {'beta': 0.5, 'n': 0.22, 'e0': 0, 'e1': 0.3}, method='complex')
+    assert res['method'] == 'complex'
+    h = 1e-6
+    f = lambda n: models.evaluate('necking', {'beta': 0.5, 'n': n})['limit']
+    np.testing.assert_allclose(res['gradient']['limit']['n'], (f(0.22+h) - f(0.22-h))/(2*h), rtol=1e-6)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Monte Carlo and Latin hypercube propagation of the scatter of material and
+process inputs through the forming models (models.py).
+
+Inputs are given as distributions, the rest take their nominal value:
+
+    spec = {'K': ('normal', 810, 25), 'n': ('normal', 0.24, 0.01),
+            'mu': ('uniform', 0.08, 0.12), 't0': ('truncnormal', 1.2, 0.02, 1.15, 1.25),
+            'R': ('lognormal', 1100, 20)}          # lognormal: mean and standard deviation
+    res = run('stretching', spec, 10**6)
+    res['percentiles']['thinning_A']                 # 1, 5, 50, 95, 99 %
+    res['failure']['margin']                         # probability of margin < 0
+
+The samples are evaluated by chunks in parallel processes. Each chunk has its
+own random stream (numpy SeedSequence spawned from the seed), so the results
+only depend on the seed and the chunk size, not on the number of processes.
+
+    python tools/uncertainty.py stretching -N 1000000
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import stats
+import matplotlib.pyplot as plt
+
+import chapters
+import models
+
+PERCENTILES = (1, 5, 50, 95, 99)
+
+def distribution(spec):
+    ''' Frozen scipy distribution of a spec: ('normal', mean, sd), ('uniform', lo, hi),
+    ('lognormal', mean, sd), ('truncnormal', mean, sd, lo, hi)'''
+    kind, *p = spec
+    if kind == 'normal':
+        return stats.norm(p[0], p[1])
+    if kind == 'uniform':
+        return stats.uniform(p[0], p[1]-p[0])
+    if kind == 'lognormal':
+        s2 = np.log(1 + (p[1]/p[0])**2)
+        return stats.lognorm(np.sqrt(s2), scale=p[0]*np.exp(-s2/2))
+    if kind == 'truncnormal':
+        mean, sd, lo, hi = p
+        return stats.truncnorm((lo-mean)/sd, (hi-mean)/sd, loc=mean, scale=sd)
+    raise ValueError('Unknown distribution: %s' % kind)
+
+def sample(spec, N, rng, method='lhs'):
+    ''' N samples of the inputs of spec (dict of arrays); 'mc' or 'lhs' (Latin hypercube)'''
+    out = {}
+    for name, d in spec.items():
+        if not isinstance(d, (tuple, list)):
+            out[name] = np.full(N, float(d))
+            continue
+        if method == 'lhs':
+            u = (rng.permutation(N) + rng.random(N))/N
+        elif method == 'mc':
+            u = rng.random(N)
+        else:
+            raise ValueError('Unknown sampling method: %s' % method)
+        out[name] = distribution(d).ppf(u)
+    return out
+
+def _run_chunk(args):
+    model, spec, N, seed, method, keep_inputs = args
+    x = sample(spec, N, np.random.default_rng(seed), method)
+    y = models.evaluate(model, x)
+    return (x if keep_inputs else {}), {k: np.broadcast_to(v, (N,)) for k, v in y.items()}
+
+def run(model, spec, N, method='lhs', seed=0, chunk=10**5, workers=None, keep_inputs=False,
+        percentiles=PERCENTILES):
+    ''' Propagates the input distributions through the model
+
+    Returns a dict with the 'outputs' (and 'inputs' if keep_inputs) of all the
+    samples, and per output the 'percentiles', 'mean', 'std', the fraction of
+    samples without solution ('nan') and, for margins, the 'failure' probability.'''
+    sizes = [min(chunk, N-i) for i in range(0, N, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(model, spec, n, s, method, keep_inputs) for n, s in zip(sizes, seeds)]
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) == 1:
+        results = list(map(_run_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    outputs = {k: np.concatenate([r[1][k] for r in results]) for k in results[0][1]}
+    res = {'model': model, 'N': N, 'method': method, 'outputs': outputs,
+           'percentiles': {}, 'mean': {}, 'std': {}, 'nan': {}, 'failure': {}}
+    if keep_inputs:
+        res['inputs'] = {k: np.concatenate([r[0][k] for r in results]) for k in results[0][0]}
+    for k, y in outputs.items():
+        ok = np.isfinite(y)
+        res['nan'][k] = 1 - ok.mean()
+        res['percentiles'][k] = dict(zip(percentiles, np.percentile(y[ok], percentiles))) if ok.any() else {}
+        res['mean'][k], res['std'][k] = (y[ok].mean(), y[ok].std()) if ok.any() else (np.nan, np.nan)
+        if k == 'margin':
+            # samples without solution (e.g. the sheet cannot carry the tension) count as failures
+            res['failure'][k] = np.mean(~ok | (y < 0))
+    return res
+
+def print_summary(res):
+    print('%s: %d samples (%s)' % (res['model'], res['N'], res['method']))
+    print('%-14s %11s %11s ' % ('output', 'mean', 'std') + ''.join('%11s' % ('P%g' % p) for p in PERCENTILES))
+    for k in res['outputs']:
+        print('%-14s %11.4g %11.4g ' % (k, res['mean'][k], res['std'][k])
+              + ''.join('%11.4g' % res['percentiles'][k].get(p, np.nan) for p in PERCENTILES))
+    for k, p in res['failure'].items():
+        print('Probability of %s < 0: %.4f' % (k, p))
+
+def plot_bands(res, names=None):
+    ''' Histograms of the outputs with the 5-95 % and 1-99 % bands'''
+    names = names or list(res['outputs'])
+    fig, ax = plt.subplots(1, len(names), figsize=(4*len(names), 3.5))
+    for a, k in zip(np.atleast_1d(ax), names):
+        y = res['outputs'][k]
+        y = y[np.isfinite(y)]
+        p = res['percentiles'][k]
+        a.axvspan(p[1], p[99], color='y', alpha=0.3, label='1-99 %')
+        a.axvspan(p[5], p[95], color='orange', alpha=0.3, label='5-95 %')
+        a.hist(y, bins=100, histtype='step', color='b')
+        a.axvline(x=p[50], color='r', lw=1)
+        a.set_xlabel(k)
+    np.atleast_1d(ax)[0].legend()
+    plt.tight_layout()
+    plt.show()
+
+# scatter of the inputs of the chapter examples (coil to coil and process)
+SPECS = {
+    'stretching': {'K': ('normal', 810, 25), 'n': ('normal', 0.24, 0.01), 'mu': ('uniform', 0.08, 0.12),
+                   't0': ('truncnormal', 1.2, 0.02, 1.14, 1.26)},
+    'draw_section': {'K': ('normal', 750, 25), 'n': ('normal', 0.23, 0.01), 'mu': ('uniform', 0.08, 0.12),
+                     't0': ('truncnormal', 0.8, 0.015, 0.76, 0.84), 'e1O': ('uniform', 0.025, 0.035)},
+    'bending': {'t': ('truncnormal', 1.2, 0.02, 1.14, 1.26), 'E': ('normal', 210e3, 5e3),
+                'Y': ('normal', 100, 8), 'R': ('uniform', 9.8, 10.2)},
+    'necking': {'n': ('normal', 0.22, 0.01), 'e0': ('uniform', 0, 0.02), 'e1': ('normal', 0.3, 0.03)},
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('model', choices=list(models.MODELS))
+    parser.add_argument('-N', type=int, default=10**5)
+    parser.add_argument('--method', choices=('lhs', 'mc'), default='lhs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=10**5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    res = run(args.model, SPECS[args.model], args.N, args.method, args.seed, args.chunk, args.workers)
+    print_summary(res)
+    print('%.1f s' % (time.perf_counter()-t0))
+    if args.plot:
+        plot_bands(res)
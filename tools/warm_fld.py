@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Author: Domingo Morales Palma <dmpalma@us.es>
+
+Forming limit tables of strain rate and temperature dependent sheets
+(warm_necking): the limit major strain e1 on a uniform grid of temperature
+T, log10 of the strain rate and beta = e2/e1, by default of the localized
+neck of the M-K analysis (warm_necking.mk_limit_eff_strain), which grows with
+the temperature as the rate sensitivity of the alloy. The limits of the laws
+in warm_necking.ATHERMAL do not depend on the temperature, and their tables
+have a single node in T.
+
+The table is computed in parallel processes (chunks of temperatures) and
+cached in npz files by the hash of the law, its parameters, the grid and the
+source of the kernels, so it is computed once per material. It is
+interpolated trilinearly with index arithmetic (as fld.limit_e1), and
+fld_table gives the forming limit curve at one temperature and rate in the
+format of fld.limit_table, to assess part meshes with fld.assess.
+
+    law, params = warm_necking.MATERIALS['AA5182']
+    table = build(law, params, T=(20, 300, 29), rate=(1e-4, 100, 25))
+    limit_e1(T, rate, beta, table)
+    state, thinning = fld.assess(strain, fld_table(table, T=200, rate=0.1))
+
+    python tools/warm_fld.py AA5182 --plot
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+
+import chapters
+import necking as nk
+import necking_paths as nkp
+import warm_necking as wn
+import fld
+
+CACHE = os.path.join(chapters.ROOT, '.cache', 'warm_fld')
+AXES = ('T', 'lograte', 'beta')
+
+_source = {}
+
+def source_hash():
+    ''' Hash of the source of the kernels'''
+    if not _source:
+        h = hashlib.sha256()
+        for f in (__file__, wn.__file__, nk.__file__, nkp.__file__):
+            with open(f, 'rb') as fh:
+                h.update(fh.read())
+        _source['hash'] = h.hexdigest()
+    return _source['hash']
+
+def table_key(law, params, criterion, axes):
+    ''' Hash of a table'''
+    meta = json.dumps({'law': law, 'params': params, 'criterion': criterion, 'axes': axes}, sort_keys=True)
+    return hashlib.sha256((meta + source_hash()).encode()).hexdigest()[:20]
+
+def _run_chunk(args):
+    law, params, criterion, T, lograte, beta = args
+    return wn.limit_strains(beta[None, None, :], 10**lograte[None, :, None], T[:, None, None], law, params, criterion)[0]
+
+def build(law, params, T=(20, 300, 29), rate=(1e-4, 100, 25), beta=(-0.5, 1, 151), criterion='mk',
+          cache=CACHE, chunk=1, workers=None):
+    ''' Table of the limit major strain of the law (warm_necking.LAWS) with params
+
+    T, rate, beta: (min, max, size) of the grid (at least 2 nodes), uniform in
+    T, log10(rate) and beta; T is (min, min, 1) for the laws in
+    warm_necking.ATHERMAL. chunk: temperatures per job (workers=1: no
+    processes); cache: folder of the npz files (None: not on disk).
+    Returns a dict with the 'axes' {name: (min, max, size)} and 'e1' (T, rate, beta).'''
+    if law in wn.ATHERMAL:
+        T = (T[0], T[0], 1)
+    axes = {'T': (float(T[0]), float(T[1]), int(T[2])),
+            'lograte': (float(np.log10(rate[0])), float(np.log10(rate[1])), int(rate[2])),
+            'beta': (float(beta[0]), float(beta[1]), int(beta[2]))}
+    if min(a[2] for k, a in axes.items() if k != 'T' or law not in wn.ATHERMAL) < 2:
+        raise ValueError('The grid needs at least 2 nodes per axis')
+    params = {k: float(v) for k, v in params.items()}
+    key = table_key(law, params, criterion, axes)
+    filename = os.path.join(cache, key + '.npz') if cache else None
+    if filename and os.path.exists(filename):
+        return load(filename)
+    g = {k: np.linspace(*a) for k, a in axes.items()}
+    jobs = [(law, params, criterion, g['T'][i:i+chunk], g['lograte'], g['beta']) for i in range(0, len(g['T']), chunk)]
+    if workers == 1:
+        results = list(map(_run_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    table = {'law': law, 'params': params, 'criterion': criterion, 'axes': axes, 'key': key,
+             'e1': np.concatenate(results), 'cached': False}
+    if filename:
+        os.makedirs(cache, exist_ok=True)
+        save(filename, table)
+    return table
+
+def save(filename, table):
+    meta = {k: table[k] for k in ('law', 'params', 'criterion', 'axes', 'key')}
+    np.savez(filename + '.tmp.npz', e1=table['e1'], meta=np.array(json.dumps(meta)))
+    os.replace(filename + '.tmp.npz', filename)
+
+def load(filename):
+    ''' Table saved by build'''
+    with np.load(filename) as data:
+        table = json.loads(str(data['meta']))
+        table['e1'] = data['e1']
+    table['axes'] = {k: tuple(v) for k, v in table['axes'].items()}
+    table['cached'] = True
+    return table
+
+def limit_e1(T, rate, beta, table):
+    ''' Limit major strain interpolated from the table (the points are clipped to the grid)'''
+    e1 = table['e1']
+    index, weight = [], []
+    for x, (lo, hi, size) in zip((T, np.log10(rate), beta), (table['axes'][k] for k in AXES)):
+        x = np.asarray(x, dtype=float)
+        u = np.clip((x-lo)/(hi-lo)*(size-1), 0, size-1) if size > 1 else np.zeros(x.shape)
+        i = np.minimum(u.astype(np.intp), max(size-2, 0))
+        index.append(i)
+        weight.append(u-i)
+    index = np.broadcast_arrays(*index)
+    weight = np.broadcast_arrays(*weight)
+    y = 0
+    for corner in itertools.product((0, 1), repeat=3):
+        c = 1
+        for w, d in zip(weight, corner):
+            c = c*(w if d else 1-w)
+        y = y + c*e1[tuple(np.minimum(i+d, size-1) for i, d, size in zip(index, corner, e1.shape))]
+    return y
+
+def fld_table(table, T, rate):
+    ''' Forming limit curve at the temperature T and strain rate, as fld.limit_table'''
+    bmin, bmax, size = table['axes']['beta']
+    beta = np.linspace(bmin, bmax, size)
+    return {'bmin': bmin, 'db': (bmax-bmin)/(size-1), 'e1': limit_e1(T, rate, beta, table)}
+
+def plot_table(table, T=(20, 150, 250), rate=0.1, title=''):
+    ''' Plane strain limit e1 (FLC0) over temperature and rate, and forming limit
+    curves at several temperatures (several rates if the table has a single temperature)'''
+    T0, T1, nT = table['axes']['T']
+    r0, r1, nr = table['axes']['lograte']
+    fig, ax = plt.subplots(1, 2, figsize=(12,5))
+    lograte = np.linspace(r0, r1, nr)
+    flc0 = limit_e1(np.linspace(T0, T1, nT)[:, None], 10**lograte[None, :], 0, table)
+    if nT > 1:
+        cs = ax[0].contourf(lograte, np.linspace(T0, T1, nT), flc0, 20, cmap='viridis')
+        plt.colorbar(cs, ax=ax[0], label=r'$FLC_0$, $\varepsilon_1$')
+        ax[0].set_ylabel(r'Temperature, $T$ (C)')
+        curves = [(T_, rate, r'$T = %g$ C' % T_) for T_ in T]
+        legend = r'$\dot\varepsilon = %g$ 1/s' % rate
+    else:
+        ax[0].plot(lograte, flc0[0])
+        ax[0].set_ylabel(r'$FLC_0$, $\varepsilon_1$')
+        curves = [(T0, 10**r, r'$\dot\varepsilon = 10^{%g}$ 1/s' % r) for r in np.linspace(r0, r1, 3)]
+        legend = r'$T = %g$ C' % T0
+    ax[0].set_xlabel(r'Strain rate, $\log_{10}\dot\varepsilon$ (1/s)')
+    ax[0].set_title(title)
+    for T_, r, label in curves:
+        f = fld_table(table, T_, r)
+        beta = f['bmin'] + f['db']*np.arange(len(f['e1']))
+        ax[1].plot(beta*f['e1'], f['e1'], label=label)
+    ax[1].axvline(x=0, color='k', lw=0.2)
+    ax[1].axis([-0.25, 0.5, 0, 0.75])
+    ax[1].set_aspect('equal')
+    ax[1].set_xlabel(r'$\varepsilon_2$')
+    ax[1].set_ylabel(r'$\varepsilon_1$')
+    ax[1].legend(title=legend)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('material', choices=list(wn.MATERIALS))
+    parser.add_argument('--T', type=float, nargs=3, default=(20, 300, 29), metavar=('MIN', 'MAX', 'SIZE'))
+    parser.add_argument('--rate', type=float, nargs=3, default=(1e-4, 100, 25), metavar=('MIN', 'MAX', 'SIZE'))
+    parser.add_argument('--beta', type=float, nargs=3, default=(-0.5, 1, 151), metavar=('MIN', 'MAX', 'SIZE'))
+    parser.add_argument('--criterion', choices=('mk', 'hill', 'swift'), default='mk')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    law, params = wn.MATERIALS[args.material]
+    t0 = time.perf_counter()
+    table = build(law, params, args.T, args.rate, args.beta, args.criterion,
+                  cache=None if args.no_cache else CACHE, workers=args.workers)
+    print('%s (%s): table %s %s in %.2f s' % (args.material, law, 'x'.join(str(i) for i in table['e1'].shape),
+          'loaded' if table['cached'] else 'built', time.perf_counter()-t0))
+    rng = np.random.default_rng(0)
+    N = 10**5 if args.criterion != 'mk' else 10**3
+    T0, T1, nT = table['axes']['T']
+    q = (rng.uniform(T0, T1, N), 10**rng.uniform(*np.log10(args.rate[:2]), N), rng.uniform(*args.beta[:2], N))
+    t0 = time.perf_counter()
+    y = limit_e1(*q, table)
+    t1 = time.perf_counter()
+    ye = wn.limit_strains(q[2], q[1], q[0], law, params, args.criterion)[0]
+    t2 = time.perf_counter()
+    print('%d queries: table %.3f s, solver %.3f s, max. error %.2e' % (N, t1-t0, t2-t1, np.nanmax(np.abs(y-ye))))
+    strain = np.stack((rng.uniform(0, 0.5, 10**6), rng.uniform(-0.2, 0.3, 10**6)), axis=-1)
+    for T in ((T0,) if nT == 1 else (20, 150, 250)):
+        state, thinning = fld.assess(strain, fld_table(table, T, 0.1))
+        print('  Mesh at T = %3d C, rate = 0.1 1/s: %s' % (T, fld.summary(state)))
+    if args.plot:
+        plot_table(table, title='%s (%s)' % (args.material, law))